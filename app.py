@@ -7,11 +7,11 @@ import os
 from PIL import Image, ImageDraw, ImageFont
 import streamlit as st
 import time
+import uuid
 import datetime
 import pandas as pd
 import plotly.graph_objects as go
-import google.generativeai as genai
-from modules import scraper, ai_engine, data_manager
+from modules import scraper, ai_engine, data_manager, local_predictor, coupon_scorer, single_flight, key_pool, ai_scheduler, model_router, relevance, chat_cache, toto_enrichment, telemetry, analysis_cache, deadline, db_manager
 
 # --- BU BLOĞU MUTLAKA EKLE ---
 # Streamlit Cloud üzerinde Chromium tarayıcısını kurar
@@ -23,51 +23,9 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 # --- KUPON GÖRSELİ OLUŞTURMA ---
-def _normalize_coupon_items(coupon_data):
-    items = coupon_data
-    if isinstance(items, str):
-        try:
-            import json as _json
-            items = _json.loads(items)
-        except Exception:
-            items = []
-    if isinstance(items, dict):
-        items = [items]
-    if not isinstance(items, list):
-        items = []
-    return items
-
-def _extract_odd_value(odd_val):
-    import re
-    val_str = str(odd_val).strip().replace(",", ".")
-
-    # Aralık Kontrolü (Örn: "1.45 - 1.60")
-    if "-" in val_str:
-        try:
-            parts = val_str.split("-")
-            # Her parçadaki sayıyı bul (örn: " 1.45 " -> 1.45)
-            nums = []
-            for p in parts:
-                match = re.search(r"\d+(?:\.\d+)?", p)
-                if match:
-                    nums.append(float(match.group(0)))
-            
-            if len(nums) >= 2:
-                # Aralığın ortalamasını al
-                return sum(nums) / len(nums)
-            elif len(nums) == 1:
-                return nums[0]
-        except Exception:
-            pass
-
-    # Tekil Sayı Kontrolü (Eski usul devam)
-    match_odd = re.search(r"\d+(?:\.\d+)?", val_str)
-    if match_odd:
-        try:
-            return float(match_odd.group(0))
-        except Exception:
-            return None
-    return None
+# Kupon verisi çözümleme ve oran okuma geçmiş kayıtlarıyla ortak (data_manager)
+_normalize_coupon_items = data_manager.normalize_coupon_items
+_extract_odd_value = data_manager.extract_odd_value
 
 def create_coupon_image(coupon_data, total_odd):
     items = _normalize_coupon_items(coupon_data)
@@ -305,8 +263,10 @@ if not st.session_state.get('api_key_submitted', False):
 
 # --- API KEY KONFİGÜRASYONU ---
 try:
-    genai.configure(api_key=st.session_state.gemini_api_key)
     ai_engine.set_api_key(st.session_state.gemini_api_key)
+    data_manager.set_user(st.session_state.gemini_api_key)
+    data_manager.set_shared_history(st.session_state.get("hist_show_shared", False))
+    ai_engine.warm_up()
 except Exception as e:
     st.error(f"API Key hatası: {e}")
     st.stop()
@@ -318,6 +278,8 @@ if "current_analysis_context" not in st.session_state:
     st.session_state.current_analysis_context = None
 if "current_analysis_match" not in st.session_state:
     st.session_state.current_analysis_match = {}
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = uuid.uuid4().hex
 if "league_cache" not in st.session_state:
     st.session_state.league_cache = {}
 if "wizard_step" not in st.session_state:
@@ -351,6 +313,9 @@ if "wizard_analyze_limit" not in st.session_state:
     st.session_state.wizard_analyze_limit = 8
 if "wizard_params" not in st.session_state:
     st.session_state.wizard_params = {}
+if "wizard_shortlist_k" not in st.session_state:
+    # generate_smart_coupon ile aynı anlam: None = otomatik, 0 = ön eleme kapalı, K = en iyi K aday
+    st.session_state.wizard_shortlist_k = None
 
 combined_matches = []
 create_btn = False
@@ -416,6 +381,25 @@ def show_coupon_wizard():
                     value=st.session_state.wizard_c_count
                 )
 
+            # 3.1 YAPAY ZEKAYA GİDECEK ADAY SAYISI (Ön Eleme)
+            shortlist_on = st.checkbox(
+                "🧮 Ön eleme: sadece en iyi adaylar yapay zekaya gönderilsin",
+                value=st.session_state.wizard_shortlist_k != 0,
+                help="Havuz önce istatistik modeliyle puanlanır, sadece en iyi adaylar yapay zekaya gider."
+            )
+            if shortlist_on:
+                current_k = st.session_state.wizard_shortlist_k
+                # Aday sayısı kupondaki maç sayısından az olamaz
+                st.session_state.wizard_shortlist_k = st.number_input(
+                    "Yapay zekaya gönderilecek aday sayısı (boş = otomatik)",
+                    min_value=st.session_state.wizard_c_count,
+                    max_value=20,
+                    value=max(current_k, st.session_state.wizard_c_count) if current_k else None,
+                    placeholder=f"otomatik ({coupon_scorer.default_shortlist_size(st.session_state.wizard_c_count)})"
+                )
+            else:
+                st.session_state.wizard_shortlist_k = 0
+
             st.markdown("---")
             
             # 4. FİLTRELER
@@ -451,7 +435,8 @@ def show_coupon_wizard():
                         "game_focus": st.session_state.game_focus,
                         "blacklist": st.session_state.wizard_blacklist,
                         "only_big_teams": st.session_state.wizard_only_big_teams,
-                        "date_range": st.session_state.wizard_date_range
+                        "date_range": st.session_state.wizard_date_range,
+                        "shortlist_k": st.session_state.wizard_shortlist_k
                     }
                     st.session_state.start_analysis = True
                     st.session_state.show_wizard = False
@@ -967,6 +952,9 @@ with st.sidebar:
                     st.session_state.league_cache[selected_league_name] = data["matches"]
                     st.session_state.current_standings = data["standings"]
                     if 'league_stats' in st.session_state: del st.session_state.league_stats
+                    if selected_league_value == db_manager.LEAGUE_VALUE:
+                        # Yerel tahmin modelinin veritabanı da güncellensin (tek işlemde)
+                        db_manager.ingest_fixture_and_standings(data)
                     
                     st.success("Hazır!")
                     time.sleep(0.5)
@@ -989,6 +977,7 @@ with st.sidebar:
             st.markdown("<div class='sidebar-section-title'>Hesap</div>", unsafe_allow_html=True)
             if st.button("🚪 Çıkış Yap / Key Değiştir", use_container_width=True):
                 st.session_state.api_key_submitted = False
+                ai_engine.reset_chat(st.session_state.chat_session_id)
                 st.rerun()
 
         with st.container():
@@ -1004,6 +993,41 @@ with st.sidebar:
                 f"</div>",
                 unsafe_allow_html=True
             )
+            flight_stats = single_flight.FLIGHTS.stats()
+            if flight_stats:
+                st.caption(" • ".join(
+                    f"{kind}: {c['executions']} çağrı, {c['coalesced']} birleştirildi"
+                    for kind, c in flight_stats.items()
+                ))
+            answer_stats = chat_cache.ANSWERS.stats()
+            if answer_stats["hits"] + answer_stats["misses"]:
+                st.caption(f"💬 Sohbet önbelleği: {answer_stats['hits']} isabet (%{answer_stats['hit_rate']:.0f}) • {answer_stats['answers']} yanıt")
+            # Öncelik sınıfı başına uçtan uca gecikme
+            class_labels = {ai_scheduler.CHAT: "Sohbet", ai_scheduler.SINGLE: "Maç analizi", ai_scheduler.BATCH: "Toplu"}
+            sched_rows = [
+                f"{class_labels[c]}: p50 {r['p50_ms'] / 1000:.1f} sn / p95 {r['p95_ms'] / 1000:.1f} sn" + (f" ({r['queued']} sırada)" if r["queued"] else "")
+                for c, r in ai_scheduler.SCHEDULER.stats().items() if r["requests"]
+            ]
+            if sched_rows:
+                st.caption("🚦 " + " • ".join(sched_rows))
+            # Model başına gecikme/hata (yönlendirme kararlarının dayanağı)
+            for name, m in model_router.ROUTER.stats()["models"].items():
+                blocked = " • ⛔ kota" if m["quota_blocked"] else ""
+                st.caption(f"🧭 {name}: p95 {m['p95_ms'] / 1000:.1f} sn • {m['requests']} istek • {m['errors']} hata{blocked}")
+            # Ortak key havuzu (GOOGLE_API_KEYS) ve oturumun kendi key'i kullanım durumu
+            for row in key_pool.POOL.stats(ai_engine.get_api_key()):
+                cooldown = f" • ⏳ {row['cooldown_s']:.0f} sn" if row["cooldown_s"] else ""
+                st.caption(f"🔑 {row['key']}: %{row['utilization_pct']:.0f} ({row['rpm_used']}/{key_pool.POOL.rpm_limit} rpm) • 429: {row['quota_errors']}{cooldown}")
+
+            # Fonksiyon başına token / süre / maliyet
+            telemetry_rows = telemetry.summary()
+            if telemetry_rows:
+                with st.expander("📊 Yapay Zeka Telemetrisi"):
+                    st.dataframe(pd.DataFrame(telemetry_rows).set_index("fonksiyon"), use_container_width=True)
+                    tel_entry = st.selectbox("Fonksiyon", [r["fonksiyon"] for r in telemetry_rows], key="telemetry_entry")
+                    tel_field = st.radio("Dağılım", ["Süre (sn)", "Prompt token"], horizontal=True, key="telemetry_field")
+                    buckets = telemetry.histogram(tel_entry, "latency" if tel_field == "Süre (sn)" else "prompt_tokens")
+                    st.bar_chart(pd.DataFrame(buckets, columns=["kova", "çağrı"]).set_index("kova"))
 
 if st.session_state.show_wizard:
     show_coupon_wizard()
@@ -1085,10 +1109,14 @@ if st.session_state.get("start_analysis"):
                 status_text.text(f"Analiz: {m['home']} vs {m['away']}")
                 try:
                     details = scraper.get_match_deep_stats(m['url'])
+                    probs = local_predictor.predict_probabilities(
+                        m['home'], m['away'], league_value=st.session_state.leagues_map.get(m['league_name'])
+                    )
                     ai_pool.append({
                         "home": m['home'], "away": m['away'], "lig": m['league_name'],
                         "insights": details["yellow_box"],
-                        "stats": "Detaylı analiz yapılıyor..."
+                        "stats": local_predictor.format_probabilities(probs),
+                        "probs": probs
                     })
                 except: pass
                 progress_bar.progress((i+1)/len(pool))
@@ -1100,7 +1128,12 @@ if st.session_state.get("start_analysis"):
                 "(ÖNEMLİ: Banko seçildiyse taraf bahsi zorunlu değil, "
                 "istatistiksel olasılığı en yüksek tercihi yap.)"
             )
-            coupon = ai_engine.generate_smart_coupon(ai_pool, c_count, c_type)
+            coupon, coupon_run = ai_engine.generate_smart_coupon_run(
+                ai_pool, c_count, c_type,
+                risk_profile=wizard_params.get('risk_profile', st.session_state.risk_profile),
+                game_focus=wizard_params.get('game_focus', st.session_state.game_focus),
+                shortlist_k=wizard_params.get('shortlist_k')
+            )
             if coupon:
                 st.session_state.generated_coupon = coupon
 
@@ -1130,6 +1163,16 @@ if st.session_state.get("start_analysis"):
                 data_manager.add_coupon(coupon, total_odd_string)
 
                 st.toast("Kupon hazırlandı ve kaydedildi! Sağ alttaki butona tıklayın.", icon="🎫")
+                reuse = coupon_run["reuse"]
+                if reuse and reuse["reused"]:
+                    st.caption("♻️ Maç verileri değişmedi, önceki kupon yeniden kullanıldı.")
+                elif reuse and reuse["changed"]:
+                    st.caption(f"🔁 Değişen girdiler: {', '.join(reuse['changed'][:8])}")
+                if not coupon_run["cached"]:
+                    st.caption(
+                        f"🧮 Ön eleme: {coupon_run['pool']} maçtan {coupon_run['shortlist']} aday yapay zekaya gönderildi • "
+                        f"Prompt %{coupon_run['reduction_pct']} kısaldı • AI süresi {coupon_run['llm_ms'] / 1000:.1f} sn"
+                    )
         finally:
             loader_placeholder.empty()
         
@@ -1296,55 +1339,112 @@ with main_tab1:
                 </div>
                 """, unsafe_allow_html=True)
 
+                analysis_focus = st.selectbox(
+                    "🎯 Analiz Odağı", list(relevance.FOCUS_PRESETS.keys()), key="analysis_focus",
+                    help="Uzun karşılaştırma metninden yapay zekaya sadece bu odağa en ilgili cümleler gönderilir."
+                )
+
                 if st.button("🚀 MAÇI ANALİZ ET", type="primary", use_container_width=True):
                     # --- LOADER BAŞLAT ---
                     loader_placeholder = show_full_page_loader("⚡ Maç Simüle Ediliyor...")
                     try:
-                        st.session_state.chat_history = []
-                        st.session_state.current_analysis_context = None
-                        st.session_state.current_analysis_match = {}
+                        # Tüm istek (scrape + lig istatistikleri + yapay zeka) tek bir süre bütçesiyle sınırlı
+                        with deadline.scope(deadline.ANALYSIS_BUDGET) as request_deadline:
+                            st.session_state.chat_history = []
+                            ai_engine.reset_chat(st.session_state.chat_session_id)
+                            st.session_state.current_analysis_context = None
+                            st.session_state.current_analysis_match = {}
                         
-                        # Lig istatistikleri yoksa çek
-                        league_stats_data = st.session_state.get('league_stats', None)
-                        if not league_stats_data:
+                            # Lig istatistikleri yoksa çek (opsiyonel: maç detayı ve yapay zekaya ayrılan süreye dokunmaz)
+                            league_stats_data = st.session_state.get('league_stats', None)
+                            if not league_stats_data:
+                                league_budget = request_deadline.remaining() - deadline.ANALYSIS_CORE_RESERVE
+                                if league_budget < scraper.MIN_SCRAPE_SECONDS:
+                                    request_deadline.skip("lig istatistikleri")
+                                else:
+                                    try:
+                                        with deadline.scope(league_budget):
+                                            league_stats_data = scraper.get_league_detailed_stats(st.session_state.leagues_map[st.session_state.sb_selected_league])
+                                        if league_stats_data.get("team_stats"):
+                                            st.session_state.league_stats = league_stats_data
+                                    except: pass
+
+                            # Yerel modelden anlık ön tahmin (yapay zeka yanıtı beklenirken gösterilir)
                             try:
-                                league_stats_data = scraper.get_league_detailed_stats(st.session_state.leagues_map[st.session_state.sb_selected_league])
-                                st.session_state.league_stats = league_stats_data
-                            except: pass
-
-                        @st.cache_data(show_spinner=False, ttl=3600)
-                        def get_cached_analysis(home, away, url, standings, stats):
-                            return ai_engine.analyze_match_deep(home, away, url, standings, stats)
-
-                        ai_response = get_cached_analysis(
-                            selected_match_obj['home'], selected_match_obj['away'], selected_match_obj['url'],
-                            st.session_state.current_standings, league_stats_data
-                        )
+                                quick = local_predictor.predict_match(
+                                    selected_match_obj['home'], selected_match_obj['away'], league_stats_data,
+                                    league_value=st.session_state.leagues_map[st.session_state.sb_selected_league]
+                                )
+                                loader_placeholder.empty()
+                                loader_placeholder = show_full_page_loader(
+                                    f"⚡ Ön Tahmin: {quick['ana_tercih']} ({quick['guven_skoru']}) • Derin Analiz Sürüyor..."
+                                )
+                            except Exception as e:
+                                print(f"Ön tahmin hatası: {e}")
+
+                            @st.cache_data(show_spinner=False, ttl=3600)
+                            def get_cached_details(url):
+                                return scraper.get_match_deep_stats(url)
+
+                            @st.cache_data(show_spinner=False, ttl=3600)
+                            def get_cached_analysis(home, away, url, standings, stats, details, focus, league_value):
+                                return ai_engine.analyze_match_deep(home, away, url, standings, stats, details, focus,
+                                                                    league_value=league_value)
+
+                            # Detaylar bir kez çekilir: hem analize hem sohbet bağlamına gider
+                            match_details = get_cached_details(selected_match_obj['url'])
+                            st.session_state.current_analysis_details = match_details
+                            analysis_args = (
+                                selected_match_obj['home'], selected_match_obj['away'], selected_match_obj['url'],
+                                st.session_state.current_standings, league_stats_data, match_details,
+                                relevance.FOCUS_PRESETS.get(analysis_focus),
+                                st.session_state.leagues_map[st.session_state.sb_selected_league]
+                            )
+                            ai_response = get_cached_analysis(*analysis_args)
+                            # Süre yüzünden kısmi kalan sonuçlar önbellekte tutulmaz; sonraki denemede tamamlanır
+                            if match_details.get("partial"):
+                                get_cached_details.clear(selected_match_obj['url'])
+                            if match_details.get("partial") or (ai_response or {}).get("sure_asimi"):
+                                get_cached_analysis.clear(*analysis_args)
                         
-                        if ai_response:
-                            match_name = f"{selected_match_obj['home']} - {selected_match_obj['away']}"
-                            data_manager.add_analysis(match_name, ai_response)
-                            st.session_state.current_analysis_context = ai_response
-                            st.session_state.current_analysis_match = {
-                                "home_team": selected_match_obj["home"],
-                                "away_team": selected_match_obj["away"]
-                            }
+                            if ai_response:
+                                match_name = f"{selected_match_obj['home']} - {selected_match_obj['away']}"
+                                data_manager.add_analysis(match_name, ai_response)
+                                st.session_state.current_analysis_context = ai_response
+                                st.session_state.current_analysis_match = {
+                                    "home_team": selected_match_obj["home"],
+                                    "away_team": selected_match_obj["away"]
+                                }
                             
-                            # Grafik ve Kartlar
-                            st.markdown("### 🎯 HIZLI BAKIŞ")
-                            c1, c2, c3, c4 = st.columns(4)
-                            with c1: st.markdown(f"<div class='metric-card card-green'><div class='metric-label'>🔥 ANA TERCİH</div><div class='metric-value'>{ai_response.get('ana_tercih', '-')}</div></div>", unsafe_allow_html=True)
-                            with c2: st.markdown(f"<div class='metric-card card-blue'><div class='metric-label'>🛡️ GÜVEN</div><div class='metric-value'>{ai_response.get('guven_skoru', '-')}</div></div>", unsafe_allow_html=True)
-                            with c3: st.markdown(f"<div class='metric-card card-yellow'><div class='metric-label'>🎲 SÜRPRİZ</div><div class='metric-value'>{ai_response.get('surpriz_tercih', '-')}</div></div>", unsafe_allow_html=True)
-                            with c4: st.markdown(f"<div class='metric-card card-purple'><div class='metric-label'>⭐ YILDIZ</div><div class='metric-value'>{ai_response.get('macin_yildizi', '-')}</div></div>", unsafe_allow_html=True)
+                                # Grafik ve Kartlar
+                                st.markdown("### 🎯 HIZLI BAKIŞ")
+                                c1, c2, c3, c4 = st.columns(4)
+                                with c1: st.markdown(f"<div class='metric-card card-green'><div class='metric-label'>🔥 ANA TERCİH</div><div class='metric-value'>{ai_response.get('ana_tercih', '-')}</div></div>", unsafe_allow_html=True)
+                                with c2: st.markdown(f"<div class='metric-card card-blue'><div class='metric-label'>🛡️ GÜVEN</div><div class='metric-value'>{ai_response.get('guven_skoru', '-')}</div></div>", unsafe_allow_html=True)
+                                with c3: st.markdown(f"<div class='metric-card card-yellow'><div class='metric-label'>🎲 SÜRPRİZ</div><div class='metric-value'>{ai_response.get('surpriz_tercih', '-')}</div></div>", unsafe_allow_html=True)
+                                with c4: st.markdown(f"<div class='metric-card card-purple'><div class='metric-label'>⭐ YILDIZ</div><div class='metric-value'>{ai_response.get('macin_yildizi', '-')}</div></div>", unsafe_allow_html=True)
                             
-                            st.markdown("<br>", unsafe_allow_html=True)
-                            st.info(f"💡 **Kritik Faktör:** {ai_response.get('kritik_faktor', '')}")
-                            st.markdown("---")
-                            st.subheader("📝 Detaylı Analiz Raporu")
-                            st.markdown(ai_response.get('analiz_metni', ''))
-                        else:
-                            st.error("Analiz hatası.")
+                                st.markdown("<br>", unsafe_allow_html=True)
+                                if ai_response.get("sure_asimi") and ai_response.get("kaynak") == "yerel_model":
+                                    st.warning("Yapay zeka yanıtı süre sınırı içinde gelmediği için bu sonuç yerel istatistik modelinden üretildi.")
+                                elif ai_response.get("kaynak") == "yerel_model":
+                                    st.warning("Yapay zeka kotası dolu olduğu için bu sonuç yerel istatistik modelinden üretildi.")
+                                if request_deadline.skipped:
+                                    st.caption(f"⏱️ Süre sınırı ({deadline.ANALYSIS_BUDGET:.0f} sn) nedeniyle eksik kalan adımlar: "
+                                               f"{', '.join(request_deadline.skipped)}")
+                                reuse = analysis_cache.outcome(analysis_cache.MATCH, analysis_cache.key_of(
+                                    selected_match_obj['home'], selected_match_obj['away'], selected_match_obj['url']
+                                ))
+                                if reuse and reuse["reused"]:
+                                    st.caption("♻️ Maç verileri son analizden beri değişmedi, kayıtlı analiz gösteriliyor.")
+                                elif reuse and reuse["changed"]:
+                                    st.caption(f"🔁 Yeniden analiz edildi • Değişen veriler: {', '.join(reuse['changed'])}")
+                                st.info(f"💡 **Kritik Faktör:** {ai_response.get('kritik_faktor', '')}")
+                                st.markdown("---")
+                                st.subheader("📝 Detaylı Analiz Raporu")
+                                st.markdown(ai_response.get('analiz_metni', ''))
+                            else:
+                                st.error("Analiz hatası.")
                     finally:
                         loader_placeholder.empty()
 
@@ -1367,9 +1467,12 @@ with main_tab1:
                     context_data = {
                         "home_team": st.session_state.current_analysis_match.get("home_team", "Ev Sahibi"),
                         "away_team": st.session_state.current_analysis_match.get("away_team", "Deplasman"),
-                        "analysis": st.session_state.current_analysis_context
+                        "analysis": st.session_state.current_analysis_context,
+                        "details": st.session_state.get("current_analysis_details"),
                     }
-                    answer = ai_engine.get_chat_response(user_question, context_data)
+                    answer = ai_engine.get_chat_response(
+                        user_question, context_data, session_id=st.session_state.chat_session_id
+                    )
                     st.session_state.chat_history.append({"role": "assistant", "content": answer})
                     with st.chat_message("assistant"):
                         st.markdown(answer)
@@ -1530,10 +1633,27 @@ with main_tab2:
     if st.session_state.st_matches:
         st.dataframe(st.session_state.st_matches, use_container_width=True)
         
+        enrich_toto = st.checkbox(
+            "🔬 Maç verileriyle zenginleştir", value=True,
+            help=f"Her maçın Maçkolik detayları paralel çekilir (en fazla {toto_enrichment.ENRICH_BUDGET:.0f} sn)."
+        )
         if st.button("🧠 15 Maçlık AI Kolonu Oluştur", type="primary", use_container_width=True):
+            features = None
+            if enrich_toto:
+                progress = st.progress(0, text="Maçlar Maçkolik fikstürüyle eşleniyor...")
+                enrichment = toto_enrichment.enrich_toto(
+                    st.session_state.st_matches, st.session_state.league_cache, st.session_state.get("leagues_map"),
+                    progress=lambda ratio, message: progress.progress(ratio, text=message)
+                )
+                progress.empty()
+                features = enrichment["features"]
+                st.caption(
+                    f"🔬 {enrichment['resolved']}/{len(st.session_state.st_matches)} maç eşlendi • "
+                    f"{enrichment['fetched']} maçın detayı • {enrichment['timed_out']} zaman aşımı • {enrichment['elapsed']} sn"
+                )
             loader = show_full_page_loader("Yapay Zeka 15 Maçı Analiz Ediyor...")
             try:
-                prediction = ai_engine.analyze_spor_toto_column(st.session_state.st_matches)
+                prediction = ai_engine.analyze_spor_toto_column(st.session_state.st_matches, features)
                 st.session_state.st_prediction = prediction
             finally:
                 loader.empty()
@@ -1578,84 +1698,108 @@ with main_tab2:
 # SEKME 3: KUPON GEÇMİŞİ
 # -------------------------
 with main_tab3:
-    import re as _re
-    import html as _html
-    def _clean_text(value):
-        if value is None: return ""
-        text = _html.unescape(str(value))
-        text = _re.sub(r"<[^>]+>", "", text)
-        return text.strip()
+    def _render_coupon(coupon, key_prefix):
+        display = coupon["display"]
+        with st.expander(display["title"]):
+            picks = display["picks"]
+            if picks:
+                for idx, pick in enumerate(picks, start=1):
+                    st.markdown(f"**{idx}. {pick['match']}**")
+                    confidence = f"({pick['confidence']})" if pick["confidence"] else ""
+                    st.write(f"{pick['prediction']} {confidence} • Oran: {pick['odd']}")
+                    if pick["reason"]: st.caption(f"Neden: {pick['reason']}")
+                    st.markdown("---")
+
+                st.code(display["coupon_text"], language="text")
+
+                img_bytes = create_coupon_image(_normalize_coupon_items(coupon.get("items", [])), display["total_odd"])
+                st.download_button(
+                    label="📸 İndir",
+                    data=img_bytes,
+                    file_name=f"kupon_{coupon.get('id', idx)}.png",
+                    mime="image/png",
+                    use_container_width=True,
+                    key=f"{key_prefix}_{coupon.get('id', idx)}"
+                )
+
+    def _render_analysis(analysis):
+        display = analysis["display"]
+        with st.expander(display["title"]):
+            if "main_pick" in display:
+                st.markdown(f"**Ana Tercih:** {display['main_pick']}")
+                st.markdown(f"**Güven:** {display['confidence']}")
+                st.markdown("**Detaylı Analiz:**")
+            st.write(display["text"])
+
+    def _render_page(kind, render, key, empty_text):
+        """Sadece görünen sayfa okunur ve çizilir; tarih filtresi veritabanında uygulanır."""
+        f1, f2 = st.columns([2, 1])
+        with f1:
+            date_range = st.date_input("Tarih aralığı", value=(), key=f"hist_dates_{key}",
+                                       format="DD.MM.YYYY")
+        date_from = date_range[0] if len(date_range) > 0 else None
+        date_to = date_range[1] if len(date_range) > 1 else date_from
+        total = data_manager.count_history(kind, date_from, date_to)
+        pages = max(1, -(-total // data_manager.PAGE_SIZE))
+        with f2:
+            page_no = st.number_input("Sayfa", min_value=1, max_value=pages, value=1, key=f"hist_page_{key}")
+        page = data_manager.get_history_page(
+            kind, (page_no - 1) * data_manager.PAGE_SIZE, data_manager.PAGE_SIZE, date_from, date_to
+        )
+        if page["entries"]:
+            st.caption(f"{total} kayıt • Sayfa {page_no}/{pages}")
+            for entry in page["entries"]:
+                render(entry)
+        else:
+            st.info(empty_text)
+
+    def _render_archive(kind, render, key):
+        """Sıcak katmandan taşınmış eski kayıtlar: ay seçilince sadece o ayın segmenti açılır."""
+        segments = data_manager.get_archive_index(kind)
+        if not segments:
+            return
+        st.markdown("#### 🗄️ Arşiv")
+        labels = {f"{seg['month']} ({seg['count']} kayıt)": seg["month"] for seg in segments}
+        choice = st.selectbox("Arşiv ayı", ["Seçiniz"] + list(labels), key=f"archive_{key}")
+        if choice in labels:
+            for entry in data_manager.get_archived(kind, labels[choice]):
+                render(entry)
 
     st.subheader("🗂️ Analiz ve Kupon Arşivi")
+    st.checkbox("👥 Ortak geçmişi de göster", key="hist_show_shared",
+                help="Kullanıcı ayrımından önce kaydedilmiş, tüm kullanıcıların ortak geçmişi. "
+                     "Bu kayıtlar size ait olmayabilir.")
+    search_query = st.text_input("🔎 Geçmişte ara", key="hist_search",
+                                 placeholder="Takım, tahmin (örn. KG VAR) veya analiz metninden kelime")
+    if search_query.strip():
+        s1, s2 = st.columns([2, 1])
+        with s1:
+            search_kind = st.radio("Kapsam", ["Tümü", "Kuponlar", "Analizler"], horizontal=True, key="hist_search_kind")
+        kind_filter = {"Kuponlar": "coupon", "Analizler": "analysis"}.get(search_kind)
+        found = data_manager.count_search(search_query, kind_filter)
+        with s2:
+            search_page = st.number_input("Sayfa", min_value=1, max_value=max(1, -(-found // data_manager.PAGE_SIZE)),
+                                          value=1, key="hist_search_page")
+        results = data_manager.search_history(
+            search_query, kind_filter, (search_page - 1) * data_manager.PAGE_SIZE, data_manager.PAGE_SIZE
+        )
+        if results["entries"]:
+            st.caption(f"{results['total']} sonuç (en ilgili önce)")
+            for entry in results["entries"]:
+                if entry["kind"] == "coupon":
+                    _render_coupon(entry, "hist_btn_search")
+                else:
+                    _render_analysis(entry)
+        else:
+            st.info("Eşleşen kayıt bulunamadı.")
+        st.markdown("---")
+
     ht1, ht2 = st.tabs(["Kuponlarım", "Maç Analizlerim"])
     
     with ht1:
-        coupons = data_manager.get_user_coupons()
-        if coupons:
-            for coupon in coupons:
-                title = f"{coupon.get('date', 'Tarih Yok')} • Toplam Oran: {coupon.get('total_odd', '-')}"
-                with st.expander(title):
-                    items = coupon.get("items", [])
-                    if isinstance(items, str):
-                        try:
-                            import json as _json
-                            items = _json.loads(items)
-                        except: items = []
-                    if isinstance(items, dict): items = [items]
-
-                    if items:
-                        coupon_text = "🔥 AKIL HOCASI KUPONU 🔥\n\n"
-                        total_odd = 1.0
-                        for idx, pick in enumerate(items, start=1):
-                            match = _clean_text(pick.get("mac", "-"))
-                            prediction = _clean_text(pick.get("tahmin", "-"))
-                            confidence = _clean_text(pick.get("guven", ""))
-                            odd_val = _clean_text(pick.get("oran_tahmini", "-"))
-                            reason = _clean_text(pick.get("neden", ""))
-
-                            st.markdown(f"**{idx}. {match}**")
-                            st.write(f"{prediction} {f'({confidence})' if confidence else ''} • Oran: {odd_val}")
-                            if reason: st.caption(f"Neden: {reason}")
-                            st.markdown("---")
-                            
-                            coupon_text += f"⚽ {match}\n👉 {prediction} (Oran: {odd_val})\n\n"
-                            odd_num = _extract_odd_value(odd_val)
-                            if odd_num: total_odd *= odd_num
-
-                        coupon_text += f"💰 Toplam Oran: {total_odd:.2f}"
-                        st.code(coupon_text, language="text")
-
-                        img_bytes = create_coupon_image(items, f"{total_odd:.2f}")
-                        st.download_button(
-                            label="📸 İndir",
-                            data=img_bytes,
-                            file_name=f"kupon_{coupon.get('id', idx)}.png",
-                            mime="image/png",
-                            use_container_width=True,
-                            key=f"hist_btn_new_{coupon.get('id', idx)}"
-                        )
-        else:
-            st.info("Henüz kayıtlı kupon yok.")
+        _render_page("coupon", lambda c: _render_coupon(c, "hist_btn_new"), "coupon", "Henüz kayıtlı kupon yok.")
+        _render_archive("coupon", lambda c: _render_coupon(c, "hist_btn_archive"), "coupon")
 
     with ht2:
-        analyses = data_manager.get_user_analyses()
-        if analyses:
-            for analysis in analyses:
-                title = f"{analysis.get('match', 'Maç')} • {analysis.get('date', '')}".strip(" •")
-                with st.expander(title):
-                    summary = analysis.get("summary", {})
-                    if isinstance(summary, str):
-                        try:
-                            import json as _json
-                            summary = _json.loads(summary)
-                        except: summary = _clean_text(summary)
-
-                    if isinstance(summary, dict):
-                        st.markdown(f"**Ana Tercih:** {_clean_text(summary.get('ana_tercih', '-'))}")
-                        st.markdown(f"**Güven:** {_clean_text(summary.get('guven_skoru', '-'))}")
-                        st.markdown("**Detaylı Analiz:**")
-                        st.write(_clean_text(summary.get("analiz_metni", "")))
-                    else:
-                        st.write(_clean_text(summary))
-        else:
-            st.info("Henüz kayıtlı analiz yok.")
\ No newline at end of file
+        _render_page("analysis", _render_analysis, "analysis", "Henüz kayıtlı analiz yok.")
+        _render_archive("analysis", _render_analysis, "analysis")
@@ -0,0 +1,254 @@
+"""
+ai_engine yapay zeka yolu için yük testi / benchmark.
+
+Taklit Gemini sunucusuna (fake_gemini_server.py) karşı analyze_match_deep,
+generate_smart_coupon, analyze_spor_toto_column ve sohbeti eşzamanlı çalıştırır;
+throughput, gecikme yüzdelikleri ve kota (429) altında tekrar deneme davranışını raporlar.
+
+Örnekler:
+    python benchmarks/bench_ai_engine.py
+    python benchmarks/bench_ai_engine.py --latency lognormal:0.6,0.5 --rpm 60 --concurrency 16
+    python benchmarks/bench_ai_engine.py --rpm 20 --keys 3   # key havuzu ile kota dağıtımı
+    python benchmarks/bench_ai_engine.py --mixed --scenarios toto,coupon,chat --slots 2   # toplu yük altında sohbet
+    python benchmarks/bench_ai_engine.py --scenarios chat --model-latency 'gemini-2.5-flash=const:10'   # gecikme hedefi aşımı
+    python benchmarks/bench_ai_engine.py --endpoint http://127.0.0.1:8765 --scenarios analysis,chat
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+warnings.simplefilter("ignore")
+
+import fake_gemini_server  # noqa: E402
+from modules import ai_engine, model_registry, local_predictor, key_pool, ai_scheduler, model_router, analysis_cache, db_manager  # noqa: E402
+
+BENCH_KEY = "bench-key-0"  # oturum key'i de havuzda; taşma key'i yok
+
+SAMPLE_DETAILS = {
+    "yellow_box": ["📌 Ev sahibi son 5 iç saha maçında gol yemedi.", "⚠️ Deplasman ekibi 3 maçtır kazanamıyor."],
+    "player_stats": ["En Golcüler: Oyuncu A (9), Oyuncu B (6)"],
+    "h2h": [],
+    "comparison_stats": "Ev sahibi maç başına 1.8 gol atıyor. Deplasman son 4 maçta 7 gol yedi.",
+    "form_patterns": ["GGBGM", "MBMGB"],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _is_failure(result):
+    if isinstance(result, dict):
+        return result.get("ana_tercih") in ("Hata", "Trafik Yoğun")
+    if isinstance(result, str):
+        return result.startswith(("Üzgünüm", "API key", "Şu an tüm API"))
+    return result is None
+
+
+def _is_fallback(result):
+    return isinstance(result, dict) and result.get("kaynak") == "yerel_model"
+
+
+# --- SENARYOLAR (i: istek sırası; promptlar benzersiz ki single-flight birleştirmesin) ---
+
+def scenario_analysis(i):
+    return ai_engine.analyze_match_deep(
+        f"Ev Takımı {i}", f"Deplasman Takımı {i}", f"bench://mac/{i}",
+        ["Lider (50 P)", "İkinci (48 P)"], None, details=SAMPLE_DETAILS
+    )
+
+
+def scenario_coupon(i):
+    pool = []
+    for j in range(8):
+        home, away = f"Takım {i}-{j}A", f"Takım {i}-{j}B"
+        probs = local_predictor.predict_probabilities(home, away)
+        pool.append({
+            "home": home, "away": away, "lig": "Bench Ligi",
+            "insights": SAMPLE_DETAILS["yellow_box"],
+            "stats": local_predictor.format_probabilities(probs), "probs": probs,
+        })
+    return ai_engine.generate_smart_coupon(pool, 3, "🛡️ BANKO", "🛡️ BANKO", "🤖 Yapay Zeka Tercihi")
+
+
+def scenario_toto(i):
+    rows = [{"mac_no": j + 1, "home": f"Toto {i}-{j}A", "away": f"Toto {i}-{j}B", "date": "20.10 19:00"}
+            for j in range(15)]
+    return ai_engine.analyze_spor_toto_column(rows)
+
+
+def scenario_chat(i):
+    context = {"home_team": f"Ev {i % 4}", "away_team": f"Dep {i % 4}",
+               "analysis": {"ana_tercih": "MS 1", "analiz_metni": "Bench bağlamı."}, "details": SAMPLE_DETAILS}
+    return ai_engine.get_chat_response(f"Soru {i}: kim kazanır?", context, session_id=f"bench-{i % 4}")
+
+
+SCENARIOS = {
+    "analysis": scenario_analysis,
+    "coupon": scenario_coupon,
+    "toto": scenario_toto,
+    "chat": scenario_chat,
+}
+
+
+def run_scenario(name, fn, requests, concurrency):
+    def _task(i):
+        ai_engine.set_api_key(BENCH_KEY)  # context değişkeni thread'e geçmez
+        t0 = time.perf_counter()
+        try:
+            result = fn(i)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        return time.perf_counter() - t0, result, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(_task, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = [o[0] for o in outcomes]
+    failures = sum(1 for o in outcomes if o[2] is not None or _is_failure(o[1]))
+    fallbacks = sum(1 for o in outcomes if _is_fallback(o[1]))
+    return {
+        "scenario": name,
+        "requests": requests,
+        "ok": requests - failures - fallbacks,
+        "fallback": fallbacks,
+        "failed": failures,
+        "rps": requests / wall if wall else 0.0,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "max": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def _delta(after, before):
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ai_engine benchmark (taklit Gemini sunucusuna karşı)")
+    parser.add_argument("--endpoint", default="", help="Çalışan bir taklit sunucu (boşsa süreç içinde başlatılır)")
+    parser.add_argument("--latency", default="lognormal:0.4,0.5")
+    parser.add_argument("--model-latency", default="", help="Model başına gecikme: model=TANIM;model=TANIM")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=40, help="Senaryo başına istek")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--retry-wait", type=float, default=0.5,
+                        help="429 sonrası ilk bekleme (sn). Üretimde 10 sn; benchmark için kısaltılır.")
+    parser.add_argument("--keys", type=int, default=1, help="Havuza eklenecek taklit key sayısı")
+    parser.add_argument("--slots", type=int, default=ai_scheduler.MAX_CONCURRENT, help="Zamanlayıcı eşzamanlı istek slotu")
+    parser.add_argument("--mixed", action="store_true", help="Senaryoları sırayla değil aynı anda çalıştır")
+    args = parser.parse_args()
+
+    fake = None
+    endpoint = args.endpoint
+    if not endpoint:
+        _, fake, endpoint = fake_gemini_server.start(
+            latency=args.latency, error_rate=args.error_rate, rpm=args.rpm,
+            model_latency=args.model_latency,
+        )
+    model_registry.configure_endpoint(endpoint)
+    ai_engine.RETRY_BASE_WAIT = args.retry_wait
+    ai_engine.RETRY_WAIT_STEP = args.retry_wait
+    # Taklit key'ler; sunucu kotası key başına olduğu için havuz toplam kapasiteyi artırır
+    key_pool.POOL = key_pool.KeyPool(
+        [f"bench-key-{i}" for i in range(args.keys)],
+        rpm_limit=args.rpm or 10 ** 6, cooldown=args.retry_wait,
+    )
+    ai_scheduler.SCHEDULER = ai_scheduler.AIScheduler(slots=args.slots)
+    model_router.ROUTER = model_router.ModelRouter()
+    # Önceki çalıştırmaların kayıtlı analizleri ölçümü bozmasın: her çalıştırma boş bir önbellekle
+    workdir = tempfile.mkdtemp(prefix="bench_ai_")
+    analysis_cache.DB_PATH = os.path.join(workdir, "analysis_cache.db")
+    # Yerel model futbol.db'nin geçici kopyasını okur: şema hazırlığı / WAL data/futbol.db'ye dokunmasın
+    futbol_db = os.path.join(workdir, "futbol.db")
+    shutil.copy(db_manager.DB_PATH, futbol_db)
+    db_manager.DB_PATH = futbol_db
+
+    print(f"🧪 Uç nokta: {endpoint} | eşzamanlılık: {args.concurrency} | senaryo başı istek: {args.requests}")
+    header = f"{'senaryo':<10}{'istek':>7}{'ok':>6}{'yerel':>7}{'hata':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    rows = []
+    if args.mixed:
+        # Aynı anda: sayaç farkları senaryoya ayrılamaz, toplam olarak ilk satıra yazılır
+        retry_before = dict(ai_engine.RETRY_STATS)
+        server_before = dict(fake.counters) if fake else {}
+        results = {}
+        threads = [threading.Thread(target=lambda n=n: results.__setitem__(
+            n, run_scenario(n, SCENARIOS[n], args.requests, args.concurrency))) for n in names]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        for n in names:
+            row = results[n]
+            row["retry"], row["server"] = {}, {}
+            rows.append(row)
+        rows[0]["retry"] = _delta(ai_engine.RETRY_STATS, retry_before)
+        rows[0]["server"] = _delta(fake.counters, server_before) if fake else {}
+    else:
+        for name in names:
+            retry_before = dict(ai_engine.RETRY_STATS)
+            server_before = dict(fake.counters) if fake else {}
+            row = run_scenario(name, SCENARIOS[name], args.requests, args.concurrency)
+            row["retry"] = _delta(ai_engine.RETRY_STATS, retry_before)
+            row["server"] = _delta(fake.counters, server_before) if fake else {}
+            rows.append(row)
+
+    print(header)
+    for r in rows:
+        print(f"{r['scenario']:<10}{r['requests']:>7}{r['ok']:>6}{r['fallback']:>7}{r['failed']:>6}"
+              f"{r['rps']:>8.2f}{r['p50']:>9.0f}{r['p95']:>9.0f}{r['p99']:>9.0f}{r['max']:>9.0f}")
+
+    print("\n🔁 Tekrar deneme / kota davranışı")
+    for r in rows:
+        rt = r["retry"]
+        if not rt:
+            continue
+        attempts_per_call = rt["attempts"] / rt["calls"] if rt.get("calls") else 0.0
+        line = (f"  {r['scenario']:<10} deneme/çağrı: {attempts_per_call:.2f}  429: {rt['quota_errors']}  "
+                f"vazgeçilen: {rt['gave_up']}  yerel yedek: {rt['fallbacks']}")
+        if r["server"]:
+            line += f"  | sunucu: {r['server']['requests']} istek, {r['server']['throttled']} rpm-red, {r['server']['injected_429']} enjekte 429"
+        print(line)
+
+    print(f"\n🚦 Öncelik sınıfları (slot: {ai_scheduler.SCHEDULER.slots})")
+    for cls, st in ai_scheduler.SCHEDULER.stats().items():
+        if st["requests"]:
+            print(f"  {cls:<8} istek: {st['requests']:>4}  kuyruk p50/p95: {st['wait_p50_ms']}/{st['wait_p95_ms']} ms  "
+                  f"uçtan uca p50/p95: {st['p50_ms']}/{st['p95_ms']} ms")
+
+    router = model_router.ROUTER.stats()
+    print("\n🧭 Model yönlendirme")
+    for name, m in router["models"].items():
+        print(f"  {name:<24} istek: {m['requests']:>4}  hata: {m['errors']:>3}  429: {m['quota_errors']:>3}  "
+              f"p50/p95: {m['p50_ms']}/{m['p95_ms']} ms")
+    for task, picks in router["decisions"].items():
+        print(f"  {task:<10} " + ", ".join(f"{model}: {n}" for model, n in picks.items()))
+
+    print("\n🔑 Key havuzu")
+    for s in key_pool.POOL.stats():
+        print(f"  {s['key']:<12} istek: {s['requests']:>4}  429: {s['quota_errors']:>3}  son 60 sn: {s['rpm_used']}")
+
+    db_manager.close_connection()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+db_manager (futbol.db) erişim katmanı için benchmark.
+
+Aynı sorguları iki bağlantı modeliyle çalıştırır ve karşılaştırır:
+  - eski:  her çağrıda sqlite3.connect + close, varsayılan (rollback) journal
+  - yeni:  thread başına kalıcı bağlantı, WAL + ayarlı pragmalar, transaction()
+
+Senaryolar:
+  read    sadece okuma (takım performansı, form analizi, güncel hafta) - eşzamanlı thread'ler
+  mixed   aynı okumalar + arka planda sürekli maç sonucu yazan bir yazıcı
+  team    takım okuması: maç taraması (..._scan) / team_aggregates satırı, tek thread
+  ingest  bir sezonluk puan durumu + maç yüklemesi: satır başına işlem / ingest() ile tek işlem
+          (yeni bağlantı modeliyle; --leagues lig, lig başına 18 takım, çift devreli fikstür)
+
+Veritabanının geçici bir kopyası kullanılır; data/futbol.db değişmez.
+
+Örnekler:
+    python benchmarks/bench_db.py
+    python benchmarks/bench_db.py --requests 4000 --threads 8 --scenarios mixed
+    python benchmarks/bench_db.py --scenarios ingest --leagues 10
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules import db_manager  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+# --- ESKİ MODEL: çağrı başına bağlantı (db_manager'ın önceki hali) ---
+
+def _legacy_connection():
+    # Bağlantı çağıran fonksiyon bitince (referans sayısı düşünce) kapanır: connect/close her çağrıda
+    return sqlite3.connect(db_manager.DB_PATH, timeout=5)
+
+
+@contextmanager
+def _legacy_transaction(immediate=True):
+    conn = _legacy_connection()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def connection_model(name, db_path):
+    """db_manager'ı geçici kopyaya ve istenen bağlantı modeline yönlendirir."""
+    saved = (db_manager.DB_PATH, db_manager.get_db_connection, db_manager.transaction)
+    db_manager.DB_PATH = db_path
+    if name == "eski":
+        # Şema (indeksler) iki modelde aynı; sadece bağlantı modeli ve journal farklı
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        db_manager._migrate(conn)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        db_manager.get_db_connection = _legacy_connection
+        db_manager.transaction = _legacy_transaction
+    try:
+        yield
+    finally:
+        db_manager.DB_PATH, db_manager.get_db_connection, db_manager.transaction = saved
+
+
+def _teams(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT DISTINCT home_team FROM matches").fetchall()
+    finally:
+        conn.close()
+    return [r[0] for r in rows] or ["Takım"]
+
+
+def _read_op(teams, rng):
+    team = rng.choice(teams)
+    op = rng.randrange(3)
+    if op == 0:
+        db_manager.calculate_team_performance(team)
+    elif op == 1:
+        db_manager.get_form_analysis(team, rng.choice(("home", "away")))
+    else:
+        db_manager.get_current_week()
+
+
+def run(name, scenario, db_path, requests, threads):
+    teams = _teams(db_path)
+    stop = threading.Event()
+    writes = [0]
+
+    def _writer():
+        rng = random.Random(1)
+        while not stop.is_set():
+            home, away = rng.sample(teams, 2) if len(teams) > 1 else (teams[0], teams[0])
+            db_manager.save_match_result(99, home, away, rng.randrange(5), rng.randrange(5), 0)
+            writes[0] += 1
+
+    def _task(i):
+        rng = random.Random(i)
+        t0 = time.perf_counter()
+        _read_op(teams, rng)
+        return time.perf_counter() - t0
+
+    with connection_model(name, db_path):
+        writer = threading.Thread(target=_writer, daemon=True) if scenario == "mixed" else None
+        if writer:
+            writer.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(_task, range(requests)))
+        wall = time.perf_counter() - start
+        stop.set()
+        if writer:
+            writer.join()
+        db_manager.close_connection()
+
+    return {
+        "model": name,
+        "scenario": scenario,
+        "ops": requests / wall if wall else 0.0,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "writes": writes[0] / wall if wall else 0.0,
+    }
+
+
+def season_rows(leagues, teams_per_league=18):
+    """Sentetik sezon: (takım satırları, maç satırları) - db_manager.ingest formatında."""
+    rng = random.Random(7)
+    teams, matches = [], []
+    for lg in range(leagues):
+        names = [f"L{lg} Takım {i}" for i in range(teams_per_league)]
+        for name in names:
+            w, d, l = rng.randrange(20), rng.randrange(10), rng.randrange(15)
+            teams.append({"name": name, "played": w + d + l, "wins": w, "draws": d, "losses": l,
+                          "goals_for": rng.randrange(70), "goals_against": rng.randrange(70),
+                          "points": 3 * w + d})
+        week = 0
+        for i, home in enumerate(names):
+            for away in names[i + 1:]:
+                week += 1
+                matches.append((1000 + week, home, away, rng.randrange(5), rng.randrange(5), 1))
+                matches.append((2000 + week, away, home, rng.randrange(5), rng.randrange(5), 1))
+    return teams, matches
+
+
+def run_ingest(mode, db_path, leagues):
+    teams, matches = season_rows(leagues)
+    with connection_model("yeni", db_path):
+        db_manager.get_db_connection()  # şema hazırlığı ölçüme girmesin
+        start = time.perf_counter()
+        if mode == "satır":
+            for t in teams:
+                db_manager.update_team_stats(t)
+            for m in matches:
+                db_manager.save_match_result(*m)
+        else:
+            db_manager.ingest(teams, matches)
+        wall = time.perf_counter() - start
+        db_manager.close_connection()
+    rows = len(teams) + len(matches)
+    return {"mode": mode, "rows": rows, "seconds": wall, "rate": rows / wall if wall else 0.0}
+
+
+def run_team_reads(mode, db_path, requests):
+    teams = _teams(db_path)
+    if mode == "tarama":
+        perf, form = db_manager.calculate_team_performance_scan, db_manager.get_form_analysis_scan
+    else:
+        perf, form = db_manager.calculate_team_performance, db_manager.get_form_analysis
+    rng = random.Random(3)
+    latencies = []
+    with connection_model("yeni", db_path):
+        db_manager.get_db_connection()
+        for _ in range(requests):
+            team = rng.choice(teams)
+            t0 = time.perf_counter()
+            perf(team)
+            form(team, "home")
+            latencies.append(time.perf_counter() - t0)
+        db_manager.close_connection()
+    return {"mode": mode, "p50": percentile(latencies, 50) * 1e6, "p95": percentile(latencies, 95) * 1e6,
+            "ops": len(latencies) / sum(latencies) if latencies else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="db_manager bağlantı modeli benchmark'ı")
+    parser.add_argument("--requests", type=int, default=2000, help="Senaryo başına okuma")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--scenarios", default="read,mixed,team,ingest")
+    parser.add_argument("--leagues", type=int, default=5, help="ingest senaryosunda lig sayısı")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+    rows, team_rows, ingest_rows = [], [], []
+    try:
+        for scenario in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if scenario == "team":
+                db_path = os.path.join(workdir, "team.db")
+                shutil.copy(db_manager.DB_PATH, db_path)
+                for mode in ("tarama", "toplam"):
+                    team_rows.append(run_team_reads(mode, db_path, args.requests))
+                continue
+            if scenario == "ingest":
+                for mode in ("satır", "toplu"):
+                    db_path = os.path.join(workdir, f"ingest_{mode}.db")
+                    shutil.copy(db_manager.DB_PATH, db_path)
+                    ingest_rows.append(run_ingest(mode, db_path, args.leagues))
+                continue
+            for name in ("eski", "yeni"):
+                # Her ölçüm kendi taze kopyasında: yazıcının eklediği satırlar diğerini etkilemesin
+                db_path = os.path.join(workdir, f"{scenario}_{name}.db")
+                shutil.copy(db_manager.DB_PATH, db_path)
+                rows.append(run(name, scenario, db_path, args.requests, args.threads))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if rows:
+        print(f"🧪 {args.requests} okuma, {args.threads} thread")
+        print(f"{'senaryo':<9}{'model':<7}{'okuma/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'yazma/s':>10}")
+        for r in rows:
+            print(f"{r['scenario']:<9}{r['model']:<7}{r['ops']:>10.0f}{r['p50']:>9.2f}{r['p95']:>9.2f}"
+                  f"{r['p99']:>9.2f}{r['writes']:>10.0f}")
+    if team_rows:
+        print(f"🧪 takım performansı + form analizi, {args.requests} okuma")
+        print(f"{'yöntem':<8}{'okuma/s':>10}{'p50 µs':>9}{'p95 µs':>9}")
+        for r in team_rows:
+            print(f"{r['mode']:<8}{r['ops']:>10.0f}{r['p50']:>9.1f}{r['p95']:>9.1f}")
+    if ingest_rows:
+        print(f"🧪 sezon yüklemesi, {args.leagues} lig")
+        print(f"{'yöntem':<8}{'satır':>8}{'süre ms':>10}{'satır/s':>10}")
+        for r in ingest_rows:
+            print(f"{r['mode']:<8}{r['rows']:>8}{r['seconds'] * 1000:>10.1f}{r['rate']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
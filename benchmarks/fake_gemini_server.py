@@ -0,0 +1,241 @@
+"""
+Yerel Gemini taklit sunucusu (generateContent REST API).
+
+Gerçek key ve kota harcamadan modules/ai_engine.py'yi yük altında denemek için:
+  - Ayarlanabilir gecikme dağılımı (sabit, uniform, lognormal), istenirse model başına
+  - 429 (RESOURCE_EXHAUSTED) enjeksiyonu: rastgele oran ve/veya key başına dakikalık istek kotası
+  - streamGenerateContent desteği (parçalı JSON dizi)
+  - Prompt içeriğine göre hazır JSON yanıtlar (maç analizi, kupon, Spor Toto, sohbet)
+
+Kullanım:
+    python benchmarks/fake_gemini_server.py --port 8765 --latency lognormal:0.8,0.4 --rpm 30
+Uygulamayı yönlendirmek için:
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_latency(spec):
+    """
+    Gecikme tanımını saniye üreten fonksiyona çevirir.
+    "0.3" / "const:0.3" / "uniform:0.1,0.6" / "lognormal:mu,sigma" (sigma log-uzayında)
+    """
+    spec = (spec or "0").strip()
+    kind, _, args = spec.partition(":") if ":" in spec else ("const", "", spec)
+    values = [float(x) for x in args.split(",") if x.strip()]
+    if kind == "const":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        # mu: medyan gecikme (saniye), sigma: yayılım
+        import math
+        median, sigma = values[0], values[1]
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Bilinmeyen gecikme tanımı: {spec}")
+
+
+def parse_model_latency(spec):
+    """ "gemini-2.5-flash=const:3;gemini-2.5-flash-lite=const:0.5" -> {model: fonksiyon} """
+    result = {}
+    for item in (spec or "").split(";"):
+        if "=" in item:
+            model, _, latency = item.partition("=")
+            result[model.strip()] = parse_latency(latency)
+    return result
+
+
+CANNED_ANALYSIS = {
+    "ana_tercih": "MS 1",
+    "guven_skoru": "%68",
+    "surpriz_tercih": "KG Var",
+    "macin_yildizi": "Test Oyuncu",
+    "kritik_faktor": "Taklit sunucu yanıtı",
+    "analiz_metni": "Bu yanıt benchmark amaçlı yerel sunucudan gelmektedir.",
+}
+
+
+def canned_text(prompt):
+    """Prompt'taki JSON şablonuna bakarak uygun hazır yanıtı seçer."""
+    if "mac_no" in prompt and "banko_tercih" in prompt:
+        count = max(1, len(re.findall(r"MAÇ \d+:", prompt)))
+        return json.dumps([
+            {"mac_no": i + 1, "karsilasma": f"Takım {i + 1}A - Takım {i + 1}B", "tahmin": "1",
+             "banko_tercih": "1.5 Üst", "neden": "Taklit yanıt"}
+            for i in range(count)
+        ], ensure_ascii=False)
+    if "oran_tahmini" in prompt:
+        found = re.search(r"EN UYGUN (\d+) maçlık", prompt)
+        count = int(found.group(1)) if found else 3
+        return json.dumps([
+            {"mac": f"Takım {i + 1}A - Takım {i + 1}B", "tahmin": "MS 1", "oran_tahmini": "1.45 - 1.60",
+             "guven": "%70", "neden": "Taklit yanıt", "uygunluk": "tam_uyumlu"}
+            for i in range(count)
+        ], ensure_ascii=False)
+    if "ana_tercih" in prompt:
+        return json.dumps(CANNED_ANALYSIS, ensure_ascii=False)
+    return "Taklit sunucu: Ev sahibi formda, gol beklentisi yüksek."
+
+
+class FakeGemini:
+    def __init__(self, latency="0", error_rate=0.0, rpm=0, stream_chunks=4, model_latency=""):
+        self.latency = parse_latency(latency)
+        self.model_latency = parse_model_latency(model_latency)
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.stream_chunks = stream_chunks
+        self._lock = threading.Lock()
+        self._windows = {}  # api key -> son 60 sn'deki istek zamanları
+        self.counters = {"requests": 0, "ok": 0, "throttled": 0, "injected_429": 0, "stream": 0, "count_tokens": 0}
+
+    def latency_for(self, model):
+        return self.model_latency.get(model, self.latency)()
+
+    def _count(self, field):
+        with self._lock:
+            self.counters[field] += 1
+
+    def admit(self, api_key=""):
+        """429 dönülmesi gerekiyorsa sebebini, aksi halde None döndürür. Kota key başınadır."""
+        if self.error_rate and random.random() < self.error_rate:
+            self._count("injected_429")
+            return "injected"
+        if self.rpm:
+            now = time.time()
+            with self._lock:
+                window = self._windows.setdefault(api_key, deque())
+                while window and now - window[0] > 60:
+                    window.popleft()
+                if len(window) >= self.rpm:
+                    self.counters["throttled"] += 1
+                    return "rpm"
+                window.append(now)
+        return None
+
+
+def _prompt_of(body):
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    system = body.get("systemInstruction") or body.get("system_instruction") or {}
+    for part in system.get("parts", []):
+        parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _response(text, prompt, model, finish=True):
+    chunk = {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "index": 0,
+        }],
+        "modelVersion": model,
+    }
+    if finish:
+        chunk["candidates"][0]["finishReason"] = "STOP"
+        prompt_tokens = max(1, len(prompt) // 4)
+        out_tokens = max(1, len(text) // 4)
+        chunk["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": out_tokens,
+            "totalTokenCount": prompt_tokens + out_tokens,
+        }
+    return chunk
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            fake._count("requests")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.split("?")[0]
+            found = re.search(r"/models/([^/:]+):(\w+)$", path)
+            if not found:
+                return self._send(404, {"error": {"code": 404, "message": f"Bilinmeyen yol: {path}", "status": "NOT_FOUND"}})
+            model, method = found.groups()
+            prompt = _prompt_of(body)
+
+            if method == "countTokens":
+                fake._count("count_tokens")
+                return self._send(200, {"totalTokens": max(1, len(prompt) // 4)})
+
+            reason = fake.admit(self.headers.get("x-goog-api-key", ""))
+            if reason:
+                return self._send(429, {"error": {
+                    "code": 429,
+                    "message": f"Resource has been exhausted (e.g. check quota). [{reason}]",
+                    "status": "RESOURCE_EXHAUSTED",
+                }})
+
+            time.sleep(max(0.0, fake.latency_for(model)))
+            text = canned_text(prompt)
+
+            if method == "streamGenerateContent":
+                fake._count("stream")
+                size = max(1, len(text) // fake.stream_chunks + 1)
+                pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+                chunks = [_response(p, prompt, model, finish=(i == len(pieces) - 1)) for i, p in enumerate(pieces)]
+                fake._count("ok")
+                return self._send(200, chunks)
+
+            fake._count("ok")
+            return self._send(200, _response(text, prompt, model))
+
+    return Handler
+
+
+def start(port=0, host="127.0.0.1", **options):
+    """Sunucuyu arka plan thread'inde başlatır. (server, fake, endpoint) döndürür."""
+    fake = FakeGemini(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Gemini taklit sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="uniform:0.3,1.2", help="const:S | uniform:A,B | lognormal:MEDYAN,SIGMA")
+    parser.add_argument("--model-latency", default="", help="Model başına gecikme: model=TANIM;model=TANIM")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Rastgele 429 oranı (0-1)")
+    parser.add_argument("--rpm", type=int, default=0, help="Key başına dakikalık istek kotası (0 = sınırsız)")
+    args = parser.parse_args()
+
+    server, fake, endpoint = start(args.port, args.host, latency=args.latency,
+                                   error_rate=args.error_rate, rpm=args.rpm,
+                                   model_latency=args.model_latency)
+    print(f"🧪 Taklit Gemini sunucusu: {endpoint}  (Ctrl+C ile durdur)")
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print(f"\nSayaçlar: {fake.counters}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,57 @@
 import json
 import os
 import time
+import contextvars
+import threading
 import unicodedata
 import re
-import google.generativeai as genai
-from modules import scraper
+from modules import scraper, chat_sessions, model_registry, local_predictor, coupon_scorer, single_flight, key_pool, ai_scheduler, model_router, relevance, chat_cache, telemetry, analysis_cache, deadline
 
 # API KEY
+# Ortam değişkenindeki key varsayılandır; Streamlit oturumları kendi key'lerini set_api_key ile atar.
 API_KEY = os.getenv("GOOGLE_API_KEY", "")
-if API_KEY:
-    genai.configure(api_key=API_KEY)
+_SESSION_API_KEY = contextvars.ContextVar("gemini_api_key", default="")
 
 # --- MODEL AYARI ---
-# Listeden teyit ettiğimiz kararlı ve hızlı model
-CURRENT_MODEL = 'gemini-2.5-flash'
+# Model görev bazında seçilir: bkz. model_router.DEFAULT_ROUTES (AI_MODEL_ROUTES ile ezilebilir)
+
+# --- KOTA (429) TEKRAR DENEME AYARLARI ---
+MAX_RETRIES = 5
+RETRY_BASE_WAIT = 10  # saniye
+RETRY_WAIT_STEP = 10  # her denemede eklenen bekleme
+
+# Süre bütçesinde bundan az kaldıysa yeni bir yapay zeka denemesi başlatılmaz (sn)
+MIN_AI_SECONDS = 3
+# Tek bir model isteğinin üst sınırı (sn); bütçe varsa kalan süreyle daha da kısalır
+REQUEST_TIMEOUT = 120
+
+# --- BAĞLAM SEÇİMİ (relevance / BM25) ---
+COMPARISON_TOP_N = 8     # analiz prompt'una giren karşılaştırma cümlesi
+CHAT_CONTEXT_TOP_N = 6   # sohbette soru başına eklenen bağlam dilimi
+
+# Tekrar deneme sayaçları (benchmark ve izleme için)
+_stats_lock = threading.Lock()
+RETRY_STATS = {"calls": 0, "attempts": 0, "quota_errors": 0, "api_errors": 0, "fallbacks": 0, "gave_up": 0}
+
+def _bump(field, n=1):
+    with _stats_lock:
+        RETRY_STATS[field] += n
 
 def set_api_key(api_key):
-    """Uygulama içinde dinamik API key atamak için."""
-    global API_KEY
+    """
+    Uygulama içinde dinamik API key atamak için.
+    Sadece çağıran oturumu (thread/context) etkiler; diğer kullanıcıların key'i değişmez.
+    """
     if api_key:
-        API_KEY = api_key
-        genai.configure(api_key=api_key)
+        _SESSION_API_KEY.set(api_key)
+
+def get_api_key():
+    """Bu oturumda geçerli API key."""
+    return _SESSION_API_KEY.get() or API_KEY
+
+def warm_up():
+    """İlk analizin istemci kurulum maliyetini ödememesi için modeli önceden hazırlar."""
+    model_registry.warm_up(get_api_key(), model_router.ROUTER.primary_models())
 
 def normalize_text(text):
     """Türkçe karakterleri ve boşlukları normalize eder."""
@@ -65,49 +96,232 @@ def clean_json_response(response_text):
             "analiz_metni": response_text
         }
 
-def call_ai_with_retry(system_prompt, user_data):
+def call_ai_with_retry(system_prompt, user_data, fallback=None, priority=ai_scheduler.SINGLE,
+                       task=model_router.ANALYSIS):
     """
     Yapay Zeka çağrısını yapar. 429 (Kota) hatası alırsa bekler.
     JSON formatında yanıt zorlar.
+    fallback verilirse, kota denemeleri tükendiğinde onun sonucu döner.
+    Aynı prompt için eşzamanlı çağrılar tek bir Gemini isteğini paylaşır.
+    priority: ai_scheduler sınıfı (CHAT / SINGLE / BATCH); slot sırası buna göre belirlenir.
+    task: model_router görev tipi; model her denemede gecikme/kota durumuna göre seçilir.
     """
-    if not API_KEY:
+    api_key = get_api_key()
+    if not api_key:
         return {
             "ana_tercih": "Hata",
             "analiz_metni": "API key bulunamadı. Lütfen Google API key giriniz."
         }
-    # JSON modunu zorluyoruz
-    model = genai.GenerativeModel(CURRENT_MODEL, 
-                                  generation_config={"response_mime_type": "application/json"})
-    
-    max_retries = 5
-    wait_time = 10 
-    
-    for attempt in range(max_retries):
+    key = single_flight.fingerprint(task, system_prompt, user_data)
+    try:
+        with ai_scheduler.SCHEDULER.track(priority):
+            result, shared = single_flight.FLIGHTS.run(
+                "ai", key, _call_ai_with_retry, api_key, system_prompt, user_data, fallback, priority, task
+            )
+    except TimeoutError:
+        # Aynı prompt'u çalıştıran başka bir çağrıyı beklerken bu isteğin süresi doldu
+        deadline.skip("yapay zeka")
+        return _give_up(fallback)
+    if shared:
+        # Aynı prompt'u çalıştıran başka bir çağrının sonucunu paylaştık
+        telemetry.mark(cache_hit=True)
+    return result
+
+def _is_quota_error(error_msg):
+    return "429" in error_msg or "Quota" in error_msg or "Resource has been exhausted" in error_msg
+
+def _acquire_key(preferred, model=None):
+    """
+    Oturumun kendi key'i sağlıklıysa o; doluysa (dakikalık kota / 429) en az yüklü sağlıklı
+    ortak key; hiçbiri yoksa None. Kendi key havuza özel olarak kaydedilir: yükü izlenir,
+    başka oturumlara verilmez.
+    """
+    key_pool.POOL.register(preferred, shared=False)
+    return key_pool.POOL.acquire(preferred, model)
+
+def _choose_model(task):
+    return model_router.ROUTER.choose(task, quota_ok=key_pool.POOL.has_healthy)
+
+def _generate(key, model_name, prompt, generation_config=None):
+    """Tek model çağrısı; gecikmeyi ve sonucu key havuzuna ve model yönlendiriciye bildirir."""
+    t0 = time.perf_counter()
+    try:
+        response = model_registry.get_model(key, model_name, generation_config).generate_content(
+            prompt, request_options={"timeout": deadline.timeout(REQUEST_TIMEOUT)}
+        )
+        text = response.text
+    except Exception as e:
+        quota = _is_quota_error(str(e))
+        key_pool.POOL.release(key, quota_error=quota, model=model_name)
+        model_router.ROUTER.record(model_name, time.perf_counter() - t0, ok=False, quota_error=quota)
+        telemetry.add_usage(model_name, None, time.perf_counter() - t0)
+        raise
+    key_pool.POOL.release(key)
+    model_router.ROUTER.record(model_name, time.perf_counter() - t0)
+    telemetry.add_usage(model_name, response, time.perf_counter() - t0)
+    return text
+
+def _send_chat(chat, key, model_name, message):
+    """
+    Tek sohbet turu (_generate gibi gecikmeyi ve sonucu key havuzuna ve model yönlendiriciye
+    bildirir). ("ok", yanıt) / ("quota", mesaj) / ("error", mesaj) döner.
+    """
+    chat_sessions.trim_history(chat)
+    t0 = time.perf_counter()
+    try:
+        response = chat.send_message(message)
+        text = response.text.strip()
+    except Exception as e:
+        quota = _is_quota_error(str(e))
+        key_pool.POOL.release(key, quota_error=quota, model=model_name)
+        model_router.ROUTER.record(model_name, time.perf_counter() - t0, ok=False, quota_error=quota)
+        telemetry.add_usage(model_name, None, time.perf_counter() - t0)
+        return ("quota" if quota else "error"), str(e)
+    key_pool.POOL.release(key)
+    model_router.ROUTER.record(model_name, time.perf_counter() - t0)
+    telemetry.add_usage(model_name, response, time.perf_counter() - t0)
+    return "ok", text
+
+def _generate_json(key, model_name, prompt):
+    """Tek deneme. ("ok", sonuç) / ("quota", mesaj) / ("error", mesaj) döner."""
+    _bump("attempts")
+    try:
+        # JSON modunu zorluyoruz
+        text = _generate(key, model_name, prompt, model_registry.JSON_CONFIG)
+        return "ok", clean_json_response(text)
+    except Exception as e:
+        error_msg = str(e)
+        return ("quota" if _is_quota_error(error_msg) else "error"), error_msg
+
+def _call_ai_with_retry(api_key, system_prompt, user_data, fallback, priority=ai_scheduler.SINGLE,
+                        task=model_router.ANALYSIS):
+    prompt = f"{system_prompt}\n\nVeriler:\n{json.dumps(user_data)}"
+    _bump("calls")
+    outcome, value = _with_retry(api_key, lambda key, model_name: _generate_json(key, model_name, prompt),
+                                 priority, task)
+    if outcome == "ok":
+        return value
+    if outcome == "error":
+        _bump("api_errors")
+        telemetry.mark(error=True)
+        return {
+            "ana_tercih": "Hata",
+            "analiz_metni": f"Kritik API Hatası: {value}"
+        }
+    return _give_up(fallback)
+
+def _with_retry(api_key, attempt, priority=ai_scheduler.SINGLE, task=model_router.ANALYSIS):
+    """
+    Analiz, kupon ve sohbetin ortak deneme döngüsü. Her denemede model yönlendiriciden model,
+    key havuzundan key seçilir ve attempt(key, model_name) çağrılır; attempt ("ok", sonuç) /
+    ("quota", mesaj) / ("error", mesaj) döner. 429'da başka key/model boşsa hemen, değilse
+    artan beklemeyle tekrar denenir.
+    ("ok", sonuç) / ("error", mesaj) / ("gave_up", None) döner.
+    """
+    max_retries = MAX_RETRIES
+    wait_time = RETRY_BASE_WAIT
+
+    for attempt_no in range(max_retries):
+        if not deadline.allows(MIN_AI_SECONDS):
+            deadline.skip("yapay zeka")
+            break
+        # Slot sadece istek süresince tutulur; beklemeler slot dışında
         try:
-            response = model.generate_content(f"{system_prompt}\n\nVeriler:\n{json.dumps(user_data)}")
-            return clean_json_response(response.text)
-        except Exception as e:
-            error_msg = str(e)
-            # Hata kodu 429 veya Quota ise bekle
-            if "429" in error_msg or "Quota" in error_msg or "Resource has been exhausted" in error_msg:
-                print(f"⚠️ {CURRENT_MODEL} kotası dolu. {wait_time} saniye bekleniyor... (Deneme {attempt+1}/{max_retries})")
-                time.sleep(wait_time)
-                wait_time += 10 # Bekleme süresini artır
-            else:
-                return {
-                    "ana_tercih": "Hata",
-                    "analiz_metni": f"Kritik API Hatası: {error_msg}"
-                }
+            with ai_scheduler.SCHEDULER.slot(priority, timeout=deadline.remaining()):
+                model_name = _choose_model(task)
+                key = _acquire_key(api_key, model_name)
+                if key is not None:
+                    outcome, value = attempt(key, model_name)
+        except TimeoutError:
+            deadline.skip("yapay zeka kuyruğu")
+            break
+
+        if key is None:
+            # Tüm key'ler dinlenmede veya dakikalık kotada: en erken açılanı bekle
+            pause = min(wait_time, max(key_pool.POOL.next_available_in(model_name, api_key), 0.1))
+            print(f"⚠️ Tüm API key'leri dolu. {pause:.0f} saniye bekleniyor... (Deneme {attempt_no+1}/{max_retries})")
+            deadline.sleep(pause)
+            wait_time += RETRY_WAIT_STEP
+            continue
+
+        if outcome == "ok":
+            return outcome, value
+        if outcome == "error" and deadline.expired():
+            # İstek süre bütçesi yüzünden kesildi: hata değil, yedeğe düşülür
+            deadline.skip("yapay zeka")
+            break
+        if outcome == "error":
+            return outcome, value
+
+        # Hata kodu 429 veya Quota ise bekle
+        _bump("quota_errors")
+        next_model = _choose_model(task)
+        if next_model != model_name or key_pool.POOL.has_healthy(model_name, api_key):
+            # Başka bir key'in ya da daha hafif modelin kotası boş: beklemeden onunla dene
+            print(f"⚠️ {key_pool.mask_key(key)} / {model_name} kotası dolu, {next_model} ile tekrar deneniyor... (Deneme {attempt_no+1}/{max_retries})")
+            continue
+        print(f"⚠️ {model_name} kotası dolu. {wait_time} saniye bekleniyor... (Deneme {attempt_no+1}/{max_retries})")
+        deadline.sleep(wait_time)
+        wait_time += RETRY_WAIT_STEP # Bekleme süresini artır
+    return "gave_up", None
+
+def _give_up(fallback):
+    """Yapay zeka yanıtı alınamadı: yedek (yerel tahmin) ya da kullanıcıya gösterilecek hata."""
+    _bump("gave_up")
+    timed_out = deadline.expired() or not deadline.allows(MIN_AI_SECONDS)
+    if fallback:
+        _bump("fallbacks")
+        telemetry.mark(fallback=True)
+        if timed_out:
+            print("⏱️ Süre bütçesi doldu, yerel tahmine geçiliyor.")
+            result = fallback()
+            if isinstance(result, dict):
+                result["sure_asimi"] = True
+            return result
+        print("⚠️ Kota denemeleri tükendi, yerel tahmine geçiliyor.")
+        return fallback()
+    telemetry.mark(error=True)
+    if timed_out:
+        return {
+            "ana_tercih": "Trafik Yoğun",
+            "analiz_metni": "Yapay zeka yanıtı süre sınırı içinde alınamadı. Lütfen biraz sonra tekrar deneyiniz.",
+            "sure_asimi": True
+        }
     return {
         "ana_tercih": "Trafik Yoğun",
         "analiz_metni": "Üzgünüm, Google API şu an aşırı yoğun. Lütfen 1 dakika sonra tekrar deneyiniz."
     }
 
-def get_chat_response(question, context_data):
+def _build_chat_instruction(home_team, away_team, context_payload):
+    """Sohbet oturumunun sabit bağlamı. Oturum başına bir kez üretilir."""
+    context_text = json.dumps(context_payload, ensure_ascii=False)
+    return (
+        f"Sen bir futbol analistisin. Şu an {home_team} - {away_team} maçını analiz ediyoruz. "
+        f"Elindeki veriler: {context_text}. "
+        "Kullanıcının sorusuna SADECE bu verilere dayanarak kısa ve net cevap ver. "
+        "Eğer maç dışı bir soru gelirse (örn: hava durumu, siyaset, başka ligler) "
+        "kibarca sadece bu maçı konuşabileceğini söyle."
+    )
+
+def _chat_passages(details):
+    """Scrape edilmiş maç detaylarını sohbette seçilebilir bağlam dilimlerine böler."""
+    if not details:
+        return []
+    passages = list(details.get("yellow_box", [])) + list(details.get("player_stats", [])) + list(details.get("h2h", []))
+    passages += relevance.split_sentences(details.get("comparison_stats", ""))
+    return passages
+
+@telemetry.tracked("get_chat_response")
+def get_chat_response(question, context_data, session_id=None):
     """
     Analiz edilen maç bağlamında kısa ve net yanıt verir.
+    Aynı maç için açılmış sohbet oturumu varsa onu kullanır; bağlam tekrar kurulmaz.
+    context_data["details"] (ham maç detayları) verilirse, her soruya sadece onunla
+    ilgili dilimler (BM25) eklenir; ham metnin tamamı oturum bağlamına girmez.
+    Aynı maç/analiz için daha önce sorulmuş benzer bir soru önbellekten yanıtlanır.
     """
-    if not API_KEY:
+    api_key = get_api_key()
+    if not api_key:
         return "API key bulunamadı. Lütfen Google API key giriniz."
 
     context_payload = context_data or {}
@@ -123,23 +337,75 @@ def get_chat_response(question, context_data):
         or context_payload.get("match", {}).get("away")
         or "Deplasman"
     )
-    context_text = json.dumps(context_payload, ensure_ascii=False)
 
-    system_prompt = (
-        f"Sen bir futbol analistisin. Şu an {home_team} - {away_team} maçını analiz ediyoruz. "
-        f"Elindeki veriler: {context_text}. "
-        "Kullanıcının sorusuna SADECE bu verilere dayanarak kısa ve net cevap ver. "
-        "Eğer maç dışı bir soru gelirse (örn: hava durumu, siyaset, başka ligler) "
-        "kibarca sadece bu maçı konuşabileceğini söyle."
-    )
+    key = chat_sessions.session_key(session_id, home_team, away_team, context_payload)
+    cache_scope = (home_team, away_team, key[3])
+    question_tokens = chat_cache.question_tokens(question)
+    details = context_payload.get("details")
+    instruction_payload = {k: v for k, v in context_payload.items() if k != "details"}
 
-    model = genai.GenerativeModel(CURRENT_MODEL)
-    try:
-        response = model.generate_content(f"{system_prompt}\n\nSoru: {question}")
-        return response.text.strip()
-    except Exception as e:
-        return f"Üzgünüm, şu an yanıt veremiyorum. ({e})"
+    def _new_chat(chat_key, model_name, history=None):
+        model = model_registry.new_model(
+            chat_key, model_name,
+            system_instruction=_build_chat_instruction(home_team, away_team, instruction_payload)
+        )
+        chat = model.start_chat(history=history)
+        chat.api_key = chat_key
+        chat.model_name = model_name
+        return chat
+
+    def _bound_chat(chat_key, model_name):
+        """Oturumu bu denemenin key'ine ve modeline bağlar; değiştiyse konuşma yeni oturumda sürer."""
+        chat = chat_sessions.SESSIONS.get_or_create(key, lambda: _new_chat(chat_key, model_name))
+        if (getattr(chat, "api_key", chat_key), getattr(chat, "model_name", model_name)) != (chat_key, model_name):
+            # Key kotaya takıldı ya da yönlendirici modeli değiştirdi (gecikme hedefi/kota)
+            history = list(chat.history)
+            chat_sessions.SESSIONS.drop(key)
+            chat = chat_sessions.SESSIONS.get_or_create(key, lambda: _new_chat(chat_key, model_name, history))
+        return chat
+
+    cached = chat_cache.ANSWERS.get(cache_scope, question_tokens)
+    if cached is not None:
+        # Önbellekten gelen tur da oturum geçmişine yazılır: takip sorusu ("peki neden?") bu turu görür
+        chat = chat_sessions.SESSIONS.get_or_create(key, lambda: _new_chat(api_key, _choose_model(model_router.CHAT)))
+        chat_sessions.append_turn(chat, question, cached)
+        telemetry.mark(cache_hit=True)
+        return cached
+
+    slices = relevance.select_passages(_chat_passages(details), question, CHAT_CONTEXT_TOP_N)
+    message = question
+    if slices:
+        message = "İlgili maç verileri:\n- " + "\n- ".join(slices) + f"\n\nSoru: {question}"
+
+    def _attempt(chat_key, model_name):
+        try:
+            chat = _bound_chat(chat_key, model_name)
+        except Exception as e:
+            key_pool.POOL.release(chat_key)
+            return "error", str(e)
+        return _send_chat(chat, chat_key, model_name, message)
+
+    # Analizlerle aynı deneme yolu: key havuzu, 429'da başka key/model ya da artan bekleme
+    with ai_scheduler.SCHEDULER.track(ai_scheduler.CHAT):
+        outcome, value = _with_retry(api_key, _attempt, ai_scheduler.CHAT, model_router.CHAT)
+    if outcome == "ok":
+        chat_cache.ANSWERS.put(cache_scope, question_tokens, question, value)
+        return value
+    telemetry.mark(error=True)
+    if outcome == "error":
+        # Bozulmuş oturumu at, bir sonraki soru temiz oturumla başlasın
+        chat_sessions.SESSIONS.drop(key)
+        return f"Üzgünüm, şu an yanıt veremiyorum. ({value})"
+    if deadline.expired() or not deadline.allows(MIN_AI_SECONDS):
+        return "Üzgünüm, yanıt süre sınırı içinde alınamadı. Lütfen biraz sonra tekrar deneyin."
+    wait = key_pool.POOL.next_available_in(_choose_model(model_router.CHAT), api_key)
+    return f"Şu an tüm API kotaları dolu, lütfen {wait:.0f} saniye sonra tekrar deneyin."
+
+def reset_chat(session_id):
+    """Kullanıcının açık sohbet oturumlarını kapatır (yeni analizde çağrılır)."""
+    chat_sessions.SESSIONS.drop_owner(session_id)
 
+@telemetry.tracked("analyze_league_overview")
 def analyze_league_overview(league_name, stats_data):
     """
     Ligin TAKIM İSTATİSTİKLERİNİ yorumlar (JSON değil Text dönebilir).
@@ -148,28 +414,84 @@ def analyze_league_overview(league_name, stats_data):
     if not raw_stats: return "⚠️ Veri çekilemedi."
     stats_text = "\n".join(raw_stats)
 
+    api_key = get_api_key()
+    if not api_key: return "API key bulunamadı."
+
     # Burası düz metin (text) dönebilir
-    model = genai.GenerativeModel(CURRENT_MODEL)
+    prompt = f"Bu lig istatistiklerini analiz et, liderleri ve sürprizleri yaz:\n{stats_text}"
+
+    def _run():
+        with ai_scheduler.SCHEDULER.slot(ai_scheduler.BATCH):
+            model_name = _choose_model(model_router.LEAGUE)
+            key = _acquire_key(api_key, model_name) or api_key
+            return _generate(key, model_name, prompt)
+
     try:
-        response = model.generate_content(f"Bu lig istatistiklerini analiz et, liderleri ve sürprizleri yaz:\n{stats_text}")
-        return response.text
+        with ai_scheduler.SCHEDULER.track(ai_scheduler.BATCH):
+            text, shared = single_flight.FLIGHTS.run("ai", single_flight.fingerprint(model_router.LEAGUE, prompt), _run)
+        if shared:
+            telemetry.mark(cache_hit=True)
+        return text
     except:
+        telemetry.mark(error=True)
         return "Analiz yapılamadı."
 
-def generate_smart_coupon(matches_data, match_count, bet_preference):
-    """
-    Toplu maç verilerini alır ve seçilen stratejiye göre en iyi kombinasyonu oluşturur.
-    ARTIK ORAN MÜHENDİSLİĞİ (ODDS ENGINEERING) MANTIĞIYLA ÇALIŞIR.
-    """
-    
+def _log_changed(kind, cache_key, label):
+    changed = (analysis_cache.outcome(kind, cache_key) or {}).get("changed")
+    if changed:
+        print(f"🔁 {label}: değişen girdiler -> {', '.join(changed)}")
+
+def _format_coupon_matches(matches_data):
     matches_text = ""
     for i, m in enumerate(matches_data):
+        pick_line = f"\n        - İstatistik Modeli Önerisi: {m['local_pick']}" if m.get("local_pick") else ""
         matches_text += f"""
         MAÇ {i+1}: {m['home']} vs {m['away']} ({m.get('lig', 'Lig Belirsiz')})
         - Kritik Seri (Sarı Kutu): {m['insights']}
-        - Teknik Veriler: {m['stats']}
+        - Teknik Veriler: {m['stats']}{pick_line}
         --------------------------------------------------
         """
+    return matches_text
+
+def generate_smart_coupon(matches_data, match_count, bet_preference,
+                          risk_profile=None, game_focus=None, shortlist_k=None):
+    """
+    Toplu maç verilerini alır ve seçilen stratejiye göre en iyi kombinasyonu oluşturur.
+    ARTIK ORAN MÜHENDİSLİĞİ (ODDS ENGINEERING) MANTIĞIYLA ÇALIŞIR.
+    Havuz önce yerel olarak puanlanır; yapay zekaya sadece en iyi shortlist_k aday gider
+    (None: kupon maç sayısına göre otomatik, 0: ön eleme kapalı).
+    """
+    return generate_smart_coupon_run(matches_data, match_count, bet_preference,
+                                     risk_profile, game_focus, shortlist_k)[0]
+
+@telemetry.tracked("generate_smart_coupon")
+def generate_smart_coupon_run(matches_data, match_count, bet_preference,
+                              risk_profile=None, game_focus=None, shortlist_k=None):
+    """generate_smart_coupon ile aynı; (kupon, çalıştırma ölçümleri) döner (bkz. coupon_scorer.run_record)."""
+    # Havuzdaki maçların girdileri ve parametreler önceki çalıştırmayla aynıysa kupon tekrar kullanılır
+    fields = {f"{m['home']} - {m['away']}": {k: m.get(k) for k in ("lig", "insights", "stats", "local_pick")}
+              for m in matches_data}
+    fields["parametreler"] = [match_count, bet_preference, risk_profile, game_focus, shortlist_k]
+    hashes = analysis_cache.fingerprint_fields(fields)
+    # Anahtar aday havuzunu da içerir: farklı maç havuzu, aynı parametrelerle önceki kuponu almaz
+    pool = sorted(f"{m['home']} - {m['away']}" for m in matches_data)
+    cache_key = analysis_cache.key_of(pool, match_count, bet_preference, risk_profile, game_focus)
+    cached = analysis_cache.lookup(analysis_cache.COUPON, cache_key, hashes)
+    reuse = analysis_cache.outcome(analysis_cache.COUPON, cache_key)
+    if cached is not None:
+        print(f"♻️ Kupon girdileri değişmedi ({len(matches_data)} maç), önceki kupon kullanılıyor")
+        telemetry.mark(cache_hit=True)
+        return cached, coupon_scorer.run_record(len(matches_data), 0, cached=True, reuse=reuse)
+    _log_changed(analysis_cache.COUPON, cache_key, "Kupon")
+
+    t0 = time.perf_counter()
+    candidates = coupon_scorer.shortlist(matches_data, match_count, risk_profile, game_focus, shortlist_k)
+    scoring_ms = (time.perf_counter() - t0) * 1000
+
+    matches_text = _format_coupon_matches(candidates)
+    # Ön elemesiz prompt'un boyutu (ölçüm için; sadece eleme yapıldıysa ayrıca hesaplanır)
+    full_text_len = (len(_format_coupon_matches(matches_data)) if len(candidates) < len(matches_data)
+                     else len(matches_text))
 
     system_prompt = f"""
     ROLE: Sen profesyonel bir Futbol Analisti ve Matematiksel Oran Uzmanısın (Oddsmaker).
@@ -212,16 +534,35 @@ def generate_smart_coupon(matches_data, match_count, bet_preference):
     """
     
     # JSON formatında yanıt almaya zorla
-    return call_ai_with_retry(system_prompt, {"task": "coupon_generation"})
+    t1 = time.perf_counter()
+    result = call_ai_with_retry(system_prompt, {"task": "coupon_generation"},
+                                priority=ai_scheduler.BATCH, task=model_router.COUPON)
+    run = coupon_scorer.run_record(
+        len(matches_data), len(candidates),
+        len(system_prompt) - len(matches_text) + full_text_len, len(system_prompt),
+        scoring_ms, (time.perf_counter() - t1) * 1000, reuse=reuse
+    )
+    print(f"🎯 Kupon ön eleme: {run['pool']} -> {run['shortlist']} maç, prompt %{run['reduction_pct']} kısaldı")
+    if analysis_cache.is_reusable_result(result):
+        analysis_cache.store(analysis_cache.COUPON, cache_key, f"{len(matches_data)} maç", hashes, result)
+    return result, run
 
-def analyze_match_deep(home_team, away_team, match_url, standings_summary, league_stats=None):
+@telemetry.tracked("analyze_match_deep")
+def analyze_match_deep(home_team, away_team, match_url, standings_summary, league_stats=None, details=None,
+                       focus=None, league_value=None):
     """
     Maçkolik detayları + Lig Genel İstatistiklerini birleştirir.
     JSON ÇIKTISI ÜRETİR.
+    details verilirse (önceden çekilmiş maç detayları) sayfa tekrar scrape edilmez.
+    focus: analiz odağı (örn. "karşılıklı gol", "ilk yarı"); uzun karşılaştırma metninden
+    sadece buna en ilgili cümleler prompt'a girer. Boşsa genel bahis odağı kullanılır.
+    İsteğin süre bütçesi (deadline.scope) dolarsa yapay zeka beklenmez, yerel tahmin döner.
+    league_value: maçın ligi; yerel tahmin veritabanını sadece kendi ligi için kullanır.
     """
     
     # 1. Maçın Kendi Detaylarını Çek
-    details = scraper.get_match_deep_stats(match_url)
+    if details is None:
+        details = scraper.get_match_deep_stats(match_url)
     
     # 2. Lig Genel İstatistiklerinden Takımları Bul
     home_general_stats = "Veri Yok"
@@ -231,18 +572,36 @@ def analyze_match_deep(home_team, away_team, match_url, standings_summary, leagu
         home_general_stats = find_team_stats(home_team, league_stats["team_stats"])
         away_general_stats = find_team_stats(away_team, league_stats["team_stats"])
 
+    # 3. Karşılaştırma metninin sadece odakla ilgili cümleleri
+    comparison_full = details.get("comparison_stats", "")
+    comparison = relevance.select_sentences(
+        comparison_full, f"{focus or relevance.DEFAULT_FOCUS} {home_team} {away_team}", COMPARISON_TOP_N
+    )
+    if len(comparison) < len(comparison_full):
+        print(f"🔎 Karşılaştırma metni: {len(comparison_full)} -> {len(comparison)} karakter")
+
     match_data = {
         "fixture": f"{home_team} vs {away_team}",
         "league_standings_top": standings_summary[:5], 
         "critical_insights": details["yellow_box"],
         "key_players": details["player_stats"],
         "form_patterns": details.get("form_patterns", []),
-        "comparison_stats": details.get("comparison_stats", ""),
+        "comparison_stats": comparison,
         "h2h_notes": details["h2h"],
         "home_technical_stats": home_general_stats,
         "away_technical_stats": away_general_stats
     }
 
+    # Normalize girdiler son analizle aynıysa yapay zeka tekrar çağrılmaz
+    hashes = analysis_cache.fingerprint_fields({**match_data, "focus": focus or ""})
+    cache_key = analysis_cache.key_of(home_team, away_team, match_url)
+    cached = analysis_cache.lookup(analysis_cache.MATCH, cache_key, hashes)
+    if cached is not None:
+        print(f"♻️ {home_team} - {away_team}: girdiler değişmedi, kayıtlı analiz kullanılıyor")
+        telemetry.mark(cache_hit=True)
+        return cached
+    _log_changed(analysis_cache.MATCH, cache_key, f"{home_team} - {away_team}")
+
     system_prompt = f"""
     BAĞLAM ZAMANI: Şubat 2026.
     ⚠️ KRİTİK KURAL: Sana verilen 'critical_insights' ve 'key_players' verileri MUTLAK GERÇEKTİR.
@@ -290,15 +649,28 @@ def analyze_match_deep(home_team, away_team, match_url, standings_summary, leagu
     }}
     """
     
-    return call_ai_with_retry(system_prompt, match_data)
+    result = call_ai_with_retry(
+        system_prompt, match_data,
+        fallback=lambda: local_predictor.predict_match(home_team, away_team, league_stats, details, league_value),
+        priority=ai_scheduler.SINGLE, task=model_router.ANALYSIS
+    )
+    if analysis_cache.is_reusable_result(result):
+        analysis_cache.store(analysis_cache.MATCH, cache_key, f"{home_team} - {away_team}", hashes, result)
+    return result
 
-def analyze_spor_toto_column(matches):
+@telemetry.tracked("analyze_spor_toto_column")
+def analyze_spor_toto_column(matches, features=None):
     """
     15 Maçlık Spor Toto listesi için hem Toto tahmini hem de Banko İddaa tercihi yapar.
+    features: {mac_no: özellik satırı} (toto_enrichment.enrich_toto); verilirse her maçın altına eklenir.
     """
+    features = features or {}
     matches_text = ""
     for i, m in enumerate(matches):
         matches_text += f"MAÇ {i+1}: {m['home']} vs {m['away']} ({m['date']})\n"
+        line = features.get(m.get("mac_no", i + 1))
+        if line:
+            matches_text += f"   Veriler: {line}\n"
 
     system_prompt = """
     ROLE: Sen Türkiye Spor Toto ve İddaa uzmanısın.
@@ -312,6 +684,10 @@ def analyze_spor_toto_column(matches):
     - Sadece maç sonucu (MS) ile sınırlı kalma.
     - Gol bahisleri (1.5 Üst, 3.5 Alt, KG Var/Yok), Çifte Şans, Korner, Ev Sahibi Gol Atar gibi seçenekleri değerlendir.
     - Amacın en yüksek oranı bulmak değil, EN YÜKSEK TUTMA OLASILIĞINI (Green Check) bulmaktır.
+
+    VERİ KURALI:
+    - "Veriler:" satırı olan maçlarda tahminini ve nedenini bu verilere (model olasılıkları, form, notlar) dayandır.
+    - Veri satırı olmayan maçlarda sayısal istatistik uydurma; genel değerlendirme yap.
     
     İSTENEN JSON FORMATI:
     [
@@ -326,4 +702,5 @@ def analyze_spor_toto_column(matches):
     ]
     """
     
-    return call_ai_with_retry(system_prompt, {"matches": matches_text})
\ No newline at end of file
+    return call_ai_with_retry(system_prompt, {"matches": matches_text},
+                              priority=ai_scheduler.BATCH, task=model_router.TOTO)
\ No newline at end of file
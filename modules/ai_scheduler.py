@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- YAPAY ZEKA İSTEK ZAMANLAYICISI ---
+# Gemini'ye aynı anda gidebilecek istek sayısı sınırlıdır (slot).
+# Bekleyen istekler öncelik sınıfına göre ağırlıklı adil kuyrukta (WFQ) sıralanır:
+# sohbet sorusu, 20 maçlık bir kupon işinin arkasında dakikalarca beklemez.
+# Kesintisiz (preemption yok): başlamış bir istek yarıda bırakılmaz, sadece sıradaki seçilir.
+
+CHAT = "chat"        # etkileşimli sohbet
+SINGLE = "single"    # tek maç analizi
+BATCH = "batch"      # kupon sihirbazı, Spor Toto, lig özeti
+
+CLASSES = (CHAT, SINGLE, BATCH)
+
+# Slot paylaşım ağırlıkları: kuyruk doluyken her 10 slotun ~6'sı sohbete, ~3'ü tek maça, ~1'i toplu işlere
+WEIGHTS = {CHAT: 6, SINGLE: 3, BATCH: 1}
+
+# Aynı anda Gemini'de bekleyen istek sınırı
+MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", "4"))
+# Toplu işler bu kadar slotu her zaman etkileşimli isteklere bırakır
+INTERACTIVE_RESERVE = int(os.getenv("AI_INTERACTIVE_RESERVE", "1"))
+
+LATENCY_SAMPLES = 500
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class _Ticket:
+    __slots__ = ("priority", "tag", "seq", "granted")
+
+    def __init__(self, priority, tag, seq):
+        self.priority = priority
+        self.tag = tag
+        self.seq = seq
+        self.granted = False
+
+
+class AIScheduler:
+    def __init__(self, slots=MAX_CONCURRENT, weights=None, reserve=INTERACTIVE_RESERVE):
+        self.slots = max(1, slots)
+        self.weights = dict(weights or WEIGHTS)
+        # Tek slot varsa rezerv toplu işleri tamamen durdurur; en az bir slot toplu işe açık kalır
+        self.batch_limit = max(1, self.slots - max(0, reserve))
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = 0
+        self._vtime = 0.0
+        self._last_finish = {c: 0.0 for c in CLASSES}
+        self._running = {c: 0 for c in CLASSES}
+        self._metrics = {c: {"requests": 0, "wait": deque(maxlen=LATENCY_SAMPLES),
+                             "latency": deque(maxlen=LATENCY_SAMPLES)} for c in CLASSES}
+
+    def _class(self, priority):
+        return priority if priority in self.weights else SINGLE
+
+    def _eligible(self, ticket):
+        if ticket.priority == BATCH and self._running[BATCH] >= self.batch_limit:
+            return False
+        return True
+
+    def _dispatch(self):
+        """Boş slot oldukça en küçük sanal bitiş etiketli uygun bileti çalıştırır (kilit altında)."""
+        granted = False
+        while self._queue and sum(self._running.values()) < self.slots:
+            candidates = [t for t in self._queue if self._eligible(t)]
+            if not candidates:
+                break
+            ticket = min(candidates, key=lambda t: (t.tag, t.seq))
+            self._queue.remove(ticket)
+            self._vtime = max(self._vtime, ticket.tag)
+            self._running[ticket.priority] += 1
+            ticket.granted = True
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=SINGLE, timeout=None):
+        """
+        Bir Gemini isteği için slot bekler; blok bitince slotu bırakır.
+        Tekrar denemeler arasındaki beklemeler slot dışında yapılmalıdır.
+        timeout (sn) verilirse ve slot bu sürede açılmazsa kuyruktan çıkıp TimeoutError fırlatır.
+        """
+        priority = self._class(priority)
+        t0 = time.perf_counter()
+        give_up_at = None if timeout is None else t0 + timeout
+        with self._cond:
+            start = max(self._vtime, self._last_finish[priority])
+            finish = start + 1.0 / self.weights[priority]
+            self._last_finish[priority] = finish
+            self._seq += 1
+            ticket = _Ticket(priority, finish, self._seq)
+            self._queue.append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                if give_up_at is None:
+                    self._cond.wait()
+                    continue
+                left = give_up_at - time.perf_counter()
+                if left <= 0:
+                    self._queue.remove(ticket)
+                    raise TimeoutError("AI slot bekleme süresi doldu")
+                self._cond.wait(left)
+            self._metrics[priority]["wait"].append(time.perf_counter() - t0)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[priority] -= 1
+                self._dispatch()
+
+    @contextmanager
+    def track(self, priority=SINGLE):
+        """Uçtan uca gecikmeyi (kuyruk + tekrar denemeler + yanıt) sınıf bazında kaydeder."""
+        priority = self._class(priority)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._cond:
+                m = self._metrics[priority]
+                m["requests"] += 1
+                m["latency"].append(time.perf_counter() - t0)
+
+    def stats(self):
+        """Sınıf başına istek sayısı, kuyruk/çalışan, bekleme ve gecikme yüzdelikleri (ms)."""
+        with self._cond:
+            rows = {}
+            for c in CLASSES:
+                m = self._metrics[c]
+                wait, latency = list(m["wait"]), list(m["latency"])
+                rows[c] = {
+                    "requests": m["requests"],
+                    "queued": sum(1 for t in self._queue if t.priority == c),
+                    "running": self._running[c],
+                    "wait_p50_ms": round(_percentile(wait, 50) * 1000),
+                    "wait_p95_ms": round(_percentile(wait, 95) * 1000),
+                    "p50_ms": round(_percentile(latency, 50) * 1000),
+                    "p95_ms": round(_percentile(latency, 95) * 1000),
+                }
+            return rows
+
+
+SCHEDULER = AIScheduler()
@@ -0,0 +1,169 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from modules import data_manager
+
+# --- GİRDİ PARMAK İZİ İLE ANALİZ TEKRAR KULLANIMI ---
+# Bir maçın (veya kupon çalıştırmasının) yapay zekaya giden girdileri alan alan normalize edilip
+# hash'lenir. Saklanan analizin girdileriyle birebir aynıysa yapay zeka tekrar çağrılmaz, eski
+# analiz döner. Farklıysa hangi alanların değiştiği kaydedilir (örn. sadece puan durumu).
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, 'data', 'analysis_cache.db')
+
+# Kayıt türleri
+MATCH = "match"
+COUPON = "coupon"
+
+# Prompt metni değiştiğinde artırılır: eski analizler artık tekrar kullanılmaz
+PROMPT_VERSION = 1
+# Girdiler aynı olsa da bundan eski analiz tekrar kullanılmaz (gün)
+REUSE_MAX_AGE_DAYS = 3
+
+_init_lock = threading.Lock()
+_initialized = False
+_outcome_lock = threading.Lock()
+# (kullanıcı, tür, anahtar) -> {"reused": bool, "changed": [...] | None}
+# Kullanıcı data_manager'daki oturum kullanıcısıdır: bir oturumun sonucu diğerine görünmez.
+_last_outcome = {}
+
+
+def get_db_connection():
+    return sqlite3.connect(DB_PATH)
+
+
+def init_db():
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    kind TEXT,
+                    cache_key TEXT,
+                    label TEXT,
+                    input_hashes TEXT,
+                    result TEXT,
+                    created_at TEXT,
+                    reuse_count INTEGER DEFAULT 0,
+                    last_changed TEXT,
+                    PRIMARY KEY (kind, cache_key)
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def normalize(value):
+    """Hash öncesi normalizasyon: boşluklar sadeleşir, sayılar yuvarlanır, sözlükler sıralanır."""
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    if isinstance(value, float):
+        return round(value, 3)
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def fingerprint_fields(fields):
+    """{alan: değer} -> {alan: kısa hash}"""
+    hashes = {}
+    for name, value in fields.items():
+        raw = json.dumps(normalize(value), ensure_ascii=False, sort_keys=True, default=str)
+        hashes[name] = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    hashes["_prompt_version"] = str(PROMPT_VERSION)
+    return hashes
+
+
+def key_of(*parts):
+    raw = json.dumps(normalize(list(parts)), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _diff(old, new):
+    names = sorted(set(old) | set(new))
+    return [n for n in names if old.get(n) != new.get(n)]
+
+
+def _set_outcome(kind, cache_key, reused, changed):
+    with _outcome_lock:
+        _last_outcome[(data_manager.current_user(), kind, cache_key)] = {"reused": reused, "changed": changed}
+
+
+def outcome(kind, cache_key):
+    """Bu oturumun son lookup sonucu: {"reused": bool, "changed": [alanlar] | None (ilk analiz)}"""
+    with _outcome_lock:
+        return _last_outcome.get((data_manager.current_user(), kind, cache_key))
+
+
+def lookup(kind, cache_key, hashes):
+    """
+    Girdileri aynı saklı sonuç varsa onu döndürür.
+    Yoksa None döner; değişen alanlar outcome() ile okunabilir.
+    """
+    init_db()
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT input_hashes, result, created_at FROM analysis_cache WHERE kind=? AND cache_key=?",
+            (kind, cache_key)
+        ).fetchone()
+        if not row:
+            _set_outcome(kind, cache_key, False, None)
+            return None
+        old_hashes = json.loads(row[0])
+        changed = _diff(old_hashes, hashes)
+        age = datetime.datetime.now() - datetime.datetime.fromisoformat(row[2])
+        if not changed and age.days < REUSE_MAX_AGE_DAYS:
+            conn.execute(
+                "UPDATE analysis_cache SET reuse_count = reuse_count + 1 WHERE kind=? AND cache_key=?",
+                (kind, cache_key)
+            )
+            conn.commit()
+            _set_outcome(kind, cache_key, True, [])
+            return json.loads(row[1])
+        _set_outcome(kind, cache_key, False, changed or ["_süre_doldu"])
+        return None
+    except Exception as e:
+        print(f"Analiz önbelleği okuma hatası: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def store(kind, cache_key, label, hashes, result):
+    """Sonucu girdilerin hash'leriyle saklar (son lookup'ta değişen alanlar da kaydedilir)."""
+    init_db()
+    changed = (outcome(kind, cache_key) or {}).get("changed")
+    conn = get_db_connection()
+    try:
+        conn.execute("""
+            INSERT INTO analysis_cache (kind, cache_key, label, input_hashes, result, created_at, reuse_count, last_changed)
+            VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+            ON CONFLICT(kind, cache_key) DO UPDATE SET
+                label=excluded.label, input_hashes=excluded.input_hashes, result=excluded.result,
+                created_at=excluded.created_at, reuse_count=0, last_changed=excluded.last_changed
+        """, (kind, cache_key, label, json.dumps(hashes), json.dumps(result, ensure_ascii=False),
+              datetime.datetime.now().isoformat(timespec="seconds"), json.dumps(changed)))
+        conn.commit()
+    except Exception as e:
+        print(f"Analiz önbelleği yazma hatası: {e}")
+    finally:
+        conn.close()
+
+
+def is_reusable_result(result):
+    """Hata, yoğunluk ve yerel model yedekleri saklanmaz; bir sonraki çalıştırmada yeniden denenir."""
+    if isinstance(result, dict):
+        return result.get("ana_tercih") not in ("Hata", "Trafik Yoğun") and result.get("kaynak") != "yerel_model"
+    return isinstance(result, list) and bool(result)
@@ -0,0 +1,136 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from modules import relevance
+
+# --- SOHBET YANIT ÖNBELLEĞİ ---
+# Kullanıcılar aynı maç için hep benzer soruları soruyor ("kim kazanır", "kaç gol olur", "sakat var mı").
+# Yanıtlar (maç, analiz özeti) kapsamında saklanır; analiz değişince kapsam da değişir.
+# Aynı maçın farklı analizleri (farklı oturumlar) ayrı kapsamlardır ve birbirini silmez;
+# eski kapsamlar LRU ve süre (TTL) ile düşer. Sorular normalize edilip anlamsız kelimeler atılır,
+# kelime kümesi benzerliği (Jaccard) eşiği geçen soru önbellekten anında yanıtlanır.
+# Olumsuzluk ("kazanmaz", "olmaz", "yok") kök kesilince kaybolmasın diye ayrı bir işaret
+# (NEGATION) olarak tutulur ve olumlu/olumsuz sorular birbirine asla yanıt olmaz.
+
+SIMILARITY_THRESHOLD = 0.7
+MAX_SCOPES = 128            # aynı anda tutulan (maç, analiz) kapsamı
+MAX_ANSWERS_PER_SCOPE = 50
+ANSWER_TTL = 60 * 60        # saniye
+STEM_LENGTH = 5
+
+# Sadeleştirilmiş (relevance.fold: ASCII, küçük harf, "ı" -> "i") biçimleri
+STOPWORDS = {
+    "sence", "acaba", "peki", "bu", "su", "bir", "de", "da", "ki", "ya", "ve", "ile", "icin",
+    "mi", "mu", "misin", "musun", "sizce",
+    "mac", "maci", "macta", "macin", "macinda", "bana", "soyle", "soyler", "lutfen",
+}
+
+# Olumsuz soru işareti (kelime kökü olamaz: _TOKEN_RE sadece harf/rakam üretir)
+NEGATION = "!olumsuz"
+NEGATION_WORDS = {"yok", "degil", "hic"}
+# Fiilin olumsuzluk eki ve ardından gelen zaman eki: kazan-maz, kazan-amaz, gel-medi,
+# oyna-mayacak, ol-mamis... Kök en az 2 harf olmalı ("maz", "mezar" gibi kelimeler eşleşmesin).
+_NEGATIVE_VERB_RE = re.compile(r"^([a-z]{2,}?)(?:[ae]|y[ae])?m[ae](?:z|di|dik|yacak|yecek|mis|yan|yen|sin)[a-z]*$")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(tok):
+    """(kök, olumsuz_mu): olumsuzluk eki kök kesilmeden önce ayrılır."""
+    if tok in NEGATION_WORDS:
+        return None, True
+    negative = _NEGATIVE_VERB_RE.match(tok)
+    if negative:
+        return negative.group(1)[:STEM_LENGTH], True
+    return tok[:STEM_LENGTH], False
+
+
+def question_tokens(question):
+    """Sorunun anlamlı kelime kökleri (küme); olumsuz soruda NEGATION da kümededir."""
+    tokens = set()
+    for tok in _TOKEN_RE.findall(relevance.fold(question)):
+        if tok in STOPWORDS:
+            continue
+        stem, negative = _stem(tok)
+        if stem:
+            tokens.add(stem)
+        if negative:
+            tokens.add(NEGATION)
+    return frozenset(tokens)
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ChatAnswerCache:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_scopes=MAX_SCOPES,
+                 max_answers=MAX_ANSWERS_PER_SCOPE, ttl=ANSWER_TTL):
+        self.threshold = threshold
+        self.max_scopes = max_scopes
+        self.max_answers = max_answers
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._scopes = OrderedDict()  # (ev, deplasman, analiz özeti) -> [(tokens, soru, yanıt, zaman)]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope, tokens):
+        """En benzer önbellek yanıtı (eşik üstündeyse) ya da None."""
+        if not tokens:
+            return None
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            best, best_score = None, 0.0
+            if entries:
+                entries[:] = [e for e in entries if now - e[3] <= self.ttl]
+                negative = NEGATION in tokens
+                for cached_tokens, _, answer, _ in entries:
+                    if (NEGATION in cached_tokens) != negative:
+                        continue  # "kazanır mı" sorusuna "kazanmaz mı" yanıtı verilmez
+                    score = similarity(tokens, cached_tokens)
+                    if score > best_score:
+                        best, best_score = answer, score
+            if best is not None and best_score >= self.threshold:
+                self._scopes.move_to_end(scope)
+                self.hits += 1
+                return best
+            self.misses += 1
+            return None
+
+    def put(self, scope, tokens, question, answer):
+        if not tokens:
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.setdefault(scope, [])
+            entries[:] = [e for e in entries if e[0] != tokens]
+            entries.append((tokens, question, answer, now))
+            del entries[:-self.max_answers]
+            self._scopes.move_to_end(scope)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+    def invalidate(self, home_team, away_team):
+        """Maçın tüm önbellek yanıtlarını siler (örn. analiz yenilendiğinde)."""
+        with self._lock:
+            for old in [s for s in self._scopes if s[:2] == (home_team, away_team)]:
+                del self._scopes[old]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(100 * self.hits / total, 1) if total else 0.0,
+                "scopes": len(self._scopes),
+                "answers": sum(len(e) for e in self._scopes.values()),
+            }
+
+
+ANSWERS = ChatAnswerCache()
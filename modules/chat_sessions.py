@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Aynı anda bellekte tutulacak en fazla sohbet oturumu
+MAX_SESSIONS = 64
+# Bu kadar saniye dokunulmayan oturum atılır
+IDLE_TTL = 30 * 60
+# Her tur tüm geçmişle gider; geçmişi son N soru-cevap çiftiyle sınırlıyoruz
+MAX_TURNS = 6
+
+
+def context_fingerprint(context_payload):
+    """Analiz bağlamının kısa özetini (hash) üretir. Analiz değişince anahtar da değişir."""
+    raw = json.dumps(context_payload or {}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def session_key(owner_id, home_team, away_team, context_payload):
+    """Oturum anahtarı: (kullanıcı oturumu, maç, analiz özeti)."""
+    return (owner_id or "-", home_team, away_team, context_fingerprint(context_payload))
+
+
+class ChatSessionManager:
+    """
+    Analiz edilen maç başına tek bir sohbet oturumu tutar (LRU).
+    Bağlam (system prompt) oturum açılırken bir kez kurulur, takip soruları aynı oturuma gider.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_ttl=IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()  # key -> [chat, last_used]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _evict_idle(self, now):
+        stale = [k for k, (_, last_used) in self._sessions.items() if now - last_used > self.idle_ttl]
+        for k in stale:
+            del self._sessions[k]
+        self.evicted += len(stale)
+
+    def get_or_create(self, key, factory):
+        """Oturum varsa döndürür, yoksa factory() ile kurar."""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry:
+                entry[1] = now
+                self._sessions.move_to_end(key)
+                self.reused += 1
+                return entry[0]
+
+        # Model kurulumu kilidin dışında yapılır (yavaş olabilir)
+        chat = factory()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry:  # Bu arada başka bir thread kurduysa onunkini kullan
+                entry[1] = now
+                self.reused += 1
+                return entry[0]
+            self._sessions[key] = [chat, now]
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return chat
+
+    def drop(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def drop_owner(self, owner_id):
+        """Bir kullanıcı oturumuna ait tüm sohbetleri siler (yeni analiz başlarken)."""
+        owner_id = owner_id or "-"
+        with self._lock:
+            for k in [k for k in self._sessions if k[0] == owner_id]:
+                del self._sessions[k]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+def trim_history(chat, max_turns=MAX_TURNS):
+    """ChatSession geçmişini son max_turns soru-cevap çiftine indirir."""
+    history = getattr(chat, "history", None)
+    if history and len(history) > max_turns * 2:
+        chat.history = history[-max_turns * 2:]
+
+
+def append_turn(chat, question, answer, max_turns=MAX_TURNS):
+    """
+    Modele gitmeden yanıtlanan (önbellek) bir soru-cevap çiftini oturum geçmişine ekler,
+    geçmişi trim_history ile aynı sınırda tutar.
+    """
+    history = list(getattr(chat, "history", None) or [])
+    history += [{"role": "user", "parts": [question]}, {"role": "model", "parts": [answer]}]
+    chat.history = history
+    trim_history(chat, max_turns)
+
+
+SESSIONS = ChatSessionManager()
@@ -0,0 +1,145 @@
+import time
+
+# --- KUPON ÖN ELEME ---
+# Havuzdaki maçları, yapay zekaya gitmeden önce yerel modelin olasılıklarıyla puanlar.
+# Prompt'a sadece en iyi K aday girer; prompt kısalır, model daha tutarlı seçer.
+# Sihirbaz havuzunda gerçek bülten oranı yok: oran, olasılıktan marjla tahmin edilir ve
+# sadece anlamsız düşük oranlı tercihleri elemek ve adayın yanında göstermek için kullanılır.
+# Tahmini oran olasılığın kendisinden türediği için "değerli bahis" (value) puanı hesaplanmaz.
+
+# Bahis bürosu marjı (generate_smart_coupon prompt'undaki 0.93 ile aynı)
+BOOKMAKER_MARGIN = 0.93
+# Bültende anlamlı oran sayılan en düşük değer (1.02'lik "3.5 Alt" gibi tercihleri eler)
+MIN_ODD = 1.20
+# Risk profillerinin hedeflediği tutma olasılığı (İDEAL ~1.60-1.80, SÜRPRİZ ~2.30 oran)
+TARGET_PROB = {"IDEAL": 0.60, "SURPRIZ": 0.40}
+# Sürpriz profilinde dikkate alınan en düşük olasılık
+SURPRISE_MIN_PROB = 0.25
+
+SIDE_MARKETS = ("MS 1", "MS X", "MS 2", "1X", "X2")
+GOAL_MARKETS = ("1.5 Üst", "2.5 Üst", "2.5 Alt", "3.5 Alt", "KG Var", "KG Yok")
+SPECIAL_KEYWORDS = ("korner", "yarı", "kart", "penaltı", "ilk gol")
+
+
+def default_shortlist_size(match_count):
+    """Kupondaki maç sayısının iki katı, en az +3 yedek."""
+    return max(match_count * 2, match_count + 3)
+
+
+def _market_probs(probs):
+    """local_predictor.predict_probabilities çıktısını pazar -> olasılık sözlüğüne çevirir."""
+    p1, px, p2 = probs.get("1", 0), probs.get("X", 0), probs.get("2", 0)
+    o25 = probs.get("over_2_5", 0)
+    btts = probs.get("btts", 0)
+    return {
+        "MS 1": p1, "MS X": px, "MS 2": p2, "1X": p1 + px, "X2": px + p2,
+        "1.5 Üst": probs.get("over_1_5", 0), "2.5 Üst": o25, "2.5 Alt": 1 - o25,
+        "3.5 Alt": 1 - probs.get("over_3_5", 0), "KG Var": btts, "KG Yok": 1 - btts,
+    }
+
+
+def _estimated_odd(p):
+    """Olasılıktan marjlı piyasa oranı tahmini (generate_smart_coupon prompt'uyla aynı formül)."""
+    return BOOKMAKER_MARGIN / p if p > 0 else 0.0
+
+
+def _allowed_markets(game_focus):
+    focus = (game_focus or "").lower()
+    if "gol" in focus: return GOAL_MARKETS
+    if "taraf" in focus: return SIDE_MARKETS
+    return SIDE_MARKETS + GOAL_MARKETS
+
+
+def _risk_key(risk_profile):
+    risk = (risk_profile or "").upper().replace("İ", "I").replace("Ü", "U")
+    if "SURPRIZ" in risk: return "SURPRIZ"
+    if "IDEAL" in risk: return "IDEAL"
+    return "BANKO"
+
+
+def _market_score(p, odd, risk_profile):
+    if odd < MIN_ODD:
+        return 0.0
+    risk = _risk_key(risk_profile)
+    if risk == "BANKO":
+        # En yüksek tutma olasılığı
+        score = p
+    else:
+        if risk == "SURPRIZ" and p < SURPRISE_MIN_PROB:
+            return 0.0
+        # Profilin hedef olasılığına (dolayısıyla oran bandına) yakınlık
+        score = 1 - abs(p - TARGET_PROB[risk])
+    return score
+
+
+def score_candidate(match, risk_profile, game_focus):
+    """Maçın en iyi pazarını ve puanını döndürür: (puan, pazar, olasılık, tahmini oran)."""
+    probs = match.get("probs")
+    if not probs:
+        return (0.0, None, 0.0, 0.0)
+    market_probs = _market_probs(probs)
+
+    best = (0.0, None, 0.0, 0.0)
+    for market in _allowed_markets(game_focus):
+        p = market_probs[market]
+        odd = _estimated_odd(p)
+        score = _market_score(p, odd, risk_profile)
+        if score > best[0]:
+            best = (score, market, p, odd)
+
+    # Sarı kutu verisi zengin maçlar yapay zekaya daha çok malzeme verir
+    insights = match.get("insights") or []
+    bonus = min(len(insights), 5) * 0.01
+    if "özel" in (game_focus or "").lower():
+        text = " ".join(str(i) for i in insights).lower()
+        bonus += 0.03 * sum(1 for kw in SPECIAL_KEYWORDS if kw in text)
+    return (best[0] + bonus, best[1], best[2], best[3])
+
+
+def rank(matches, risk_profile=None, game_focus=None):
+    """Havuzu puana göre sıralar; her maça 'local_pick' (önerilen pazar) alanı eklenir."""
+    scored = []
+    for idx, m in enumerate(matches):
+        score, market, p, odd = score_candidate(m, risk_profile, game_focus)
+        item = dict(m)
+        if market:
+            item["local_pick"] = f"{market} (%{round(p * 100)}, ~{odd:.2f})"
+        scored.append((score, idx, item))
+    scored.sort(key=lambda x: (-x[0], x[1]))
+    return [item for _, _, item in scored]
+
+
+def shortlist(matches, match_count, risk_profile=None, game_focus=None, k=None):
+    """
+    Sıralanmış havuzun ilk K maçını döndürür.
+    k=None: kupon maç sayısına göre otomatik, k=0: ön eleme kapalı (tüm havuz).
+    K kupondaki maç sayısından küçükse maç sayısına yükseltilir (model yeterli aday görsün).
+    """
+    ranked = rank(matches, risk_profile, game_focus)
+    if k is None:
+        k = default_shortlist_size(match_count)
+    elif k:
+        k = max(k, match_count)
+    return ranked[:k] if k else ranked
+
+
+def run_record(pool_size, shortlist_size, full_chars=0, sent_chars=0, scoring_ms=0.0, llm_ms=0.0, cached=False,
+               reuse=None):
+    """
+    Bir kupon çalıştırmasının ölçümleri (prompt boyutu, süre). Çağırana kuponla birlikte döner;
+    süreç geneli bir kayıt tutulmaz (başka oturumun çalıştırması gösterilmesin).
+    cached: kupon önbellekten geldi, yapay zeka çağrılmadı.
+    reuse: önbellek karşılaştırması (analysis_cache.outcome; değişen alanlar).
+    """
+    return {
+        "time": time.strftime("%H:%M:%S"),
+        "pool": pool_size,
+        "shortlist": shortlist_size,
+        "prompt_chars_full": full_chars,
+        "prompt_chars_sent": sent_chars,
+        "reduction_pct": round(100 * (1 - sent_chars / full_chars), 1) if full_chars else 0.0,
+        "scoring_ms": round(scoring_ms, 2),
+        "llm_ms": round(llm_ms, 1),
+        "cached": cached,
+        "reuse": reuse,
+    }
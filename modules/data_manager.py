@@ -1,70 +1,628 @@
+import contextvars
+import hashlib
+import html
 import json
 import os
+import re
+import sqlite3
 import datetime
+import threading
+import zlib
+from modules import relevance
 
-# Veritabanı dosyası (Basit JSON)
+# Geçmiş kayıtları (kupon / analiz) SQLite'ta, ekleme-only bir tabloda tutulur.
+# Her kayıt tek bir INSERT (O(1), atomik); "son N kayıt" okuması (user_id, kind, id) indeksinden gelir.
+# Kullanıcılar API key'lerinin hash'i ile ayrılır: herkes sadece kendi geçmişini görür ve
+# bir kullanıcının okuması toplam kullanıcı sayısıyla büyümez.
+# Eski JSON dosyası ilk açılışta bir kez tabloya aktarılır. Kullanıcı ayrımı öncesinin bu ortak
+# geçmişi kimsenin key'ine bağlanmaz; ayrı bir bölümde (LEGACY_USER) durur ve sadece kullanıcı
+# isterse (set_shared_history) okumalara (sayfa, arşiv, arama) eklenir. Yeni kayıtlar her zaman
+# kullanıcının kendi bölümüne yazılır.
+# Sıcak / soğuk katman: history tablosunda kullanıcı ve tür başına son HOT_LIMIT kayıt durur
+# (geçmiş sekmesi sadece bunu okur). Daha eskileri silinmez; ay bazlı, zlib ile sıkıştırılmış
+# arşiv segmentlerine (history_archive) taşınır ve oradan ay ay okunabilir.
+# Geçmiş sekmesinin gösterdiği alanlar (başlık, temizlenmiş metinler, toplam oran, kupon metni)
+# kayıt anında bir kez hesaplanıp "display" sütununda saklanır; sekme sayfa sayfa okur.
+# Arama: her kayıt eklenirken FTS5 indeksine (history_fts) de yazılır; arşive taşınan kayıtlar
+# indekste kalır, böylece arama tüm geçmişi kapsar.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_DB = os.path.join(BASE_DIR, 'data', 'history.db')
+
+# Eski veritabanı dosyası (Basit JSON) - sadece tek seferlik taşıma için okunur
 DB_FILE = "user_history.json"
 
-def load_history():
-    """Geçmiş verileri JSON dosyasından okur."""
-    if not os.path.exists(DB_FILE):
-        return {"coupons": [], "analyses": []}
-    
+# Geçmiş sekmesinde varsayılan gösterilen kayıt sayısı
+DEFAULT_LIMIT = 50
+# Geçmiş sekmesinde sayfa başına kayıt
+PAGE_SIZE = 10
+
+# API key'siz oturumlar bu kullanıcıya düşer
+ANONYMOUS_USER = "anonim"
+# Kullanıcı ayrımı öncesi ortak geçmiş (isteyen okur, kimse yazmaz)
+LEGACY_USER = "ortak"
+
+# Sıcak katmanda kullanıcı ve tür başına tutulan kayıt
+HOT_LIMIT = 100
+# Taşıma her eklemede değil, sıcak katman bu kadar taştığında toplu yapılır
+ROLL_BATCH = 20
+
+# Arama sonuç sıralaması (bm25) sütun ağırlıkları: başlık (takımlar) > tahminler > metin
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0)
+
+# PRAGMA user_version ile tutulan şema sürümü
+SCHEMA_VERSION = 6
+
+_init_lock = threading.Lock()
+_initialized = False
+_SESSION_USER = contextvars.ContextVar("history_user", default=ANONYMOUS_USER)
+_SHARED_HISTORY = contextvars.ContextVar("history_shared", default=False)
+
+
+def user_id_for(api_key):
+    """API key'in kendisi saklanmaz; kısa bir hash'i kullanıcı kimliği olur."""
+    if not api_key:
+        return ANONYMOUS_USER
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def set_user(api_key):
+    """
+    Bu oturumun geçmiş kullanıcısını atar (ai_engine.set_api_key gibi sadece çağıran
+    oturumu etkiler).
+    """
+    _SESSION_USER.set(user_id_for(api_key))
+
+
+def current_user():
+    return _SESSION_USER.get()
+
+
+def set_shared_history(enabled):
+    """Eski ortak geçmiş (LEGACY_USER) bu oturumun okumalarına eklensin mi (varsayılan: hayır)."""
+    _SHARED_HISTORY.set(bool(enabled))
+
+
+def _readable_users():
+    """Bu oturumun okuyabildiği bölümler: kendi geçmişi (+ istenmişse eski ortak geçmiş)."""
+    if _SHARED_HISTORY.get():
+        return [current_user(), LEGACY_USER]
+    return [current_user()]
+
+
+def get_db_connection():
+    # Eşzamanlı oturumlar: yazan bağlantı kilidi bırakana kadar bekle (hata verme)
+    conn = sqlite3.connect(HISTORY_DB, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_db():
+    """Tabloyu oluşturur ve (bir kez) eski JSON geçmişini taşır."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn = get_db_connection()
+        try:
+            _migrate_schema(conn)
+            _migrate_json(conn)
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def _migrate_schema(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if version < 2:
+            # Kullanıcı bölümü: mevcut satırlar eski ortak geçmiş bölümüne yazılır
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(history)")]
+            if "user_id" not in columns:
+                conn.execute("ALTER TABLE history ADD COLUMN user_id TEXT NOT NULL DEFAULT ''")
+                conn.execute("UPDATE history SET user_id = ?", (LEGACY_USER,))
+            conn.execute("DROP INDEX IF EXISTS idx_history_kind")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user ON history (user_id, kind, id DESC)")
+        if version < 3:
+            # Soğuk katman: (kullanıcı, tür, ay) başına tek sıkıştırılmış segment
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history_archive (
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    entry_count INTEGER NOT NULL,
+                    first_at TEXT NOT NULL,
+                    last_at TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (user_id, kind, month)
+                )
+            """)
+        if version < 4:
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(history)")]
+            if "display" not in columns:
+                conn.execute("ALTER TABLE history ADD COLUMN display TEXT")
+            rows = conn.execute("SELECT id, kind, payload FROM history WHERE display IS NULL").fetchall()
+            conn.executemany("UPDATE history SET display = ? WHERE id = ?", [
+                (json.dumps(display_fields(kind, json.loads(payload)), ensure_ascii=False), row_id)
+                for row_id, kind, payload in rows
+            ])
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_date ON history (user_id, kind, created_at)")
+        if version < 5:
+            # Ters indeks. Metinler Türkçe karakterleri sadeleştirilmiş (relevance.fold) halde yazılır,
+            # sorgu da aynı şekilde sadeleştirilir: "şampiyon" / "sampiyon" ve "İstanbul" / "istanbul" eşleşir
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                    title, picks, body,
+                    user_id UNINDEXED, kind UNINDEXED, created_at UNINDEXED,
+                    tokenize = 'unicode61'
+                )
+            """)
+            for row_id, user_id, kind, created_at, payload in conn.execute(
+                    "SELECT id, user_id, kind, created_at, payload FROM history").fetchall():
+                _index_entry(conn, row_id, user_id, kind, created_at, json.loads(payload))
+            for user_id, kind, blob in conn.execute(
+                    "SELECT user_id, kind, data FROM history_archive").fetchall():
+                for e in _unpack(blob):
+                    _index_entry(conn, e["id"], user_id, kind, e["created_at"], e["entry"])
+        if version < 6:
+            _move_legacy_to_shared(conn)
+        if version < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _move_legacy_to_shared(conn):
+    """
+    Önceki sürümler eski ortak geçmişi GOOGLE_API_KEY ortam değişkeninin hash'ine (yoksa "anonim")
+    yazıyordu; giriş ekranı bu key'i hiç kullanmadığı için kayıtlar kimseye görünmüyordu.
+    O sahibin JSON taşıma anına kadarki kayıtları ortak bölüme geri alınır.
+    """
+    migrated = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+    if not migrated:
+        return
+    old_owner = user_id_for(os.getenv("GOOGLE_API_KEY", ""))
+    ids = [r[0] for r in conn.execute(
+        "SELECT id FROM history WHERE user_id = ? AND created_at <= ?", (old_owner, migrated[0])
+    )]
+    conn.executemany("UPDATE history SET user_id = ? WHERE id = ?", [(LEGACY_USER, i) for i in ids])
+    conn.executemany("UPDATE history_fts SET user_id = ? WHERE rowid = ?", [(LEGACY_USER, i) for i in ids])
+    for kind, month, blob in conn.execute(
+            "SELECT kind, month, data FROM history_archive WHERE user_id = ? AND last_at <= ?",
+            (old_owner, migrated[0])).fetchall():
+        conn.execute("UPDATE history_archive SET user_id = ? WHERE user_id = ? AND kind = ? AND month = ?",
+                     (LEGACY_USER, old_owner, kind, month))
+        conn.executemany("UPDATE history_fts SET user_id = ? WHERE rowid = ?",
+                         [(LEGACY_USER, e["id"]) for e in _unpack(blob)])
+    if ids:
+        print(f"🗄️ Eski ortak geçmiş ({len(ids)} kayıt) tüm kullanıcılara açıldı")
+
+
+def _migrate_json(conn):
+    """user_history.json içeriğini (en eskiden yeniye) tabloya aktarır. Tek seferlik."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return
+    legacy = {"coupons": [], "analyses": []}
+    if os.path.exists(DB_FILE):
+        try:
+            with open(DB_FILE, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Geçmiş taşıma hatası (JSON okunamadı): {e}")
+    rows = []
+    for key, kind in (("coupons", "coupon"), ("analyses", "analysis")):
+        for entry in reversed(legacy.get(key, [])):
+            rows.append((kind, _created_at(entry), entry))
+    # BEGIN IMMEDIATE: iki oturum aynı anda taşımaya başlarsa ikincisi bekler, sonra bayrağı görür
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            for kind, created_at, entry in rows:
+                _insert(conn, LEGACY_USER, kind, created_at, entry)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                         (datetime.datetime.now().isoformat(timespec="seconds"),))
+            print(f"🗄️ Geçmiş taşındı: {len(rows)} kayıt {DB_FILE} -> {HISTORY_DB}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _created_at(entry):
+    """Eski kayıtların "13.02.2026 20:00" tarihini ISO biçimine çevirir (okunamazsa id zaman damgası)."""
     try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {"coupons": [], "analyses": []}
+        return datetime.datetime.strptime(entry.get("date", ""), "%d.%m.%Y %H:%M").isoformat(timespec="seconds")
+    except ValueError:
+        return datetime.datetime.fromtimestamp(entry.get("id", 0)).isoformat(timespec="seconds")
+
+
+def clean_text(value):
+    """HTML kaçışlarını çözer, etiketleri atar."""
+    if value is None: return ""
+    text = html.unescape(str(value))
+    text = re.sub(r"<[^>]+>", "", text)
+    return text.strip()
+
+def normalize_coupon_items(coupon_data):
+    """Kupon verisini (JSON metni, tek dict veya liste) seçim listesine çevirir."""
+    items = coupon_data
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except Exception:
+            items = []
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        items = []
+    return items
+
+def extract_odd_value(odd_val):
+    """"1.45 - 1.60" gibi aralıklarda ortalamayı, tek sayıda sayının kendisini döndürür."""
+    val_str = str(odd_val).strip().replace(",", ".")
+
+    # Aralık Kontrolü (Örn: "1.45 - 1.60")
+    if "-" in val_str:
+        nums = [float(m.group(0)) for m in (re.search(r"\d+(?:\.\d+)?", p) for p in val_str.split("-")) if m]
+        if nums:
+            return sum(nums) / len(nums)
+
+    # Tekil Sayı Kontrolü
+    match_odd = re.search(r"\d+(?:\.\d+)?", val_str)
+    return float(match_odd.group(0)) if match_odd else None
+
+
+def display_fields(kind, entry):
+    """Geçmiş sekmesinin gösterdiği hazır alanlar (kayıt anında bir kez hesaplanır)."""
+    if kind == "coupon":
+        picks, total_odd = [], 1.0
+        coupon_text = "🔥 AKIL HOCASI KUPONU 🔥\n\n"
+        for pick in normalize_coupon_items(entry.get("items", [])):
+            if not isinstance(pick, dict):
+                continue
+            row = {
+                "match": clean_text(pick.get("mac", "-")),
+                "prediction": clean_text(pick.get("tahmin", "-")),
+                "confidence": clean_text(pick.get("guven", "")),
+                "odd": clean_text(pick.get("oran_tahmini", "-")),
+                "reason": clean_text(pick.get("neden", "")),
+            }
+            picks.append(row)
+            coupon_text += f"⚽ {row['match']}\n👉 {row['prediction']} (Oran: {row['odd']})\n\n"
+            odd_num = extract_odd_value(row["odd"])
+            if odd_num: total_odd *= odd_num
+        coupon_text += f"💰 Toplam Oran: {total_odd:.2f}"
+        return {
+            "title": f"{entry.get('date', 'Tarih Yok')} • Toplam Oran: {entry.get('total_odd', '-')}",
+            "picks": picks,
+            "total_odd": f"{total_odd:.2f}",
+            "coupon_text": coupon_text,
+        }
+
+    summary = entry.get("summary", {})
+    if isinstance(summary, str):
+        try:
+            summary = json.loads(summary)
+        except Exception:
+            pass
+    display = {"title": f"{entry.get('match', 'Maç')} • {entry.get('date', '')}".strip(" •")}
+    if isinstance(summary, dict):
+        display.update({
+            "main_pick": clean_text(summary.get("ana_tercih", "-")),
+            "confidence": clean_text(summary.get("guven_skoru", "-")),
+            "text": clean_text(summary.get("analiz_metni", "")),
+        })
+    else:
+        display["text"] = clean_text(summary)
+    return display
+
+
+def _search_fields(kind, entry, display=None):
+    """İndekse giren (başlık, tahminler, metin) üçlüsü."""
+    display = display or display_fields(kind, entry)
+    if kind == "coupon":
+        picks = display["picks"]
+        return (" ".join(p["match"] for p in picks),
+                " ".join(p["prediction"] for p in picks),
+                " ".join(p["reason"] for p in picks))
+    summary = entry.get("summary") if isinstance(entry.get("summary"), dict) else {}
+    return (clean_text(entry.get("match", "")),
+            " ".join(clean_text(summary.get(k, "")) for k in ("ana_tercih", "surpriz_tercih")),
+            " ".join([display.get("text", ""), clean_text(summary.get("kritik_faktor", "")),
+                      clean_text(summary.get("macin_yildizi", ""))]))
+
+
+def _index_entry(conn, row_id, user_id, kind, created_at, entry, display=None):
+    title, picks, body = (relevance.fold(t) for t in _search_fields(kind, entry, display))
+    conn.execute(
+        "INSERT INTO history_fts (rowid, title, picks, body, user_id, kind, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (row_id, title, picks, body, user_id, kind, created_at)
+    )
+
+
+def _insert(conn, user_id, kind, created_at, entry):
+    """Kaydı ve arama indeksini aynı (açık) işlemde yazar."""
+    display = display_fields(kind, entry)
+    cur = conn.execute(
+        "INSERT INTO history (user_id, kind, created_at, payload, display) VALUES (?, ?, ?, ?, ?)",
+        (user_id, kind, created_at, json.dumps(entry, ensure_ascii=False), json.dumps(display, ensure_ascii=False))
+    )
+    _index_entry(conn, cur.lastrowid, user_id, kind, created_at, entry, display)
+
+
+def _append(kind, entry, created):
+    init_db()
+    conn = get_db_connection()
+    try:
+        # Yazma kilidi işlem başında alınır: eşzamanlı yazanlar sırayla bekler, kayıt kaybolmaz
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _insert(conn, current_user(), kind, created.isoformat(timespec="seconds"), entry)
+            _roll_to_archive(conn, current_user(), kind)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+
+def _pack(entries):
+    return zlib.compress(json.dumps(entries, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _roll_to_archive(conn, user_id, kind):
+    """
+    Sıcak katman HOT_LIMIT + ROLL_BATCH'i aştıysa en eski kayıtları aylık arşiv segmentlerine taşır.
+    Açık işlemin içinde çağrılır; taşıma ve silme aynı işlemde olur.
+    """
+    count = conn.execute(
+        "SELECT COUNT(*) FROM history WHERE user_id = ? AND kind = ?", (user_id, kind)
+    ).fetchone()[0]
+    if count <= HOT_LIMIT + ROLL_BATCH:
+        return 0
+    old_rows = conn.execute(
+        "SELECT id, created_at, payload, display FROM history WHERE user_id = ? AND kind = ? "
+        "ORDER BY id ASC LIMIT ?", (user_id, kind, count - HOT_LIMIT)
+    ).fetchall()
+    by_month = {}
+    for row_id, created_at, payload, display in old_rows:
+        by_month.setdefault(created_at[:7], []).append(
+            {"id": row_id, "created_at": created_at, "entry": json.loads(payload),
+             "display": json.loads(display) if display else None}
+        )
+    for month, entries in by_month.items():
+        existing = conn.execute(
+            "SELECT data FROM history_archive WHERE user_id = ? AND kind = ? AND month = ?",
+            (user_id, kind, month)
+        ).fetchone()
+        if existing:
+            entries = _unpack(existing[0]) + entries
+        entries.sort(key=lambda e: e["id"])
+        conn.execute("""
+            INSERT INTO history_archive (user_id, kind, month, entry_count, first_at, last_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, kind, month) DO UPDATE SET
+                entry_count=excluded.entry_count, first_at=excluded.first_at,
+                last_at=excluded.last_at, data=excluded.data
+        """, (user_id, kind, month, len(entries), entries[0]["created_at"], entries[-1]["created_at"],
+              _pack(entries)))
+    conn.execute(
+        "DELETE FROM history WHERE user_id = ? AND kind = ? AND id <= ?", (user_id, kind, old_rows[-1][0])
+    )
+    print(f"🗄️ Geçmiş arşivlendi: {len(old_rows)} {kind} kaydı, {len(by_month)} ay segmenti")
+    return len(old_rows)
+
+
+def _with_display(kind, payload, display):
+    entry = json.loads(payload) if isinstance(payload, str) else payload
+    entry["display"] = json.loads(display) if isinstance(display, str) else (display or display_fields(kind, entry))
+    return entry
+
+
+def _latest(kind, limit):
+    return get_history_page(kind, 0, limit)["entries"]
+
+
+def _users_filter():
+    """Okunabilir bölümler için "user_id IN (...)" ve parametreleri."""
+    users = _readable_users()
+    return f"user_id IN ({','.join('?' * len(users))})", users
+
+
+def _date_filter(date_from, date_to):
+    """created_at (ISO) üzerinde gün bazlı aralık; sınırlar dahil."""
+    clauses, params = [], []
+    if date_from:
+        clauses.append("created_at >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        clauses.append("created_at < ?")
+        params.append((date_to + datetime.timedelta(days=1)).isoformat())
+    return "".join(f" AND {c}" for c in clauses), params
 
-def save_history(data):
-    """Verileri JSON dosyasına yazar."""
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
 
 def add_coupon(coupon_data, total_odd):
     """Yeni bir kuponu geçmişe ekler."""
-    history = load_history()
-    
-    # Yeni kayıt
+    now = datetime.datetime.now()
     new_entry = {
-        "id": int(datetime.datetime.now().timestamp()), # Benzersiz ID
-        "date": datetime.datetime.now().strftime("%d.%m.%Y %H:%M"),
+        "id": int(now.timestamp()), # Benzersiz ID
+        "date": now.strftime("%d.%m.%Y %H:%M"),
         "type": "coupon",
         "total_odd": total_odd,
         "items": coupon_data
     }
-    
-    # Listeye ekle (En başa)
-    history["coupons"].insert(0, new_entry)
-    
-    # Son 50 kuponu tut (Dosya şişmesin)
-    history["coupons"] = history["coupons"][:50]
-    
-    save_history(history)
+    _append("coupon", new_entry, now)
 
 def add_analysis(match_name, ai_response):
     """Yeni bir maç analizini geçmişe ekler."""
-    history = load_history()
-    
+    now = datetime.datetime.now()
     new_entry = {
-        "id": int(datetime.datetime.now().timestamp()),
-        "date": datetime.datetime.now().strftime("%d.%m.%Y %H:%M"),
+        "id": int(now.timestamp()),
+        "date": now.strftime("%d.%m.%Y %H:%M"),
         "type": "analysis",
         "match": match_name,
         "summary": ai_response
     }
-    
-    history["analyses"].insert(0, new_entry)
-    history["analyses"] = history["analyses"][:50]
-    
-    save_history(history)
-
-def get_user_coupons():
-    """Kayıtlı kuponları döndürür."""
-    data = load_history()
-    return data.get("coupons", [])
-
-def get_user_analyses():
-    """Kayıtlı analizleri döndürür."""
-    data = load_history()
-    return data.get("analyses", [])
\ No newline at end of file
+    _append("analysis", new_entry, now)
+
+def get_user_coupons(limit=DEFAULT_LIMIT):
+    """Bu oturumun kullanıcısına ait kuponları (en yeniden eskiye, son limit tanesi) döndürür."""
+    return _latest("coupon", limit)
+
+def get_user_analyses(limit=DEFAULT_LIMIT):
+    """Bu oturumun kullanıcısına ait analizleri (en yeniden eskiye, son limit tanesi) döndürür."""
+    return _latest("analysis", limit)
+
+def count_history(kind, date_from=None, date_to=None):
+    """Sıcak katmanda filtreye uyan kayıt sayısı (sayfa sayısı için)."""
+    init_db()
+    users, user_params = _users_filter()
+    where, params = _date_filter(date_from, date_to)
+    conn = get_db_connection()
+    try:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM history WHERE {users} AND kind = ?{where}",
+            user_params + [kind] + params
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+def get_history_page(kind, offset=0, limit=PAGE_SIZE, date_from=None, date_to=None):
+    """
+    Sıcak katmandan tek sayfa (en yeniden eskiye). date_from / date_to: datetime.date (dahil).
+    Dönüş: {"entries": [kayıt + "display"], "total": filtreye uyan kayıt sayısı, "offset", "limit"}
+    """
+    init_db()
+    users, user_params = _users_filter()
+    where, params = _date_filter(date_from, date_to)
+    total = count_history(kind, date_from, date_to)
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT payload, display FROM history WHERE {users} AND kind = ?{where} "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            user_params + [kind] + params + [limit, offset]
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        "entries": [_with_display(kind, payload, display) for payload, display in rows],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+    }
+
+def get_archive_index(kind):
+    """Bu kullanıcının (ve ortak geçmişin) arşiv ayları (yeniden eskiye): [{"month", "count", "first_at", "last_at"}]"""
+    init_db()
+    users, user_params = _users_filter()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT month, SUM(entry_count), MIN(first_at), MAX(last_at) FROM history_archive "
+            f"WHERE {users} AND kind = ? GROUP BY month ORDER BY month DESC", user_params + [kind]
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"month": m, "count": c, "first_at": f, "last_at": l} for m, c, f, l in rows]
+
+def get_archived(kind, month):
+    """Bir ayın arşivlenmiş kayıtları (en yeniden eskiye)."""
+    init_db()
+    conn = get_db_connection()
+    try:
+        entries = _archived_entries(conn, kind, month)
+    finally:
+        conn.close()
+    return [_with_display(kind, e["entry"], e.get("display")) for e in reversed(entries)]
+
+def _archived_entries(conn, kind, month):
+    """Okunabilir bölümlerin o ayki arşiv segmentleri, id sırasıyla birleşik."""
+    users, user_params = _users_filter()
+    entries = []
+    for (blob,) in conn.execute(
+            f"SELECT data FROM history_archive WHERE {users} AND kind = ? AND month = ?",
+            user_params + [kind, month]):
+        entries.extend(_unpack(blob))
+    return sorted(entries, key=lambda e: e["id"])
+
+def _fts_query(text):
+    """Kullanıcı metni -> FTS5 sorgusu: her kelime önek olarak aranır, hepsi geçmeli (VE)."""
+    tokens = re.findall(r"[a-z0-9]+", relevance.fold(text))
+    return " ".join(f'"{tok}"*' for tok in tokens)
+
+def count_search(query, kind=None):
+    """Aramaya uyan kayıt sayısı (sayfa sayısı için)."""
+    match = _fts_query(query)
+    if not match:
+        return 0
+    init_db()
+    users, user_params = _users_filter()
+    where, params = " AND kind = ?" if kind else "", [kind] if kind else []
+    conn = get_db_connection()
+    try:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM history_fts WHERE history_fts MATCH ? AND {users}{where}",
+            [match] + user_params + params
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+def search_history(query, kind=None, offset=0, limit=PAGE_SIZE):
+    """
+    Kullanıcının tüm geçmişinde (sıcak + arşiv) tam metin arama; bm25 ile sıralı.
+    Dönüş: {"entries": [kayıt + "display" + "kind"], "total", "offset", "limit"}
+    """
+    match = _fts_query(query)
+    if not match:
+        return {"entries": [], "total": 0, "offset": offset, "limit": limit}
+    total = count_search(query, kind)
+    users, user_params = _users_filter()
+    where, params = " AND kind = ?" if kind else "", [kind] if kind else []
+    conn = get_db_connection()
+    try:
+        hits = conn.execute(
+            f"SELECT rowid, kind, created_at FROM history_fts WHERE history_fts MATCH ? AND {users}{where} "
+            "ORDER BY bm25(history_fts, ?, ?, ?) LIMIT ? OFFSET ?",
+            [match] + user_params + params + list(SEARCH_WEIGHTS) + [limit, offset]
+        ).fetchall()
+        entries = []
+        hot = {row_id: (payload, display) for row_id, payload, display in conn.execute(
+            f"SELECT id, payload, display FROM history WHERE id IN ({','.join('?' * len(hits))})",
+            [h[0] for h in hits]
+        )} if hits else {}
+        segments = {}
+        for row_id, hit_kind, created_at in hits:
+            if row_id in hot:
+                entry = _with_display(hit_kind, *hot[row_id])
+            else:
+                # Arşivdeki kayıt: ayın segmenti bir kez açılır
+                seg_key = (hit_kind, created_at[:7])
+                if seg_key not in segments:
+                    segments[seg_key] = {e["id"]: e for e in _archived_entries(conn, hit_kind, created_at[:7])}
+                archived = segments[seg_key].get(row_id)
+                if archived is None:
+                    continue
+                entry = _with_display(hit_kind, archived["entry"], archived.get("display"))
+            entry["kind"] = hit_kind
+            entries.append(entry)
+    finally:
+        conn.close()
+    return {"entries": entries, "total": total, "offset": offset, "limit": limit}
@@ -1,15 +1,142 @@
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, 'data', 'futbol.db')
 
+# --- BAĞLANTI YÖNETİMİ ---
+# Her thread tek bir bağlantıyı açık tutar ve tekrar kullanır (her sorguda connect/close yok).
+# WAL modunda okuyucular yazanı beklemez; yazmalar transaction() ile tek işlemde yapılır.
+# Bağlantılar autocommit (isolation_level=None) açılır: okumalar açık işlem tutmaz.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),        # WAL'da güvenli; her commit'te fsync yok
+    ("cache_size", -16000),           # ~16 MB sayfa önbelleği (negatif: KB)
+    ("mmap_size", 128 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),           # kilitliyse hata yerine 5 sn bekle
+)
+
+# futbol.db'nin tuttuğu lig (scraper'da varsayılan sayfa: Süper Lig). Diğer liglerin haftaları
+# karışmasın diye uygulama sadece bu ligin verisini yazar.
+LEAGUE_VALUE = "1-1"
+
+# PRAGMA user_version ile tutulan şema sürümü; bkz. _migrate
+SCHEMA_VERSION = 2
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()  # şeması bu süreçte kontrol edilmiş veritabanı yolları
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    with _schema_lock:
+        if path not in _schema_ready:
+            _migrate(conn)
+            _schema_ready.add(path)
+    return conn
+
+def _migrate(conn):
+    """Tabloları oluşturur ve eksik şema sürümlerini sırayla uygular (süreç başına bir kez)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _create_tables(conn.cursor())
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Aynı hafta + eşleşmenin tekrar eden kayıtlarından en son yazılanı kalır
+            removed = conn.execute("""
+                DELETE FROM matches WHERE id NOT IN (
+                    SELECT MAX(id) FROM matches GROUP BY week, home_team, away_team
+                )
+            """).rowcount
+            if removed:
+                print(f"🗄️ matches: {removed} tekrar eden kayıt silindi")
+            # UNIQUE(week, home_team, away_team): ON CONFLICT upsert'inin hedefi
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_matches_fixture ON matches (week, home_team, away_team)")
+            # Takım bazlı okumalar (ev / deplasman ayrı) tabloya hiç gitmeden indeksten karşılanır
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_matches_home
+                ON matches (home_team, is_played, week, away_team, home_score, away_score)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_matches_away
+                ON matches (away_team, is_played, week, home_team, home_score, away_score)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_played_week ON matches (is_played, week)")
+            conn.execute("ANALYZE")
+        if version < 2:
+            # Takım başına hazır toplamlar; maç yazan işlemler içinde artımlı güncellenir (bkz. _apply_matches)
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS team_aggregates (
+                    team TEXT PRIMARY KEY,
+                    {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in _AGG_COLS)},
+                    form TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            _rebuild_aggregates(conn)
+        if version < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
 def get_db_connection():
-    return sqlite3.connect(DB_PATH)
+    """Bu thread'in bağlantısı (ilk çağrıda açılır). Kapatılmamalı; bkz. close_connection."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _connect(DB_PATH)
+        _local.conn, _local.path = conn, DB_PATH
+    return conn
 
-def init_db():
+def close_connection():
+    """Bu thread'in bağlantısını kapatır (thread bitince zaten kapanır)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction(immediate=True):
+    """
+    Yazma işlemi: blok başarılıysa commit, hata olursa rollback.
+    immediate: yazma kilidi işlem başında alınır (okuyup sonra yazan işlemlerde kilit yükseltme hatası olmaz).
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def db_signature():
+    """
+    Veritabanı içeriği değişince değişen imza (önbellek anahtarı için).
+    WAL modunda yazmalar önce -wal dosyasına gider; ana dosyanın mtime'ı tek başına yetmez.
+    """
+    sig = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+def init_db():
+    """Şemayı hazırlar (tablolar + migration'lar). Bağlantı ilk açıldığında da otomatik çalışır."""
+    get_db_connection()
+
+def _create_tables(cursor):
     
     # 1. Tablo: Takımlar (Puan Durumu)
     cursor.execute("""
@@ -38,59 +165,252 @@ def init_db():
             is_played BOOLEAN DEFAULT 0
         )
     """)
-    conn.commit()
-    conn.close()
 
 # --- VERİ KAYDETME FONKSİYONLARI ---
 
+_TEAM_UPSERT = """
+    INSERT INTO teams (name, played, wins, draws, losses, goals_for, goals_against, points)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        played=excluded.played, wins=excluded.wins, draws=excluded.draws,
+        losses=excluded.losses, goals_for=excluded.goals_for,
+        goals_against=excluded.goals_against, points=excluded.points
+"""
+
+_MATCH_UPSERT = """
+    INSERT INTO matches (week, home_team, away_team, home_score, away_score, is_played)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(week, home_team, away_team) DO UPDATE SET
+        home_score=excluded.home_score, away_score=excluded.away_score,
+        is_played=excluded.is_played
+"""
+
+def _team_row(team_data):
+    return (team_data['name'], team_data['played'], team_data['wins'], team_data['draws'],
+            team_data['losses'], team_data['goals_for'], team_data['goals_against'], team_data['points'])
+
 def update_team_stats(team_data):
     """Puan durumunu günceller"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO teams (name, played, wins, draws, losses, goals_for, goals_against, points)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(name) DO UPDATE SET
-                played=excluded.played, wins=excluded.wins, draws=excluded.draws,
-                losses=excluded.losses, goals_for=excluded.goals_for,
-                goals_against=excluded.goals_against, points=excluded.points
-        """, (team_data['name'], team_data['played'], team_data['wins'], team_data['draws'], 
-              team_data['losses'], team_data['goals_for'], team_data['goals_against'], team_data['points']))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(_TEAM_UPSERT, _team_row(team_data))
     except Exception as e:
         print(f"DB Team Error: {e}")
-    conn.close()
 
 def save_match_result(week, home, away, h_score, a_score, played):
-    """Maç sonucunu kaydeder"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Maç sonucunu kaydeder (aynı hafta + eşleşme varsa skoru günceller)"""
     try:
-        # Aynı maçı tekrar kaydetmemek için kontrol (Takımlar ve Hafta aynıysa güncelle)
-        cursor.execute("""
-            SELECT id FROM matches WHERE home_team=? AND away_team=? AND week=?
-        """, (home, away, week))
-        existing = cursor.fetchone()
-        
-        if existing:
-            cursor.execute("""
-                UPDATE matches SET home_score=?, away_score=?, is_played=? 
-                WHERE id=?
-            """, (h_score, a_score, played, existing[0]))
-        else:
-            cursor.execute("""
-                INSERT INTO matches (week, home_team, away_team, home_score, away_score, is_played)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (week, home, away, h_score, a_score, played))
-        conn.commit()
+        with transaction() as conn:
+            _apply_matches(conn, [(week, home, away, h_score, a_score, played)])
     except Exception as e:
         print(f"DB Match Error: {e}")
-    conn.close()
+
+# --- TAKIM TOPLAMLARI (team_aggregates) ---
+# Genel / iç saha / dış saha G-B-M ve atılan-yenen gol, takım başına tek satırda tutulur.
+# Maç yazılırken aynı işlem içinde güncellenir: eski skorun katkısı çıkarılır, yenisi eklenir.
+# Son 5 maç formu (yeniden eskiye "WDL..." dizisi) etkilenen takımlar için indeksten yeniden okunur.
+# Okumalar (calculate_team_performance, get_form_analysis) böylece tek satırlık birincil anahtar okuması.
+
+_AGG_SCOPES = ("", "home_", "away_")
+_AGG_COLS = tuple(f"{scope}{c}" for scope in _AGG_SCOPES for c in ("w", "d", "l", "gf", "ga"))
+_AGG_UPSERT = f"""
+    INSERT INTO team_aggregates (team, {", ".join(_AGG_COLS)}) VALUES (?{", ?" * len(_AGG_COLS)})
+    ON CONFLICT(team) DO UPDATE SET {", ".join(f"{c}={c}+excluded.{c}" for c in _AGG_COLS)}
+"""
+
+def _is_counted(h_score, a_score, played):
+    return bool(played) and h_score is not None and a_score is not None
+
+def _add_result(deltas, team, side, gf, ga, sign):
+    """Bir maç sonucunun takıma katkısını (sign: +1 ekle, -1 çıkar) delta listesine işler."""
+    row = deltas.setdefault(team, [0] * len(_AGG_COLS))
+    res = (gf > ga, gf == ga, gf < ga, gf, ga)
+    for offset in (0, _AGG_SCOPES.index(side + "_") * 5):
+        for i, value in enumerate(res):
+            row[offset + i] += sign * value
+
+def _refresh_form(conn, teams):
+    for team in teams:
+        rows = conn.execute("""
+            SELECT home_team, home_score, away_score
+            FROM matches
+            WHERE (home_team=? OR away_team=?) AND is_played=1
+              AND home_score IS NOT NULL AND away_score IS NOT NULL
+            ORDER BY week DESC LIMIT 5
+        """, (team, team)).fetchall()
+        form = ""
+        for h_team, h_s, a_s in rows:
+            my, opp = (h_s, a_s) if h_team == team else (a_s, h_s)
+            form += "W" if my > opp else "D" if my == opp else "L"
+        conn.execute("UPDATE team_aggregates SET form=? WHERE team=?", (form, team))
+
+def _apply_matches(conn, match_rows):
+    """
+    Maç satırlarını yazar ve team_aggregates'i aynı işlem içinde günceller.
+    match_rows: (week, home, away, h_score, a_score, played)
+    """
+    deltas = {}
+    pending = {}  # aynı toplu yazmada aynı maç iki kez gelirse "eski" değer bir öncekidir
+    for week, home, away, h_score, a_score, played in match_rows:
+        key = (week, home, away)
+        old = pending.get(key)
+        if old is None:
+            old = conn.execute(
+                "SELECT home_score, away_score, is_played FROM matches WHERE week=? AND home_team=? AND away_team=?",
+                key
+            ).fetchone()
+        if old and _is_counted(*old):
+            _add_result(deltas, home, "home", old[0], old[1], -1)
+            _add_result(deltas, away, "away", old[1], old[0], -1)
+        if _is_counted(h_score, a_score, played):
+            _add_result(deltas, home, "home", h_score, a_score, 1)
+            _add_result(deltas, away, "away", a_score, h_score, 1)
+        pending[key] = (h_score, a_score, played)
+    conn.executemany(_MATCH_UPSERT, match_rows)
+    if deltas:
+        conn.executemany(_AGG_UPSERT, [(team, *row) for team, row in deltas.items()])
+        _refresh_form(conn, deltas)
+
+def _rebuild_aggregates(conn):
+    conn.execute("DELETE FROM team_aggregates")
+    deltas = {}
+    for _, home, away, h_score, a_score in conn.execute("""
+        SELECT week, home_team, away_team, home_score, away_score FROM matches
+        WHERE is_played=1 AND home_score IS NOT NULL AND away_score IS NOT NULL
+    """).fetchall():
+        _add_result(deltas, home, "home", h_score, a_score, 1)
+        _add_result(deltas, away, "away", a_score, h_score, 1)
+    conn.executemany(_AGG_UPSERT, [(team, *row) for team, row in deltas.items()])
+    _refresh_form(conn, deltas)
+
+def rebuild_team_aggregates():
+    """team_aggregates'i maç tablosundan baştan hesaplar (tablo dışarıdan değiştirildiyse)."""
+    with transaction() as conn:
+        _rebuild_aggregates(conn)
+
+# --- TOPLU YAZMA ---
+# Sezon / lig yüklemesinde satır başına işlem (ve commit) yerine tüm satırlar executemany ile
+# tek işlemde yazılır (takım toplamları dahil). Ya hepsi yazılır ya hiçbiri.
+
+def ingest(teams=(), matches=()):
+    """
+    teams:   update_team_stats'in aldığı sözlükler
+    matches: save_match_result argüman sırasıyla (week, home, away, h_score, a_score, played)
+    Dönen rapor: {"teams", "matches", "seconds", "rows_per_sec"} (hata olursa "error" ile, yazılan 0)
+    """
+    team_rows = [_team_row(t) for t in teams]
+    match_rows = [tuple(m) for m in matches]
+    t0 = time.perf_counter()
+    try:
+        with transaction() as conn:
+            if team_rows:
+                conn.executemany(_TEAM_UPSERT, team_rows)
+            if match_rows:
+                _apply_matches(conn, match_rows)
+    except Exception as e:
+        print(f"DB Bulk Error: {e}")
+        return {"teams": 0, "matches": 0, "seconds": time.perf_counter() - t0, "rows_per_sec": 0.0, "error": str(e)}
+    seconds = time.perf_counter() - t0
+    rows = len(team_rows) + len(match_rows)
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"🗄️ Toplu yazma: {len(team_rows)} takım + {len(match_rows)} maç, {seconds * 1000:.1f} ms ({rate:.0f} satır/sn)")
+    return {"teams": len(team_rows), "matches": len(match_rows), "seconds": seconds, "rows_per_sec": rate}
+
+def bulk_update_team_stats(teams):
+    """update_team_stats'in toplu hali (tek işlem)."""
+    return ingest(teams=teams)
+
+def bulk_save_match_results(matches):
+    """save_match_result'ın toplu hali (tek işlem)."""
+    return ingest(matches=matches)
+
+_TR_UPPER = str.maketrans({"i": "İ", "ı": "I"})
+_TR_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+
+def _name_key(name):
+    """Takım adının büyük/küçük harf ve boşluktan bağımsız karşılaştırma anahtarı (Türkçe kurallarla)."""
+    return " ".join(name.translate(_TR_LOWER).lower().split())
+
+def _known_team_names(conn):
+    """Veritabanındaki takım adları: karşılaştırma anahtarı -> kayıtlı yazım."""
+    rows = conn.execute(
+        "SELECT name FROM teams UNION SELECT home_team FROM matches UNION SELECT away_team FROM matches"
+    ).fetchall()
+    return {_name_key(r[0]): r[0] for r in rows if r[0]}
+
+def canonical_team_name(name, known):
+    """
+    Sitedeki takım adını veritabanındaki yazımına çevirir (örn. 'Gaziantep' -> 'GAZİANTEP').
+    Veritabanında yoksa Türkçe kurallarla büyük harfe çevrilir (mevcut kayıtlar büyük harf).
+    """
+    name = " ".join(name.split())
+    return known.get(_name_key(name)) or name.translate(_TR_UPPER).upper()
+
+def rows_from_fixture_and_standings(data, known=None):
+    """
+    scraper.get_fixture_and_standings çıktısını (takım satırları, maç satırları)na çevirir.
+    Takım adları known (_known_team_names) ile veritabanındaki yazıma çevrilir.
+    Fikstürün haftası sayfadan okunamadıysa (data["week"] boş) maçlar hiç yazılmaz:
+    tahmin edilen hafta başka haftanın maçlarını ezebilir. Puan durumu haftadan bağımsızdır.
+    """
+    known = known or {}
+    teams = [dict(t, name=canonical_team_name(t["name"], known)) for t in data.get("table", []) if t.get("name")]
+    week = data.get("week")
+    if not week:
+        if data.get("matches"):
+            print(f"🗄️ Fikstür haftası okunamadı, {len(data['matches'])} maç yazılmadı")
+        return teams, []
+    matches = []
+    for m in data.get("matches", []):
+        if not m.get("home") or not m.get("away"):
+            continue
+        home, away = canonical_team_name(m["home"], known), canonical_team_name(m["away"], known)
+        score = m.get("score")
+        if score:
+            matches.append((week, home, away, score[0], score[1], 1))
+        else:
+            matches.append((week, home, away, None, None, 0))
+    return teams, matches
+
+def ingest_fixture_and_standings(data):
+    """Scraper'dan gelen puan durumu + fikstürü tek işlemde veritabanına yazar."""
+    teams, matches = rows_from_fixture_and_standings(data, _known_team_names(get_db_connection()))
+    return ingest(teams, matches)
+
+def _empty_stats():
+    return {
+        "general": {"p": 0, "w": 0, "d": 0, "l": 0, "gf": 0, "ga": 0},
+        "home":    {"p": 0, "w": 0, "d": 0, "l": 0, "gf": 0, "ga": 0},
+        "away":    {"p": 0, "w": 0, "d": 0, "l": 0, "gf": 0, "ga": 0},
+        "form":    []
+    }
+
+def _get_aggregates(team_name):
+    conn = get_db_connection()
+    row = conn.execute(
+        f"SELECT {', '.join(_AGG_COLS)}, form FROM team_aggregates WHERE team=?", (team_name,)
+    ).fetchone()
+    return dict(zip(_AGG_COLS + ("form",), row)) if row else None
 
 def calculate_team_performance(team_name):
+    """
+    İç Saha, Dış Saha ve Genel performans (team_aggregates'ten tek satır okuma).
+    Sonuç calculate_team_performance_scan ile aynıdır.
+    """
+    stats = _empty_stats()
+    agg = _get_aggregates(team_name)
+    if agg is None:
+        return stats
+    for cat, scope in (("general", ""), ("home", "home_"), ("away", "away_")):
+        w, d, l = agg[scope + "w"], agg[scope + "d"], agg[scope + "l"]
+        stats[cat] = {"p": 3 * w + d, "w": w, "d": d, "l": l, "gf": agg[scope + "gf"], "ga": agg[scope + "ga"]}
+    stats["form"] = list(agg["form"])
+    return stats
+
+def calculate_team_performance_scan(team_name):
     """
     Maç tablosunu okuyarak İç Saha, Dış Saha ve Genel performansı HESAPLAR.
+    (Toplamlar tablosundan önceki yöntem; doğrulama ve benchmark için.)
     """
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -99,12 +419,12 @@ def calculate_team_performance(team_name):
     cursor.execute("""
         SELECT week, home_team, away_team, home_score, away_score 
         FROM matches 
-        WHERE (home_team=? OR away_team=?) AND is_played=1 
+        WHERE (home_team=? OR away_team=?) AND is_played=1
+          AND home_score IS NOT NULL AND away_score IS NOT NULL
         ORDER BY week ASC
     """, (team_name, team_name))
     
     matches = cursor.fetchall()
-    conn.close()
 
     # İstatistik Sepetleri
     stats = {
@@ -168,26 +488,38 @@ def get_current_week():
         return res[0] if res and res[0] else 38
     except:
         return 1
-    finally:
-        conn.close()
 
 def get_matches_by_week(week):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT home_team, away_team FROM matches WHERE week=?", (week,))
     res = cursor.fetchall()
-    conn.close()
     return [f"{r[0]} - {r[1]}" for r in res]
 
 # --- ANALİZ İÇİN VERİ ÇEKME FONKSİYONLARI ---
 
+def get_played_matches():
+    """Oynanmış tüm maçlar (hafta, ev, deplasman, ev golü, dep golü). Yerel tahmin modeli kullanır."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT week, home_team, away_team, home_score, away_score
+            FROM matches
+            WHERE is_played=1 AND home_score IS NOT NULL AND away_score IS NOT NULL
+            ORDER BY week ASC
+        """)
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"DB Match Read Error: {e}")
+        return []
+
 def get_team_stats(team_name):
     """Puan tablosu verisi"""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM teams WHERE name LIKE ?", (f"%{team_name}%",))
     row = cursor.fetchone()
-    conn.close()
     if row:
         return {
             "name": row[1], "played": row[2], "wins": row[3], "draws": row[4],
@@ -201,15 +533,32 @@ def get_team_rank(team_name):
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM teams ORDER BY points DESC, (goals_for - goals_against) DESC")
     all_teams = [row[0] for row in cursor.fetchall()]
-    conn.close()
     try:
         return all_teams.index(team_name) + 1
     except:
         return 0
 
+_FORM_TR = {"W": "G", "D": "B", "L": "M"}
+
 def get_form_analysis(team_name, role):
     """
-    MATEMATİKSEL FORM ANALİZİ:
+    MATEMATİKSEL FORM ANALİZİ (team_aggregates'ten tek satır okuma):
+    - Son 5 maç (eskiden yeniye G-B-M)
+    - İç saha / Dış saha karnesi
+    """
+    agg = _get_aggregates(team_name) or dict.fromkeys(_AGG_COLS, 0) | {"form": ""}
+    scope = "home_" if role == "home" else "away_"
+    count = agg[scope + "w"] + agg[scope + "d"] + agg[scope + "l"]
+    place = "Evinde" if role == "home" else "Deplasmanda"
+    loc_stat = f"{place} {count} maçta {agg[scope + 'gf']} gol attı, {agg[scope + 'ga']} yedi."
+    return {
+        "last_5": "-".join(_FORM_TR[r] for r in reversed(agg["form"])),
+        "location_stat": loc_stat if count > 0 else "Veri yok"
+    }
+
+def get_form_analysis_scan(team_name, role):
+    """
+    MATEMATİKSEL FORM ANALİZİ (maç tablosu taramasıyla; doğrulama ve benchmark için):
     - Son 5 maçı bulur.
     - İç saha / Dış saha ayrımına göre özel istatistik çıkarır.
     """
@@ -220,7 +569,8 @@ def get_form_analysis(team_name, role):
     cursor.execute("""
         SELECT home_team, away_team, home_score, away_score 
         FROM matches 
-        WHERE (home_team=? OR away_team=?) AND is_played=1 
+        WHERE (home_team=? OR away_team=?) AND is_played=1
+          AND home_score IS NOT NULL AND away_score IS NOT NULL
         ORDER BY week DESC LIMIT 5
     """, (team_name, team_name))
     last_5_matches = cursor.fetchall()
@@ -238,7 +588,8 @@ def get_form_analysis(team_name, role):
     # 2. İÇ/DIŞ SAHA KARNESİ
     if role == "home":
         # Sadece evindeki maçlar
-        cursor.execute("SELECT home_score, away_score FROM matches WHERE home_team=? AND is_played=1", (team_name,))
+        cursor.execute("SELECT home_score, away_score FROM matches WHERE home_team=? AND is_played=1 "
+                       "AND home_score IS NOT NULL AND away_score IS NOT NULL", (team_name,))
         matches = cursor.fetchall()
         # Evindeki gol ortalaması
         goals_scored = sum([m[0] for m in matches])
@@ -247,14 +598,13 @@ def get_form_analysis(team_name, role):
         loc_stat = f"Evinde {count} maçta {goals_scored} gol attı, {goals_conceded} yedi."
     else:
         # Sadece deplasmandaki maçlar
-        cursor.execute("SELECT home_score, away_score FROM matches WHERE away_team=? AND is_played=1", (team_name,))
+        cursor.execute("SELECT home_score, away_score FROM matches WHERE away_team=? AND is_played=1 "
+                       "AND home_score IS NOT NULL AND away_score IS NOT NULL", (team_name,))
         matches = cursor.fetchall()
         goals_scored = sum([m[1] for m in matches]) # Deplasman golü 2. indekstir
         goals_conceded = sum([m[0] for m in matches])
         count = len(matches)
         loc_stat = f"Deplasmanda {count} maçta {goals_scored} gol attı, {goals_conceded} yedi."
-        
-    conn.close()
     
     return {
         "last_5": "-".join(form_str[::-1]), # Eskiden yeniye sırala
@@ -0,0 +1,111 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# --- İSTEK SÜRE BÜTÇESİ (DEADLINE) ---
+# "Maçı analiz et" gibi bir istek; sayfa açma, bekleme ve yapay zeka tekrar denemeleriyle
+# sınırsız uzayabiliyordu. İstek başında bir süre bütçesi açılır ve context değişkeniyle
+# scraper ve ai_engine katmanlarına taşınır. Her aşama zaman aşımını kalan süreden hesaplar,
+# opsiyonel aşamalar (lig istatistikleri gibi) süre yetmiyorsa atlanır, süre dolduğunda
+# eldeki kısmi sonuçla (veya yerel tahminle) dönülür.
+# Thread havuzlarına context değişkeni taşınmaz; havuzdaki işler kendi scope'larını açar
+# (örn. toto_enrichment her scrape'i kalan bütçeyle çalıştırır).
+
+# "Maç Simüle Ediliyor" isteğinin toplam bütçesi (sn)
+ANALYSIS_BUDGET = 90.0
+# Bu bütçenin maç detayı + yapay zeka için ayrılan kısmı; opsiyonel aşamalar kalanla yetinir
+ANALYSIS_CORE_RESERVE = 50.0
+
+
+class Deadline:
+    def __init__(self, budget):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget
+        self.skipped = []  # süre yetmediği için atlanan / yarıda kesilen aşamalar
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, seconds):
+        """Kalan süre en az bu kadar mı? (opsiyonel aşamalar için)"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap):
+        """Aşamanın zaman aşımı (sn): kendi üst sınırı ile kalan sürenin küçüğü."""
+        return min(cap, self.remaining())
+
+    def skip(self, stage):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+        print(f"⏱️ Süre bütçesi: '{stage}' atlandı ({self.remaining():.1f} sn kaldı)")
+
+
+_CURRENT = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current():
+    """İçinde bulunulan isteğin bütçesi (yoksa None: sınırsız)."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def scope(budget):
+    """İstek bütçesini açar. İç içe kullanımda dıştaki bütçeyi aşamaz."""
+    parent = _CURRENT.get()
+    if parent is not None:
+        budget = min(budget, parent.remaining())
+    dl = Deadline(budget)
+    if parent is not None:
+        dl.skipped = parent.skipped
+    token = _CURRENT.set(dl)
+    try:
+        yield dl
+    finally:
+        _CURRENT.reset(token)
+
+
+def remaining(default=None):
+    dl = _CURRENT.get()
+    return default if dl is None else dl.remaining()
+
+
+def timeout(cap):
+    """Bütçe varsa kalan süreyle sınırlanmış, yoksa olduğu gibi cap (sn)."""
+    dl = _CURRENT.get()
+    return cap if dl is None else dl.timeout(cap)
+
+
+def timeout_ms(cap_ms):
+    """Playwright için: timeout() milisaniye cinsinden (0 Playwright'ta 'sınırsız' demek, en az 1 ms)."""
+    return max(1, int(timeout(cap_ms / 1000) * 1000))
+
+
+def allows(seconds):
+    dl = _CURRENT.get()
+    return True if dl is None else dl.allows(seconds)
+
+
+def expired():
+    dl = _CURRENT.get()
+    return dl is not None and dl.expired()
+
+
+def skip(stage):
+    dl = _CURRENT.get()
+    if dl is not None:
+        dl.skip(stage)
+
+
+def sleep(seconds):
+    """Kalan süreyi aşmayan bekleme. Bekleme bütçe yüzünden kısaldıysa False döner."""
+    actual = timeout(seconds)
+    if actual > 0:
+        time.sleep(actual)
+    return actual >= seconds
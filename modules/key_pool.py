@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from collections import deque
+
+# --- API KEY HAVUZU ---
+# Birden fazla Google API key'i arasında yük dağıtımı.
+# Her istek, kotası (dakikalık istek) en boş ve 429 cezasında olmayan key'e gider.
+# Gemini kotaları model başına olduğu için 429 cezası (key, model) çiftine uygulanır.
+# Ortak key'ler (ortam değişkenleri) herkese açıktır. Kullanıcının kendi key'i havuza "özel" olarak
+# kaydedilir: yükü ve 429 cezası izlenir ama sadece o key'i getiren oturuma verilir. Oturum önce
+# kendi key'ini kullanır; ortak key'ler sadece kendi key'i doluyken (taşma) devreye girer.
+
+# Key başına dakikalık istek sınırı (ücretsiz katmanda flash için ~10)
+KEY_RPM_LIMIT = int(os.getenv("GEMINI_KEY_RPM", "10"))
+# 429 alan key bu kadar saniye dinlendirilir
+QUOTA_COOLDOWN = int(os.getenv("GEMINI_KEY_COOLDOWN", "60"))
+WINDOW_SECONDS = 60
+
+
+def mask_key(key):
+    """Key'i loglarda/arayüzde göstermek için maskeler."""
+    if not key: return "-"
+    return f"{key[:4]}…{key[-4:]}" if len(key) > 10 else "…"
+
+
+class _KeyState:
+    __slots__ = ("key", "shared", "in_flight", "window", "cooldowns", "requests", "quota_errors")
+
+    def __init__(self, key, shared=True):
+        self.key = key
+        self.shared = shared
+        self.in_flight = 0
+        self.window = deque()  # son 60 sn'deki istek zamanları
+        self.cooldowns = {}  # model adı ("" = tüm modeller) -> ceza bitiş zamanı
+        self.requests = 0
+        self.quota_errors = 0
+
+    def _trim(self, now):
+        while self.window and now - self.window[0] > WINDOW_SECONDS:
+            self.window.popleft()
+
+    def load(self, now, rpm):
+        self._trim(now)
+        return (len(self.window) + self.in_flight) / rpm
+
+    def cooldown_until(self, model=None):
+        return max(self.cooldowns.get(model or "", 0.0), self.cooldowns.get("", 0.0))
+
+    def healthy(self, now, rpm, model=None):
+        self._trim(now)
+        return now >= self.cooldown_until(model) and len(self.window) < rpm
+
+    def available_in(self, now, rpm, model=None):
+        self._trim(now)
+        wait = max(0.0, self.cooldown_until(model) - now)
+        if len(self.window) >= rpm:
+            wait = max(wait, WINDOW_SECONDS - (now - self.window[0]))
+        return wait
+
+
+class KeyPool:
+    def __init__(self, keys=None, rpm_limit=KEY_RPM_LIMIT, cooldown=QUOTA_COOLDOWN):
+        self.rpm_limit = max(1, rpm_limit)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._keys = {}
+        for key in keys or []:
+            self.register(key)
+
+    def register(self, key, shared=True):
+        """Havuza key ekler (zaten varsa bir şey yapmaz). shared=False: sadece sahibi kullanır."""
+        if not key: return
+        with self._lock:
+            self._keys.setdefault(key, _KeyState(key, shared))
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._keys
+
+    def size(self):
+        with self._lock:
+            return len(self._keys)
+
+    def _begin(self, state, now):
+        state.in_flight += 1
+        state.requests += 1
+        state.window.append(now)
+
+    def _usable(self, preferred):
+        """Bu oturumun kullanabileceği key'ler: ortak key'ler + oturumun kendi key'i."""
+        return [s for s in self._keys.values() if s.shared or s.key == preferred]
+
+    def _best(self, now, preferred, model):
+        own = self._keys.get(preferred)
+        if own and own.healthy(now, self.rpm_limit, model):
+            return own
+        candidates = [s for s in self._keys.values() if s.shared and s.healthy(now, self.rpm_limit, model)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: s.load(now, self.rpm_limit))
+
+    def pick(self, preferred=None, model=None):
+        """Seçilecek key'i döndürür ama kullanımda işaretlemez (oturum bağlamak için)."""
+        now = time.time()
+        with self._lock:
+            best = self._best(now, preferred, model)
+            return best.key if best else None
+
+    def acquire(self, preferred=None, model=None):
+        """
+        Key seçip kullanımda işaretler: preferred (oturumun kendi key'i) sağlıklıysa o,
+        değilse en az yüklü sağlıklı ortak key. Sağlıklı key yoksa None.
+        model verilirse o modelde 429 cezasındaki key'ler atlanır.
+        """
+        now = time.time()
+        with self._lock:
+            best = self._best(now, preferred, model)
+            if best is None:
+                return None
+            self._begin(best, now)
+            return best.key
+
+    def begin(self, key):
+        """Belirli bir key ile yapılacak isteği kaydeder (örn. key'e bağlı sohbet oturumu)."""
+        now = time.time()
+        with self._lock:
+            state = self._keys.get(key)
+            if state: self._begin(state, now)
+
+    def release(self, key, quota_error=False, model=None):
+        """İstek bitti. 429 alındıysa key (model verilmişse sadece o modelde) dinlenmeye alınır."""
+        with self._lock:
+            state = self._keys.get(key)
+            if not state: return
+            state.in_flight = max(0, state.in_flight - 1)
+            if quota_error:
+                state.quota_errors += 1
+                state.cooldowns[model or ""] = time.time() + self.cooldown
+
+    def has_healthy(self, model=None, preferred=None):
+        now = time.time()
+        with self._lock:
+            return any(s.healthy(now, self.rpm_limit, model) for s in self._usable(preferred))
+
+    def next_available_in(self, model=None, preferred=None):
+        """En erken hangi sürede (sn) bir key kullanılabilir olur."""
+        now = time.time()
+        with self._lock:
+            usable = self._usable(preferred)
+            if not usable: return 0.0
+            return min(s.available_in(now, self.rpm_limit, model) for s in usable)
+
+    def stats(self, preferred=None):
+        """Key başına kullanım (maskelenmiş): ortak key'ler + verilirse oturumun kendi key'i."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for s in self._usable(preferred):
+                s._trim(now)
+                rows.append({
+                    "key": mask_key(s.key),
+                    "in_flight": s.in_flight,
+                    "rpm_used": len(s.window),
+                    "utilization_pct": round(100 * len(s.window) / self.rpm_limit, 1),
+                    "requests": s.requests,
+                    "quota_errors": s.quota_errors,
+                    "cooldown_s": round(max([0.0] + [u - now for u in s.cooldowns.values()]), 1),
+                })
+        return rows
+
+
+def _env_keys():
+    keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()]
+    single = os.getenv("GOOGLE_API_KEY", "")
+    if single and single not in keys:
+        keys.append(single)
+    return keys
+
+
+POOL = KeyPool(_env_keys())
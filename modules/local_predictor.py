@@ -0,0 +1,304 @@
+import math
+import re
+import threading
+from difflib import SequenceMatcher
+from modules import db_manager, relevance
+
+# --- YEREL TAHMİN MODELİ (Poisson, oran tahmini + Dixon-Coles düşük skor düzeltmesi) ---
+# Gemini kotası dolduğunda ya da AI yanıtı beklenirken milisaniyeler içinde
+# analyze_match_deep ile aynı JSON şeklinde bir ön tahmin üretir.
+# Hücum/savunma güçleri en çok olabilirlik (MLE) ile değil, gol ortalamalarının lig
+# ortalamasına oranıyla (az maçta ortalamaya çekilerek) tahmin edilir; sadece rho parametresi
+# olabilirlikle (ızgara araması) seçilir.
+# Veritabanında sadece db_manager.LEAGUE_VALUE ligi var: diğer liglerin maçlarında takım
+# güçleri kullanılmaz, lig ortalamaları (ve varsa o ligin scrape edilen istatistikleri) kullanılır.
+
+MAX_GOALS = 10
+# Az maç oynamış takımların güçlerini lig ortalamasına çeken "sanal maç" sayısı
+SHRINK_GAMES = 3
+# Scrape edilen Gol/M verisinin ağırlığı (sanal maç cinsinden)
+SCRAPED_WEIGHT_GAMES = 6
+# Veritabanında hiç maç yoksa kullanılan lig ortalamaları
+DEFAULT_HOME_GOALS = 1.50
+DEFAULT_AWAY_GOALS = 1.20
+RHO_GRID = [x / 100 for x in range(-20, 21, 2)]
+# Çekirdek adlar birebir tutmadığında kabul edilen en düşük yazım benzerliği
+NAME_SIMILARITY = 0.85
+# Takım adındaki kulüp/şirket ekleri (sadeleştirilmiş biçim)
+_NAME_SUFFIXES = {"sk", "fk", "jk", "as", "a", "s", "spor", "kulubu", "futbol"}
+
+_fit_lock = threading.Lock()
+_fit_cache = {"key": None, "model": None}
+
+
+def _core_name(text):
+    """
+    Takım adının çekirdeği (kelime listesi): sadeleştirilir, kulüp ekleri ("FK", "SK") atılır,
+    kelime sonundaki "spor" kaldırılır. "Hesap.com Antalyaspor" -> ["hesap", "com", "antalya"]
+    """
+    tokens = re.findall(r"[a-z0-9]+", relevance.fold(str(text or "")))
+    core = []
+    for tok in tokens:
+        if tok in _NAME_SUFFIXES:
+            continue
+        if tok.endswith("spor") and len(tok) > 4:
+            tok = tok[:-4]
+        core.append(tok)
+    return core
+
+
+def _same_team(a, b):
+    """
+    Çekirdekler aynı mı? Biri diğerinin SONUNA denk geliyorsa da aynı sayılır: öndeki kelimeler
+    sponsor adıdır ("Çaykur Rizespor" ~ "Rizespor"). Parça eşleşmesi ("Karabük" ~ "Trabzon") yok.
+    """
+    if not a or not b:
+        return False
+    short, long_ = (a, b) if len(a) <= len(b) else (b, a)
+    return long_[-len(short):] == short
+
+
+def _find_team(team_name, names):
+    """
+    Fikstürdeki ismi veritabanındaki isimle eşleştirir. Çekirdek ad birebir (sponsor öneki hariç)
+    tutmalı; tutmuyorsa sadece yazım farkı (benzerlik >= NAME_SIMILARITY) kabul edilir.
+    Emin olunmayan takım için None: çağıran lig ortalamasını kullanır.
+    """
+    target = _core_name(team_name)
+    if not target: return None
+    best, best_score = None, 0.0
+    for name in names:
+        core = _core_name(name)
+        if not core: continue
+        if core == target: return name
+        if _same_team(core, target):
+            score = 1.0
+        else:
+            score = SequenceMatcher(None, " ".join(target), " ".join(core)).ratio()
+        if score > best_score:
+            best, best_score = name, score
+    return best if best_score >= NAME_SIMILARITY else None
+
+
+def _dc_tau(i, j, lam, mu, rho):
+    """Dixon-Coles düşük skor düzeltmesi."""
+    if i == 0 and j == 0: return 1 - lam * mu * rho
+    if i == 0 and j == 1: return 1 + lam * rho
+    if i == 1 and j == 0: return 1 + mu * rho
+    if i == 1 and j == 1: return 1 - rho
+    return 1.0
+
+
+def _fit(matches):
+    """
+    Oynanmış maçlardan ev/deplasman hücum-savunma güçlerini (gol ortalaması / lig ortalaması,
+    SHRINK_GAMES sanal maçla ortalamaya çekilmiş) ve rho'yu (olabilirlik, ızgara araması) çıkarır.
+    """
+    teams = {}
+    total_h = total_a = 0
+    for _, home, away, hs, as_ in matches:
+        total_h += hs
+        total_a += as_
+        h = teams.setdefault(home, {"hn": 0, "hgf": 0, "hga": 0, "an": 0, "agf": 0, "aga": 0})
+        a = teams.setdefault(away, {"hn": 0, "hgf": 0, "hga": 0, "an": 0, "agf": 0, "aga": 0})
+        h["hn"] += 1; h["hgf"] += hs; h["hga"] += as_
+        a["an"] += 1; a["agf"] += as_; a["aga"] += hs
+
+    n = len(matches)
+    mu_h = total_h / n if n else DEFAULT_HOME_GOALS
+    mu_a = total_a / n if n else DEFAULT_AWAY_GOALS
+    k = SHRINK_GAMES
+
+    strengths = {}
+    for name, t in teams.items():
+        strengths[name] = {
+            "att_home": (t["hgf"] + k * mu_h) / ((t["hn"] + k) * mu_h),
+            "def_home": (t["hga"] + k * mu_a) / ((t["hn"] + k) * mu_a),
+            "att_away": (t["agf"] + k * mu_a) / ((t["an"] + k) * mu_a),
+            "def_away": (t["aga"] + k * mu_h) / ((t["an"] + k) * mu_h),
+            "games": t["hn"] + t["an"],
+        }
+
+    # rho: Poisson kısmı rho'dan bağımsız olduğu için sadece tau terimini maksimize etmek yeterli
+    rho = 0.0
+    low_scores = [m for m in matches if m[3] <= 1 and m[4] <= 1]
+    if low_scores:
+        best_ll = None
+        for cand in RHO_GRID:
+            ll = 0.0
+            for _, home, away, hs, as_ in low_scores:
+                lam = mu_h * strengths[home]["att_home"] * strengths[away]["def_away"]
+                mu = mu_a * strengths[away]["att_away"] * strengths[home]["def_home"]
+                tau = _dc_tau(hs, as_, lam, mu, cand)
+                if tau <= 0:
+                    ll = None
+                    break
+                ll += math.log(tau)
+            if ll is not None and (best_ll is None or ll > best_ll):
+                best_ll, rho = ll, cand
+
+    return {"mu_home": mu_h, "mu_away": mu_a, "rho": rho, "teams": strengths, "matches": n}
+
+
+def get_model():
+    """Modeli veritabanı değiştiyse yeniden kurar, aksi halde önbellekten döner."""
+    key = db_manager.db_signature()
+    with _fit_lock:
+        if _fit_cache["model"] is None or _fit_cache["key"] != key:
+            _fit_cache["model"] = _fit(db_manager.get_played_matches())
+            _fit_cache["key"] = key
+        return _fit_cache["model"]
+
+
+def _scraped_goal_rates(league_stats):
+    """'Takım -> Gol/M: 2,4, ...' satırlarından maç başı gol ortalamalarını okur."""
+    rates = {}
+    for line in (league_stats or {}).get("team_stats", []) or []:
+        if "->" not in line: continue
+        team, rest = line.split("->", 1)
+        found = re.search(r"Gol/M:\s*([\d]+(?:[.,]\d+)?)", rest)
+        if found:
+            rates[team.strip()] = float(found.group(1).replace(",", "."))
+    return rates
+
+
+def _blend(db_value, games, scraped_value):
+    if scraped_value is None: return db_value
+    if db_value is None: return scraped_value
+    w = games / (games + SCRAPED_WEIGHT_GAMES)
+    return w * db_value + (1 - w) * scraped_value
+
+
+def expected_goals(home_team, away_team, league_stats=None, league_value=None):
+    """
+    Ev ve deplasman için beklenen gol (lambda, mu) ve modelin rho değeri.
+    league_value: maçın ligi (maçkolik değeri). Veritabanı modeli sadece
+    db_manager.LEAGUE_VALUE için kullanılır; diğer liglerde varsayılan lig ortalamaları.
+    """
+    if league_value == db_manager.LEAGUE_VALUE:
+        model = get_model()
+        mu_h, mu_a, rho = model["mu_home"], model["mu_away"], model["rho"]
+        home = model["teams"].get(_find_team(home_team, model["teams"]))
+        away = model["teams"].get(_find_team(away_team, model["teams"]))
+    else:
+        model = None
+        mu_h, mu_a, rho = DEFAULT_HOME_GOALS, DEFAULT_AWAY_GOALS, 0.0
+        home = away = None
+
+    rates = _scraped_goal_rates(league_stats)
+    scraped_home = scraped_away = None
+    if rates:
+        league_rate = sum(rates.values()) / len(rates)
+        if league_rate > 0:
+            h_name = _find_team(home_team, rates)
+            a_name = _find_team(away_team, rates)
+            if h_name: scraped_home = rates[h_name] / league_rate
+            if a_name: scraped_away = rates[a_name] / league_rate
+
+    att_h = _blend(home["att_home"] if home else None, home["games"] if home else 0, scraped_home) or 1.0
+    att_a = _blend(away["att_away"] if away else None, away["games"] if away else 0, scraped_away) or 1.0
+    def_h = home["def_home"] if home else 1.0
+    def_a = away["def_away"] if away else 1.0
+
+    lam = mu_h * att_h * def_a
+    mu = mu_a * att_a * def_h
+    sources = []
+    if home or away: sources.append(f"{model['matches']} maçlık veritabanı")
+    if scraped_home or scraped_away: sources.append("lig istatistikleri")
+    return lam, mu, rho, sources
+
+
+def predict_probabilities(home_team, away_team, league_stats=None, league_value=None):
+    """Skor matrisinden MS, Alt/Üst ve KG olasılıklarını hesaplar (league_value: bkz. expected_goals)."""
+    lam, mu, rho, sources = expected_goals(home_team, away_team, league_stats, league_value)
+
+    p_home = [math.exp(-lam) * lam ** i / math.factorial(i) for i in range(MAX_GOALS + 1)]
+    p_away = [math.exp(-mu) * mu ** j / math.factorial(j) for j in range(MAX_GOALS + 1)]
+
+    probs = {"1": 0.0, "X": 0.0, "2": 0.0, "over_1_5": 0.0, "over_2_5": 0.0, "over_3_5": 0.0, "btts": 0.0}
+    best_score, best_p, total = (0, 0), 0.0, 0.0
+    for i in range(MAX_GOALS + 1):
+        for j in range(MAX_GOALS + 1):
+            p = p_home[i] * p_away[j] * _dc_tau(i, j, lam, mu, rho)
+            total += p
+            if i > j: probs["1"] += p
+            elif i == j: probs["X"] += p
+            else: probs["2"] += p
+            if i + j > 1: probs["over_1_5"] += p
+            if i + j > 2: probs["over_2_5"] += p
+            if i + j > 3: probs["over_3_5"] += p
+            if i > 0 and j > 0: probs["btts"] += p
+            if p > best_p:
+                best_p, best_score = p, (i, j)
+
+    probs = {k: v / total for k, v in probs.items()}
+    probs.update({
+        "xg_home": round(lam, 2),
+        "xg_away": round(mu, 2),
+        "likely_score": f"{best_score[0]}-{best_score[1]}",
+        "sources": sources,
+    })
+    return probs
+
+
+def _pct(p):
+    return f"%{round(p * 100)}"
+
+
+def format_probabilities(pr):
+    """Olasılıkları prompt'a girecek tek satırlık özete çevirir."""
+    return (
+        f"xG {pr['xg_home']}-{pr['xg_away']} | MS 1/X/2: {_pct(pr['1'])}/{_pct(pr['X'])}/{_pct(pr['2'])} | "
+        f"2.5 Üst {_pct(pr['over_2_5'])} | KG Var {_pct(pr['btts'])}"
+    )
+
+
+def predict_match(home_team, away_team, league_stats=None, details=None, league_value=None):
+    """
+    analyze_match_deep ile aynı JSON şeklinde yerel tahmin üretir.
+    'kaynak' alanı bu yanıtın yapay zekadan değil yerel modelden geldiğini belirtir.
+    """
+    pr = predict_probabilities(home_team, away_team, league_stats, league_value)
+
+    markets = [
+        ("MS 1", pr["1"]), ("MS X", pr["X"]), ("MS 2", pr["2"]),
+        ("2.5 Üst", pr["over_2_5"]), ("2.5 Alt", 1 - pr["over_2_5"]),
+        ("KG Var", pr["btts"]), ("KG Yok", 1 - pr["btts"]),
+    ]
+    markets.sort(key=lambda x: x[1], reverse=True)
+    main_pick, main_p = markets[0]
+
+    # Sürpriz: favori olmayan en olası taraf
+    sides = sorted([("MS 1", pr["1"]), ("MS X", pr["X"]), ("MS 2", pr["2"])], key=lambda x: x[1], reverse=True)
+    surprise_pick, surprise_p = sides[1]
+
+    star = "-"
+    if details and details.get("player_stats"):
+        first = str(details["player_stats"][0])
+        star = first.split(":", 1)[-1].split(",")[0].split("(")[0].strip() or "-"
+
+    source_text = " ve ".join(pr["sources"]) if pr["sources"] else "lig ortalamaları"
+    text = (
+        f"Yerel istatistik modeli ({source_text}) {home_team} için {pr['xg_home']}, "
+        f"{away_team} için {pr['xg_away']} beklenen gol hesaplıyor. "
+        f"Olasılıklar: Ev {_pct(pr['1'])}, Beraberlik {_pct(pr['X'])}, Deplasman {_pct(pr['2'])}. "
+        f"2.5 Üst {_pct(pr['over_2_5'])}, KG Var {_pct(pr['btts'])}. "
+        f"En olası skor {pr['likely_score']}. "
+        "Bu tahmin yapay zeka yorumu içermez; sadece gol ortalamalarına dayanır."
+    )
+
+    return {
+        "ana_tercih": main_pick,
+        "guven_skoru": _pct(main_p),
+        "surpriz_tercih": f"{surprise_pick} ({_pct(surprise_p)})",
+        "macin_yildizi": star,
+        "kritik_faktor": f"Beklenen gol: {pr['xg_home']} - {pr['xg_away']} (Poisson, gol ortalaması oranları)",
+        "analiz_metni": text,
+        "olasiliklar": {
+            "ms1": round(pr["1"], 3), "msx": round(pr["X"], 3), "ms2": round(pr["2"], 3),
+            "ust_1_5": round(pr["over_1_5"], 3), "ust_2_5": round(pr["over_2_5"], 3),
+            "ust_3_5": round(pr["over_3_5"], 3), "kg_var": round(pr["btts"], 3),
+            "skor": pr["likely_score"],
+        },
+        "kaynak": "yerel_model",
+    }
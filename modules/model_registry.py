@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import client_options as client_options_lib, gapic_v1
+
+# API key başına tek istemci, (key, model, config) başına tek model nesnesi.
+# genai.configure() tüm süreci etkilediği için kullanmıyoruz; her key kendi istemcisine sahip.
+# İstemci google-ai-generativelanguage'ın public GenerativeServiceClient kurucusuyla kurulur.
+# Modele bağlamak için SDK'nın iç alanı (GenerativeModel._client) kullanılır; bu yüzden
+# google-generativeai sürümü requirements.txt'te sabittir. Alan bir sürümde kalkarsa (veya istemci
+# kurulamazsa) global genai.configure'a düşülür: tek key ile çalışmaya devam edilir.
+_lock = threading.Lock()
+_clients = {}   # api_key -> GenerativeServiceClient
+_models = {}    # (api_key, model_name, config_key) -> GenerativeModel
+_warmed = set()
+# Yerel test sunucusu vb. için uç nokta değiştirme (örn. "http://127.0.0.1:8765")
+_endpoint = {"api_endpoint": os.getenv("GEMINI_API_ENDPOINT", ""), "transport": None}
+
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+
+def _config_key(generation_config):
+    if not generation_config:
+        return ""
+    return json.dumps(generation_config, sort_keys=True, default=str)
+
+
+def configure_endpoint(api_endpoint, transport="rest"):
+    """
+    Tüm istemcileri başka bir generateContent uç noktasına yönlendirir
+    (benchmarks/fake_gemini_server.py gibi). Boş değer varsayılan Google uç noktasına döner.
+    """
+    with _lock:
+        _endpoint["api_endpoint"] = api_endpoint or ""
+        _endpoint["transport"] = transport if api_endpoint else None
+        _clients.clear()
+        _models.clear()
+        _warmed.clear()
+
+
+def _make_client(api_key):
+    options = {"api_key": api_key}
+    if _endpoint["api_endpoint"]:
+        options["api_endpoint"] = _endpoint["api_endpoint"]
+    return glm.GenerativeServiceClient(
+        client_options=client_options_lib.from_dict(options),
+        transport=_endpoint["transport"] or ("rest" if _endpoint["api_endpoint"] else None),
+        client_info=gapic_v1.client_info.ClientInfo(user_agent=f"genai-py/{genai.__version__}"),
+    )
+
+
+def get_client(api_key):
+    """Key'e özel generative istemcisini döndürür (yoksa kurar)."""
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _make_client(api_key)
+            _clients[api_key] = client
+        return client
+
+
+def _configure_global(api_key, reason):
+    """Yedek yol: süreç geneli genai.configure (tüm modeller bu key'i kullanır)."""
+    print(f"⚠️ Key başına istemci kullanılamıyor ({reason}); global genai.configure kullanılıyor.")
+    kwargs = {"api_key": api_key}
+    if _endpoint["api_endpoint"]:
+        kwargs.update(transport=_endpoint["transport"] or "rest",
+                      client_options={"api_endpoint": _endpoint["api_endpoint"]})
+    genai.configure(**kwargs)
+
+
+def _bind(model, api_key):
+    # GenerativeModel istemcisini ilk çağrıda global ayardan alır; önceden bağlıyoruz.
+    if not hasattr(model, "_client"):
+        _configure_global(api_key, "GenerativeModel._client yok")
+        return model
+    try:
+        model._client = get_client(api_key)
+    except Exception as e:
+        _configure_global(api_key, e)
+    return model
+
+
+def get_model(api_key, model_name, generation_config=None):
+    """Yeniden kullanılabilir model nesnesi. Aynı parametrelerle her zaman aynı nesne döner."""
+    key = (api_key, model_name, _config_key(generation_config))
+    with _lock:
+        model = _models.get(key)
+    if model is not None:
+        return model
+
+    model = _bind(genai.GenerativeModel(model_name, generation_config=generation_config), api_key)
+    with _lock:
+        return _models.setdefault(key, model)
+
+
+def new_model(api_key, model_name, generation_config=None, system_instruction=None):
+    """Önbelleğe alınmayan model (örn. sohbet oturumları için system_instruction'lı)."""
+    model = genai.GenerativeModel(
+        model_name, generation_config=generation_config, system_instruction=system_instruction
+    )
+    return _bind(model, api_key)
+
+
+def warm_up(api_key, model_names, ping=True):
+    """
+    Uygulama açılışında istemci ve model nesnelerini hazırlar.
+    ping=True ise arka planda ücretsiz bir count_tokens çağrısıyla bağlantıyı da açar.
+    """
+    if not api_key:
+        return
+    with _lock:
+        if api_key in _warmed:
+            return
+        _warmed.add(api_key)
+
+    handles = []
+    for name in model_names:
+        handles.append(get_model(api_key, name))
+        get_model(api_key, name, JSON_CONFIG)
+
+    if ping and handles:
+        def _ping():
+            try:
+                handles[0].count_tokens("ping")
+            except Exception as e:
+                print(f"Model ısınma çağrısı başarısız: {e}")
+        threading.Thread(target=_ping, daemon=True).start()
+
+
+def stats():
+    with _lock:
+        return {"clients": len(_clients), "models": len(_models)}
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# --- GÖREV BAZLI MODEL YÖNLENDİRİCİ ---
+# Her görev tipi için sıralı bir model listesi ve gecikme hedefi (p95, saniye) vardır.
+# İlk model tercih edilir; son dakikalardaki p95'i hedefi aşıyorsa ya da kotası dolduysa
+# listedeki bir sonraki (daha hafif) modele geçilir. Ölçümler zamanla eskir, böylece
+# ana model toparlandığında tekrar seçilir.
+
+CHAT = "chat"          # kısa sohbet yanıtları
+ANALYSIS = "analysis"  # tek maç derin analiz (JSON)
+COUPON = "coupon"      # kupon sihirbazı (JSON liste)
+TOTO = "toto"          # 15 maçlık Spor Toto kolonu (JSON liste)
+LEAGUE = "league"      # lig özeti (düz metin)
+
+DEFAULT_ROUTES = {
+    CHAT:     {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"], "p95_slo": 8},
+    ANALYSIS: {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"], "p95_slo": 30},
+    COUPON:   {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"], "p95_slo": 45},
+    TOTO:     {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"], "p95_slo": 45},
+    LEAGUE:   {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"], "p95_slo": 20},
+}
+
+# p95 hesabına giren ölçümlerin yaşı (sn) ve karar için gereken en az ölçüm
+SLO_WINDOW = 300
+MIN_SAMPLES = 5
+# 429 alan model bu kadar saniye "kota dolu" sayılır
+QUOTA_COOLDOWN = 60
+
+
+def _load_routes():
+    """
+    Varsayılan rotalar; AI_MODEL_ROUTES ortam değişkeni (JSON) ile görev bazında ezilebilir.
+    Örn: AI_MODEL_ROUTES='{"chat": {"models": ["gemini-2.5-flash-lite"], "p95_slo": 5}}'
+    """
+    routes = {task: dict(cfg) for task, cfg in DEFAULT_ROUTES.items()}
+    raw = os.getenv("AI_MODEL_ROUTES", "")
+    if raw:
+        try:
+            for task, cfg in json.loads(raw).items():
+                routes.setdefault(task, {"models": [], "p95_slo": 30}).update(cfg)
+        except (ValueError, AttributeError) as e:
+            print(f"AI_MODEL_ROUTES okunamadı, varsayılanlar kullanılıyor: {e}")
+    return routes
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class _ModelStats:
+    __slots__ = ("samples", "requests", "errors", "quota_errors", "quota_until")
+
+    def __init__(self):
+        self.samples = deque(maxlen=200)  # (zaman, gecikme sn) başarılı çağrılar
+        self.requests = 0
+        self.errors = 0
+        self.quota_errors = 0
+        self.quota_until = 0.0
+
+    def recent(self, now):
+        return [lat for t, lat in self.samples if now - t <= SLO_WINDOW]
+
+
+class ModelRouter:
+    def __init__(self, routes=None):
+        self.routes = routes or _load_routes()
+        self._lock = threading.Lock()
+        self._models = {}
+        self._decisions = {}  # (görev, model) -> seçilme sayısı
+
+    def _stats(self, model):
+        return self._models.setdefault(model, _ModelStats())
+
+    def models_for(self, task):
+        route = self.routes.get(task) or self.routes[ANALYSIS]
+        return list(route["models"])
+
+    def primary_models(self):
+        """Açılışta ısıtılacak modeller (her görevin ilk modeli)."""
+        return sorted({self.models_for(task)[0] for task in self.routes})
+
+    def _degraded(self, model, slo, now, quota_ok):
+        s = self._stats(model)
+        if now < s.quota_until and not (quota_ok and quota_ok(model)):
+            return "kota"
+        recent = s.recent(now)
+        if len(recent) >= MIN_SAMPLES and _percentile(recent, 95) > slo:
+            return "p95"
+        return None
+
+    def choose(self, task, quota_ok=None):
+        """
+        Görev için model seçer. quota_ok(model) verilirse, 429 almış bir model için
+        hâlâ kotası olan bir key bulunup bulunmadığı ona sorulur (key havuzu).
+        Tüm modeller bozuksa listedeki son (en hafif) model döner.
+        """
+        models = self.models_for(task)
+        slo = (self.routes.get(task) or self.routes[ANALYSIS]).get("p95_slo", 30)
+        now = time.time()
+        with self._lock:
+            chosen = models[-1]
+            for model in models:
+                if not self._degraded(model, slo, now, quota_ok):
+                    chosen = model
+                    break
+            self._decisions[(task, chosen)] = self._decisions.get((task, chosen), 0) + 1
+        return chosen
+
+    def record(self, model, seconds, ok=True, quota_error=False):
+        """Model çağrısının sonucunu kaydeder; yönlendirme kararları bu ölçümlere dayanır."""
+        now = time.time()
+        with self._lock:
+            s = self._stats(model)
+            s.requests += 1
+            if ok:
+                s.samples.append((now, seconds))
+            else:
+                s.errors += 1
+            if quota_error:
+                s.quota_errors += 1
+                s.quota_until = now + QUOTA_COOLDOWN
+
+    def stats(self):
+        """Model başına istek, hata, 429 ve son pencere gecikme yüzdelikleri; görev başına seçimler."""
+        now = time.time()
+        with self._lock:
+            models = {}
+            for name, s in self._models.items():
+                recent = s.recent(now)
+                models[name] = {
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "quota_errors": s.quota_errors,
+                    "quota_blocked": now < s.quota_until,
+                    "p50_ms": round(_percentile(recent, 50) * 1000),
+                    "p95_ms": round(_percentile(recent, 95) * 1000),
+                }
+            decisions = {}
+            for (task, model), count in self._decisions.items():
+                decisions.setdefault(task, {})[model] = count
+            return {"models": models, "decisions": decisions}
+
+
+ROUTER = ModelRouter()
@@ -0,0 +1,146 @@
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+# --- YEREL İLGİLİLİK SEÇİCİ (BM25) ---
+# Uzun metni (örn. #compare-right-coll karşılaştırma metni) cümlelere böler ve
+# bir sorguya (analiz odağı veya kullanıcının sohbet sorusu) göre puanlar.
+# Ağ ya da embedding servisi gerektirmez; prompt'a sadece en ilgili N cümle girer.
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Türkçe eklemeli dil: kelimeyi ilk 5 harfine indirmek basit ama etkili bir kök bulma
+STEM_LENGTH = 5
+# Noktalama içermeyen uzun bloklar bu kadar kelimelik parçalara bölünür
+MAX_SENTENCE_WORDS = 30
+INDEX_CACHE_SIZE = 32
+
+# Odak verilmediğinde maç analizi için kullanılan genel sorgu
+DEFAULT_FOCUS = (
+    "gol ortalama attı yedi üst alt karşılıklı kg var galibiyet mağlubiyet beraberlik "
+    "seri form son maç iç saha deplasman sakat cezalı eksik ilk yarı ikinci yarı korner kart"
+)
+
+# Arayüzde seçilebilen analiz odakları -> sorgu
+FOCUS_PRESETS = {
+    "Genel": DEFAULT_FOCUS,
+    "Gol (Alt/Üst)": "gol ortalama attı yedi üst alt 2.5 toplam gol skor",
+    "Karşılıklı Gol": "karşılıklı gol kg var yok gol yemedi kalesini gole kapattı attı yedi",
+    "Maç Sonucu": "galibiyet mağlubiyet beraberlik kazandı kaybetti seri form puan iç saha deplasman",
+    "İlk Yarı / İkinci Yarı": "ilk yarı ikinci yarı devre dakika erken geç gol",
+    "Korner / Kart": "korner kart sarı kırmızı faul hakem",
+    "Eksikler": "sakat cezalı eksik kadro yok forma giyemeyecek sınırda",
+}
+
+STOPWORDS = {
+    "ve", "ile", "bir", "bu", "şu", "da", "de", "ki", "mi", "mu", "mı", "mü", "için", "gibi",
+    "ama", "fakat", "veya", "ya", "çok", "daha", "en", "olan", "olarak", "her", "ne", "nasıl",
+    "neden", "hangi", "sence", "kim", "maç", "maçı", "maçta", "takım",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\s*[•\n|]\s*")
+
+
+def fold(text):
+    """
+    Küçük harf + Türkçe karakterleri sadeleştirir (İ/ı dahil).
+    Geçmiş araması, sohbet önbelleği ve takım adı eşleştirmesi de aynı biçimi kullanır.
+    """
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    text = unicodedata.normalize("NFKD", text.replace("ı", "i"))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+_FOLDED_STOPWORDS = {fold(w) for w in STOPWORDS}
+
+
+def tokenize(text):
+    return [tok[:STEM_LENGTH] for tok in _TOKEN_RE.findall(fold(text)) if tok not in _FOLDED_STOPWORDS]
+
+
+def split_sentences(text, max_words=MAX_SENTENCE_WORDS):
+    """Metni cümlelere böler; noktalamasız uzun blokları max_words kelimelik parçalara ayırır."""
+    sentences = []
+    for part in _SENTENCE_RE.split(text or ""):
+        words = part.split()
+        for i in range(0, len(words), max_words):
+            chunk = " ".join(words[i:i + max_words])
+            if len(chunk) > 2:
+                sentences.append(chunk)
+    return sentences
+
+
+class BM25Index:
+    def __init__(self, passages):
+        self.passages = list(passages)
+        self.docs = [Counter(tokenize(p)) for p in self.passages]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_len = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        df = Counter()
+        for d in self.docs:
+            df.update(d.keys())
+        n = len(self.docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query):
+        q_terms = set(tokenize(query))
+        result = []
+        for d, length in zip(self.docs, self.lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_len) if self.avg_len else BM25_K1
+            for t in q_terms:
+                tf = d.get(t)
+                if tf:
+                    score += self.idf[t] * tf * (BM25_K1 + 1) / (tf + norm)
+            result.append(score)
+        return result
+
+    def top(self, query, n):
+        """Sorguyla en ilgili n pasaj; metindeki orijinal sırasıyla döner. Hiç eşleşme yoksa boş liste."""
+        scored = [(s, i) for i, s in enumerate(self.scores(query)) if s > 0]
+        best = sorted(scored, key=lambda x: (-x[0], x[1]))[:n]
+        return [self.passages[i] for _, i in sorted(best, key=lambda x: x[1])]
+
+
+# Aynı maç için (sohbetin her sorusunda) indeks tekrar kurulmasın
+_cache_lock = threading.Lock()
+_index_cache = OrderedDict()
+
+
+def index_for(passages):
+    passages = list(passages)
+    key = hashlib.sha1("\x1f".join(passages).encode("utf-8")).hexdigest()
+    with _cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = BM25Index(passages)
+    with _cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def select_sentences(text, focus=None, top_n=8):
+    """
+    Metnin odağa en ilgili top_n cümlesini (orijinal sırayla) birleştirip döndürür.
+    Metin zaten top_n cümleden kısaysa olduğu gibi döner.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= top_n:
+        return text or ""
+    return " ".join(index_for(sentences).top(focus or DEFAULT_FOCUS, top_n))
+
+
+def select_passages(passages, query, top_n=6):
+    """Hazır pasaj listesinden (örn. sohbet bağlam dilimleri) soruya en ilgili top_n tanesi."""
+    passages = [p for p in passages if p]
+    if len(passages) <= top_n:
+        return passages
+    return index_for(passages).top(query, top_n)
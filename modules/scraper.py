@@ -1,12 +1,14 @@
-import time
 import re
 from difflib import SequenceMatcher
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
+from modules import single_flight, deadline
 
 # Başlangıç noktası
 BASE_URL = "https://arsiv.mackolik.com/Puan-Durumu/s=70381/Turkiye-Super-Lig"
+# Bir ligdeki en fazla hafta sayısı (hafta kutusundan okunan değerin sağlamlık kontrolü)
+MAX_WEEK = 46
 
 # İddaa lig ID sözlüğü
 IDDAA_LEAGUE_IDS = {
@@ -115,6 +117,22 @@ async def get_real_odds_from_iddaa(match_name, league_id):
         finally:
             await browser.close()
 
+# Süre bütçesi bundan azsa tarayıcı hiç açılmaz (açılış + sayfa yükleme en az bu kadar sürer)
+MIN_SCRAPE_SECONDS = 8
+
+def _goto(page, url, cap_ms):
+    """
+    Sayfayı isteğin kalan süre bütçesiyle sınırlı zaman aşımıyla açar.
+    Zaman aşımında hata fırlatmaz: o ana kadar yüklenen içerik kısmi sonuç olarak işlenir.
+    """
+    try:
+        page.goto(url, timeout=deadline.timeout_ms(cap_ms))
+        return True
+    except PlaywrightTimeout:
+        deadline.skip("sayfa yükleme")
+        print(f"⏱️ Sayfa zaman aşımı, kısmi içerikle devam: {url}")
+        return False
+
 def handle_cookie_consent(page):
     """Cookie pencerelerini ve reklam overlay'lerini temizler."""
     try:
@@ -145,18 +163,24 @@ def get_leagues_list():
         except: return {}
         finally: browser.close()
 
+def _to_int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return 0
+
 def get_fixture_and_standings(league_value):
     """Seçilen ligin fikstürünü (TARİHLİ) ve puan durumunu çeker."""
-    data = {"matches": [], "standings": []}
+    data = {"matches": [], "standings": [], "table": [], "week": None}
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
         page = browser.new_page()
         try:
-            page.goto(BASE_URL, timeout=60000)
+            _goto(page, BASE_URL, 60000)
             handle_cookie_consent(page)
             if league_value != "1-1":
-                page.select_option("#cboLeague", value=league_value)
-                time.sleep(3)
+                page.select_option("#cboLeague", value=league_value, timeout=deadline.timeout_ms(30000))
+                deadline.sleep(3)
             
             soup = BeautifulSoup(page.content(), 'html.parser')
             
@@ -184,14 +208,24 @@ def get_fixture_and_standings(league_value):
                                 url = link['href']
                                 if url.startswith("//"): url = "https:" + url
                                 
+                                # Oynanmış maçta orta hücre skoru gösterir ("2 - 1"), oynanmamışta boş / "v"
+                                score = re.match(r"^(\d+)\s*-\s*(\d+)$", link.get_text(strip=True))
                                 data["matches"].append({
                                     "date": date_str, # Filtreleme için kritik
                                     "time": time_str,
                                     "home": home.get_text(strip=True), 
                                     "away": away.get_text(strip=True), 
-                                    "url": url
+                                    "url": url,
+                                    "score": (int(score.group(1)), int(score.group(2))) if score else None
                                 })
             
+            # Fikstürün haftası: hafta seçim kutusunun o anki değeri (selected özniteliği
+            # sayfa sonradan değiştirilince güncellenmez). Okunamazsa None kalır ve
+            # db_manager maçları yazmaz (hafta tahmin edilmez).
+            week_value = page.evaluate("() => { const s = document.querySelector('#cboWeek'); return s ? s.value : null; }")
+            if week_value and str(week_value).isdigit() and 0 < int(week_value) <= MAX_WEEK:
+                data["week"] = int(week_value)
+            
             # Puan Durumu
             stand_tbl = soup.find("table", {"id": "tblStanding"})
             if stand_tbl:
@@ -200,6 +234,13 @@ def get_fixture_and_standings(league_value):
                     cols = row.find_all("td")
                     if len(cols) > 9:
                         data["standings"].append(f"{cols[1].get_text(strip=True)} ({cols[9].get_text(strip=True)} P)")
+                        # Sütunlar: sıra, takım, O, G, B, M, A, Y, AV, P (db_manager.ingest_fixture_and_standings için)
+                        nums = [_to_int(c.get_text(strip=True)) for c in cols[2:10]]
+                        data["table"].append({
+                            "name": cols[1].get_text(strip=True), "played": nums[0], "wins": nums[1],
+                            "draws": nums[2], "losses": nums[3], "goals_for": nums[4],
+                            "goals_against": nums[5], "points": nums[7]
+                        })
             return data
         except: return data
         finally: browser.close()
@@ -207,8 +248,26 @@ def get_fixture_and_standings(league_value):
 def get_match_deep_stats(match_url):
     """
     Maç detaylarını (OPTA Facts, Son Form Durumu + TARİHLER, Kadrolar) çeker.
+    Aynı URL için eşzamanlı istekler tek bir tarayıcı oturumunu paylaşır.
     """
-    stats = {"yellow_box": [], "player_stats": [], "h2h": [], "comparison_stats": "", "form_patterns": []}
+    try:
+        return single_flight.FLIGHTS.do("scrape", match_url, _scrape_match_deep_stats, match_url)
+    except TimeoutError:
+        # Aynı sayfayı açan başka bir isteği beklerken bu isteğin süresi doldu
+        deadline.skip("maç detayları")
+        return dict(_empty_deep_stats(), partial=True)
+
+def _empty_deep_stats():
+    return {"yellow_box": [], "player_stats": [], "h2h": [], "comparison_stats": "", "form_patterns": []}
+
+def _scrape_match_deep_stats(match_url):
+    stats = _empty_deep_stats()
+
+    if not deadline.allows(MIN_SCRAPE_SECONDS):
+        # Kalan süre sayfayı açmaya yetmez: boş (kısmi) detayla devam edilir
+        deadline.skip("maç detayları")
+        stats["partial"] = True
+        return stats
     
     print(f"🕵️‍♂️ Derin Analiz Başlıyor: {match_url}")
     
@@ -216,9 +275,10 @@ def get_match_deep_stats(match_url):
         browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
         page = browser.new_page()
         try:
-            page.goto(match_url, timeout=60000)
+            if not _goto(page, match_url, 60000):
+                stats["partial"] = True
             handle_cookie_consent(page)
-            time.sleep(2)
+            deadline.sleep(2)
             
             soup = BeautifulSoup(page.content(), 'html.parser')
 
@@ -312,15 +372,18 @@ def get_match_deep_stats(match_url):
 def get_league_detailed_stats(league_value):
     """Lig genel istatistiklerini (Gol/Şut vb.) çeker."""
     team_stats_list = []
+    if not deadline.allows(MIN_SCRAPE_SECONDS):
+        deadline.skip("lig istatistikleri")
+        return {"team_stats": []}
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
         page = browser.new_page()
         try:
-            page.goto(BASE_URL, timeout=90000)
+            _goto(page, BASE_URL, 90000)
             handle_cookie_consent(page)
             if league_value != "1-1":
-                page.select_option("#cboLeague", value=league_value)
-                time.sleep(3)
+                page.select_option("#cboLeague", value=league_value, timeout=deadline.timeout_ms(30000))
+                deadline.sleep(3)
                 handle_cookie_consent(page)
 
             # İstatistik -> Takım İstatistikleri Navigasyonu
@@ -328,13 +391,13 @@ def get_league_detailed_stats(league_value):
                 const tabs = document.querySelectorAll('#tab-list a');
                 for (const tab of tabs) { if (tab.innerText.includes('İstatistik')) { tab.click(); break; } }
             }""")
-            time.sleep(2)
+            deadline.sleep(2)
             page.evaluate("""() => {
                 const links = document.querySelectorAll('.sub-menu a');
                 for (const link of links) { if (link.innerText.includes('Takım İstatistikleri')) { link.click(); break; } }
             }""")
             
-            try: page.wait_for_selector("#tblTeamStats", state="visible", timeout=15000)
+            try: page.wait_for_selector("#tblTeamStats", state="visible", timeout=deadline.timeout_ms(15000))
             except: pass
 
             soup = BeautifulSoup(page.content(), 'html.parser')
@@ -0,0 +1,107 @@
+import copy
+import hashlib
+import json
+import threading
+from modules import deadline
+
+# --- SINGLE-FLIGHT (Eşzamanlı Aynı İstekleri Birleştirme) ---
+# Aynı maçı aynı anda analiz eden kullanıcılar tek bir scrape / Gemini çağrısını paylaşır.
+# Sonuç önbelleğe alınmaz; çağrı bittiği anda anahtar serbest kalır.
+# Bekleyen çağıran kendi süre bütçesini (deadline) aşmaz; lider kendi bütçesi yüzünden kısmi
+# (partial) ya da süre aşımı (sure_asimi) sonucu ürettiyse bu sonuç bekleyenlere verilmez.
+
+
+def fingerprint(*parts):
+    """İstek parçalarından kısa ve kararlı bir anahtar üretir."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _shareable(result):
+    """Kısmi / süre aşımı sonuçları sadece onları üreten çağırana aittir."""
+    return not (isinstance(result, dict) and (result.get("partial") or result.get("sure_asimi")))
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {}  # tür -> {"calls", "executions", "coalesced"}
+
+    def _count(self, kind, field):
+        counters = self._counters.setdefault(kind, {"calls": 0, "executions": 0, "coalesced": 0})
+        counters[field] += 1
+        counters["calls"] += 1
+
+    def do(self, kind, key, fn, *args, **kwargs):
+        """
+        Aynı (kind, key) için uçuşta bir çağrı varsa onun sonucunu bekler,
+        yoksa fn'i çalıştırır. Bekleyenlere sonucun kopyası verilir.
+        """
+        return self.run(kind, key, fn, *args, **kwargs)[0]
+
+    def run(self, kind, key, fn, *args, **kwargs):
+        """
+        do ile aynı; (sonuç, paylaşıldı_mı) döner. paylaşıldı_mı: sonuç başka bir çağrının
+        çalıştırmasından geldi (bu çağıran fn'i çalıştırmadı).
+        Beklerken çağıranın süre bütçesi dolarsa TimeoutError fırlatır.
+        """
+        full_key = (kind, key)
+        while True:
+            with self._lock:
+                call = self._calls.get(full_key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[full_key] = call
+                    self._count(kind, "executions")
+                else:
+                    call.waiters += 1
+                    self._count(kind, "coalesced")
+
+            if leader:
+                break
+            if not call.event.wait(deadline.remaining()):
+                raise TimeoutError(f"single-flight ({kind}) beklerken süre bütçesi doldu")
+            if call.error is not None:
+                raise call.error
+            if _shareable(call.result):
+                return copy.deepcopy(call.result), True
+            # Lider kendi bütçesiyle kısmi sonuç üretti: bu çağıran kendi bütçesiyle tekrar dener
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(full_key, None)
+            call.event.set()
+
+    def stats(self):
+        """Tür bazında toplam, gerçekten çalışan ve birleştirilen çağrı sayıları."""
+        with self._lock:
+            result = {kind: dict(c) for kind, c in self._counters.items()}
+            for kind, _ in self._calls:
+                result.setdefault(kind, {"calls": 0, "executions": 0, "coalesced": 0})
+                result[kind]["in_flight"] = result[kind].get("in_flight", 0) + 1
+            return result
+
+    def total_coalesced(self):
+        with self._lock:
+            return sum(c["coalesced"] for c in self._counters.values())
+
+
+FLIGHTS = SingleFlight()
@@ -0,0 +1,176 @@
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+
+# --- YAPAY ZEKA TELEMETRİSİ ---
+# ai_engine giriş fonksiyonlarının (analyze_match_deep, generate_smart_coupon, get_chat_response,
+# analyze_league_overview, analyze_spor_toto_column) her çağrısı için: prompt/yanıt token sayısı
+# (usage_metadata), süre, model çağrısı süresi, tekrar deneme, önbellek isabeti, model ve tahmini maliyet.
+# Çağrı kapsamı context değişkeninde tutulur; alt katmanlar (tekrar deneme döngüsü, model çağrısı)
+# add_usage / mark ile içinde bulundukları çağrıya veri ekler.
+
+# Model başına 1M token fiyatı (USD, girdi / çıktı) - Google AI Studio liste fiyatları
+PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 40, 80)         # saniye, üst sınırlar
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)  # prompt token, üst sınırlar
+MAX_RECORDS = 1000  # giriş başına saklanan son çağrı
+
+
+class _Call:
+    __slots__ = ("entry", "model", "prompt_tokens", "response_tokens", "attempts",
+                 "llm_seconds", "cache_hit", "fallback", "error")
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.model = None
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.attempts = 0
+        self.llm_seconds = 0.0
+        self.cache_hit = False
+        self.fallback = False
+        self.error = False
+
+
+_CURRENT = contextvars.ContextVar("ai_telemetry_call", default=None)
+_lock = threading.Lock()
+_records = {}  # giriş adı -> deque(kayıt)
+
+
+def estimate_cost(model, prompt_tokens, response_tokens):
+    price_in, price_out = PRICES.get(model or "", (0.0, 0.0))
+    return (prompt_tokens * price_in + response_tokens * price_out) / 1_000_000
+
+
+def add_usage(model, response=None, seconds=0.0):
+    """Bir model çağrısını içinde bulunulan giriş çağrısına ekler (usage_metadata'dan token sayıları)."""
+    call = _CURRENT.get()
+    if call is None:
+        return
+    call.model = model
+    call.attempts += 1
+    call.llm_seconds += seconds
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        call.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+        call.response_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+
+def attempts():
+    """İçinde bulunulan çağrının şimdiye kadarki model çağrısı sayısı."""
+    call = _CURRENT.get()
+    return call.attempts if call else 0
+
+
+def mark(**flags):
+    """Çağrıyı işaretler: cache_hit=True, fallback=True, error=True."""
+    call = _CURRENT.get()
+    if call is None:
+        return
+    for name, value in flags.items():
+        setattr(call, name, value)
+
+
+def _record(call, seconds):
+    entry = {
+        "ts": time.time(),
+        "model": call.model or "-",
+        "latency": seconds,
+        "llm_seconds": call.llm_seconds,
+        "prompt_tokens": call.prompt_tokens,
+        "response_tokens": call.response_tokens,
+        # Hiç model çağrısı yapmadan biten (önbellek / birleştirilmiş) çağrılarda tekrar yok
+        "retries": max(0, call.attempts - 1),
+        "cache_hit": call.cache_hit,
+        "fallback": call.fallback,
+        "error": call.error,
+        "cost": estimate_cost(call.model, call.prompt_tokens, call.response_tokens),
+    }
+    with _lock:
+        _records.setdefault(call.entry, deque(maxlen=MAX_RECORDS)).append(entry)
+
+
+def tracked(entry):
+    """Giriş fonksiyonunu telemetri kapsamına alan dekoratör. İç içe çağrılarda dıştaki kaydeder."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _CURRENT.get() is not None:
+                return fn(*args, **kwargs)
+            call = _Call(entry)
+            token = _CURRENT.set(call)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                call.error = True
+                raise
+            finally:
+                _CURRENT.reset(token)
+                _record(call, time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def records(entry=None):
+    with _lock:
+        if entry:
+            return list(_records.get(entry, []))
+        return {name: list(rows) for name, rows in _records.items()}
+
+
+def summary():
+    """Giriş başına özet tablo satırları (app'te dataframe olarak gösterilir)."""
+    rows = []
+    for name, recs in sorted(records().items()):
+        if not recs:
+            continue
+        calls = len(recs)
+        latency = [r["latency"] for r in recs]
+        prompt = [r["prompt_tokens"] for r in recs]
+        rows.append({
+            "fonksiyon": name,
+            "çağrı": calls,
+            "önbellek %": round(100 * sum(r["cache_hit"] for r in recs) / calls, 1),
+            "p50 sn": round(_percentile(latency, 50), 2),
+            "p95 sn": round(_percentile(latency, 95), 2),
+            "ort. prompt token": round(sum(prompt) / calls),
+            "max prompt token": max(prompt),
+            "ort. yanıt token": round(sum(r["response_tokens"] for r in recs) / calls),
+            "tekrar": sum(r["retries"] for r in recs),
+            "yerel yedek": sum(r["fallback"] for r in recs),
+            "hata": sum(r["error"] for r in recs),
+            "maliyet $": round(sum(r["cost"] for r in recs), 4),
+            "model": ", ".join(sorted({r["model"] for r in recs if r["model"] != "-"})) or "-",
+        })
+    return rows
+
+
+def histogram(entry, field="latency"):
+    """
+    Kovalara ayrılmış dağılım: [(etiket, adet)].
+    field: "latency" (sn) veya "prompt_tokens".
+    """
+    buckets = LATENCY_BUCKETS if field == "latency" else TOKEN_BUCKETS
+    counts = [0] * (len(buckets) + 1)
+    for r in records(entry):
+        value = r[field]
+        idx = next((i for i, upper in enumerate(buckets) if value <= upper), len(buckets))
+        counts[idx] += 1
+    labels = [f"≤{b}" for b in buckets] + [f">{buckets[-1]}"]
+    return list(zip(labels, counts))
@@ -0,0 +1,187 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from modules import scraper, local_predictor, relevance, deadline
+
+# --- SPOR TOTO VERİ ZENGİNLEŞTİRME ---
+# Toto listesinde sadece takım adları ve tarih var. Her satır maçkolik fikstüründeki
+# maça eşlenir, 15 maçın detay sayfası sınırlı paralellikle aynı anda çekilir ve her maç
+# tek satırlık özet bir "özellik satırına" indirgenir. Hepsi sabit bir süre bütçesi içinde:
+# bütçe dolduğunda bitmemiş maçlar veri olmadan (sadece yerel model ile) yapay zekaya gider.
+# Her scrape kalan bütçeyle kendi deadline.scope'unda çalışır: beklenmeden bırakılan işler de
+# bütçe dolunca kendiliğinden durur, tarayıcıları arka planda açık kalmaz.
+
+# Toplam süre bütçesi (sn) ve aynı anda açılacak tarayıcı sayısı
+ENRICH_BUDGET = float(os.getenv("TOTO_ENRICH_BUDGET", "120"))
+MAX_WORKERS = int(os.getenv("TOTO_ENRICH_WORKERS", "4"))
+# Bütçenin en fazla bu kadarı eksik fikstürleri indirmeye harcanır
+FIXTURE_BUDGET_SHARE = 0.4
+
+# Toto maçlarının büyük kısmı bu liglerden gelir (maçkolik lig listesindeki adlarla eşleşir)
+TOTO_LEAGUE_HINTS = ("TÜRKİYE Süper Lig", "TÜRKİYE 1. Lig")
+
+MATCH_THRESHOLD = 0.65   # ev/deplasman ortalama benzerliği
+TEAM_MIN_SIMILARITY = 0.55
+FEATURE_MAX_CHARS = 320
+
+# Takım adlarındaki şirket/kulüp ekleri eşleştirmeyi bozmasın
+_NAME_NOISE = {"a", "ş", "as", "fk", "sk", "jk", "kulübü", "futbol"}
+
+
+def _clean_name(name):
+    tokens = scraper._normalize_team_name(name).split()
+    return " ".join(t for t in tokens if t not in _NAME_NOISE)
+
+
+def _team_similarity(a, b):
+    a, b = _clean_name(a), _clean_name(b)
+    if not a or not b:
+        return 0.0
+    if a in b or b in a:
+        return 1.0
+    return scraper._similarity(a, b)
+
+
+def _day_month(text):
+    found = re.search(r"(\d{1,2})[./](\d{1,2})", text or "")
+    return (int(found.group(1)), int(found.group(2))) if found else None
+
+
+def resolve_fixture(row, fixtures):
+    """Toto satırına en çok benzeyen maçkolik maçı (yoksa None)."""
+    best, best_score = None, 0.0
+    row_day = _day_month(row.get("date"))
+    for fx in fixtures:
+        home_sim = _team_similarity(row["home"], fx["home"])
+        away_sim = _team_similarity(row["away"], fx["away"])
+        if home_sim < TEAM_MIN_SIMILARITY or away_sim < TEAM_MIN_SIMILARITY:
+            continue
+        score = (home_sim + away_sim) / 2
+        # Aynı eşleşme farklı haftalarda olabilir: tarih tutuyorsa küçük bir öncelik
+        if row_day and row_day == _day_month(fx.get("date")):
+            score += 0.05
+        if score > best_score:
+            best, best_score = fx, score
+    return best if best_score >= MATCH_THRESHOLD else None
+
+
+def _toto_leagues(leagues_map, league_cache):
+    """Fikstürü henüz indirilmemiş Toto ligleri."""
+    names = [n for n in (leagues_map or {}) if any(h in n for h in TOTO_LEAGUE_HINTS)]
+    return [n for n in names if n not in (league_cache or {})]
+
+
+def feature_line(home, away, details=None, league_value=None):
+    """Maçı prompt'a girecek tek satırlık özete indirger (league_value: bkz. local_predictor)."""
+    parts = []
+    pr = local_predictor.predict_probabilities(home, away, league_value=league_value)
+    if pr["sources"]:
+        parts.append(f"Model: {local_predictor.format_probabilities(pr)}")
+    if details:
+        forms = details.get("form_patterns") or []
+        if forms:
+            parts.append("Form: " + "/".join(forms[:2]))
+        insights = [re.sub(r"^\W+", "", str(i)) for i in (details.get("yellow_box") or [])[:2]]
+        if insights:
+            parts.append("Not: " + " ".join(insights))
+        comparison = relevance.select_sentences(details.get("comparison_stats", ""), top_n=2)
+        if comparison:
+            parts.append(comparison)
+    line = " | ".join(parts)
+    return line if len(line) <= FEATURE_MAX_CHARS else line[:FEATURE_MAX_CHARS - 1] + "…"
+
+
+def _scoped(expires_at, fn, *args):
+    """fn'i thread havuzunda, kalan bütçeyle sınırlı bir süre bütçesi içinde çalıştırır."""
+    with deadline.scope(max(0.0, expires_at - time.time())):
+        return fn(*args)
+
+
+def enrich_toto(rows, league_cache=None, leagues_map=None, budget=ENRICH_BUDGET,
+                max_workers=MAX_WORKERS, progress=None):
+    """
+    Toto satırlarını zenginleştirir. league_cache: {lig adı: fikstür maçları} (app'teki önbellek);
+    eksik Toto ligleri leagues_map ile indirilip league_cache'e eklenir.
+    progress(oran, mesaj) verilirse ilerleme bildirilir.
+    Dönüş: {"features": {mac_no: satır}, "resolved", "fetched", "timed_out", "elapsed"}
+    """
+    started = time.time()
+    expires_at = started + budget
+    league_cache = league_cache if league_cache is not None else {}
+
+    def _report(ratio, message):
+        if progress:
+            try: progress(min(1.0, ratio), message)
+            except Exception: pass
+
+    # "with" kullanılmıyor: çıkışta çalışan scrape'leri beklerdi, bütçe aşılırdı
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    resolved, details, timed_out = {}, {}, 0
+    try:
+        # 1. Eksik Toto liglerinin fikstürleri (paralel, bütçenin bir kısmıyla sınırlı)
+        missing = _toto_leagues(leagues_map, league_cache)
+        if missing:
+            _report(0.05, f"{len(missing)} ligin fikstürü indiriliyor...")
+            fixtures_until = started + budget * FIXTURE_BUDGET_SHARE
+            futures = {pool.submit(_scoped, fixtures_until, scraper.get_fixture_and_standings, leagues_map[n]): n
+                       for n in missing}
+            done, _ = wait(futures, timeout=max(0.0, fixtures_until - time.time()))
+            for fut in done:
+                try:
+                    matches = fut.result()["matches"]
+                except Exception as e:
+                    print(f"Toto fikstür hatası ({futures[fut]}): {e}")
+                    continue
+                for m in matches:
+                    m["league_name"] = futures[fut]
+                league_cache[futures[fut]] = matches
+
+        # 2. Satır -> maçkolik maçı
+        fixtures = [m for matches in league_cache.values() for m in matches if m.get("url")]
+        for row in rows:
+            fx = resolve_fixture(row, fixtures)
+            if fx:
+                resolved[row["mac_no"]] = fx
+        _report(0.2, f"{len(resolved)}/{len(rows)} maç eşlendi, detaylar çekiliyor...")
+
+        # 3. Detay sayfaları: sınırlı paralellik, kalan bütçe kadar beklenir
+        pending = {pool.submit(_scoped, expires_at, scraper.get_match_deep_stats, fx["url"]): no
+                   for no, fx in resolved.items()}
+        while pending:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                no = pending.pop(fut)
+                try:
+                    details[no] = fut.result()
+                except Exception as e:
+                    print(f"Toto detay hatası (maç {no}): {e}")
+            _report(0.2 + 0.8 * len(details) / max(1, len(resolved)), f"{len(details)}/{len(resolved)} maç detayı hazır")
+
+        timed_out = len(pending)
+    finally:
+        # Kuyruktakiler iptal edilir; çalışmakta olanlar beklenmez, kendi bütçeleri dolunca kapanır
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # 4. Özellik satırları (veri gelmeyen maçlar için sadece yerel model; ligi bilinmeyen maçta o da yok)
+    features = {}
+    for row in rows:
+        fx = resolved.get(row["mac_no"]) or {}
+        league_value = (leagues_map or {}).get(fx.get("league_name"))
+        line = feature_line(row["home"], row["away"], details.get(row["mac_no"]), league_value)
+        if line:
+            features[row["mac_no"]] = line
+
+    elapsed = time.time() - started
+    print(f"🎫 Toto zenginleştirme: {len(resolved)}/{len(rows)} eşlendi, {len(details)} detay, "
+          f"{timed_out} zaman aşımı, {elapsed:.1f} sn")
+    return {
+        "features": features,
+        "resolved": len(resolved),
+        "fetched": len(details),
+        "timed_out": timed_out,
+        "elapsed": round(elapsed, 1),
+    }
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from modules import ai_scheduler
+from modules.ai_scheduler import BATCH, CHAT, SINGLE
+
+
+def _hold(scheduler, priority, release, entered=None):
+    """Slotu release set edilene kadar tutan thread."""
+    def _run():
+        with scheduler.slot(priority):
+            if entered is not None:
+                entered.set()
+            release.wait(5)
+    thread = threading.Thread(target=_run)
+    thread.start()
+    return thread
+
+
+def _wait_queued(scheduler, count):
+    while sum(row["queued"] for row in scheduler.stats().values()) < count:
+        time.sleep(0.001)
+
+
+def test_waiting_chat_overtakes_queued_batch_work():
+    scheduler = ai_scheduler.AIScheduler(slots=1, reserve=0)
+    release, entered = threading.Event(), threading.Event()
+    holder = _hold(scheduler, SINGLE, release, entered)
+    entered.wait(5)
+
+    order = []
+
+    def _request(priority, name):
+        with scheduler.slot(priority):
+            order.append(name)
+
+    threads = []
+    for name, priority in [("kupon-1", BATCH), ("kupon-2", BATCH), ("kupon-3", BATCH),
+                           ("sohbet-1", CHAT), ("sohbet-2", CHAT), ("analiz-1", SINGLE)]:
+        threads.append(threading.Thread(target=_request, args=(priority, name)))
+        threads[-1].start()
+        _wait_queued(scheduler, len(threads))
+    release.set()
+    for t in [holder] + threads:
+        t.join(5)
+
+    # Sonradan gelen sohbet ve tek analiz, kuyruktaki toplu işlerin önüne geçer (WFQ etiketleri)
+    assert order[:3] == ["sohbet-1", "sohbet-2", "analiz-1"]
+    assert order[3:] == ["kupon-1", "kupon-2", "kupon-3"]
+    stats = scheduler.stats()
+    assert stats[BATCH]["queued"] == stats[CHAT]["running"] == 0
+
+
+def test_batch_work_leaves_reserved_slot_for_interactive_requests():
+    scheduler = ai_scheduler.AIScheduler(slots=2, reserve=1)
+    release, entered = threading.Event(), threading.Event()
+    holder = _hold(scheduler, BATCH, release, entered)
+    entered.wait(5)
+
+    second_batch = _hold(scheduler, BATCH, release)
+    _wait_queued(scheduler, 1)
+    # Bir slot boş ama toplu iş sınırı dolu: ikinci kupon bekler, sohbet hemen girer
+    assert scheduler.stats()[BATCH]["queued"] == 1
+    with scheduler.slot(CHAT, timeout=1):
+        assert scheduler.stats()[CHAT]["running"] == 1
+    release.set()
+    holder.join(5)
+    second_batch.join(5)
+    assert scheduler.stats()[BATCH]["queued"] == 0
+
+
+def test_slot_timeout_leaves_the_queue():
+    scheduler = ai_scheduler.AIScheduler(slots=1)
+    release, entered = threading.Event(), threading.Event()
+    holder = _hold(scheduler, CHAT, release, entered)
+    entered.wait(5)
+    try:
+        t0 = time.monotonic()
+        with pytest.raises(TimeoutError):
+            with scheduler.slot(SINGLE, timeout=0.05):
+                pass
+        assert time.monotonic() - t0 < 1
+        assert scheduler.stats()[SINGLE]["queued"] == 0
+    finally:
+        release.set()
+        holder.join(5)
+    # Zaman aşımı slotu tüketmez
+    with scheduler.slot(SINGLE, timeout=1):
+        pass
+
+
+def test_unknown_priority_is_scheduled_as_single_and_tracked():
+    scheduler = ai_scheduler.AIScheduler(slots=1)
+    with scheduler.track("bilinmeyen"), scheduler.slot("bilinmeyen"):
+        assert scheduler.stats()[SINGLE]["running"] == 1
+    assert scheduler.stats()[SINGLE]["requests"] == 1
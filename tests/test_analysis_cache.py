@@ -0,0 +1,62 @@
+import pytest
+
+from modules import ai_engine, analysis_cache, data_manager
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Geçici analysis_cache.db; sonuç kayıtları boş başlar."""
+    monkeypatch.setattr(analysis_cache, "DB_PATH", str(tmp_path / "analysis_cache.db"))
+    monkeypatch.setattr(analysis_cache, "_initialized", False)
+    monkeypatch.setattr(analysis_cache, "_last_outcome", {})
+    data_manager.set_user("test-key-1")
+    yield analysis_cache
+    data_manager.set_user(None)
+
+
+def _match(home, away, pick="MS 1"):
+    return {"home": home, "away": away, "lig": "Süper Lig", "insights": "", "stats": "", "local_pick": pick}
+
+
+def test_unchanged_inputs_are_reused_and_changed_fields_reported(cache):
+    key = cache.key_of("GALATASARAY", "FENERBAHÇE", "url")
+    hashes = cache.fingerprint_fields({"puan_durumu": "1. GS", "form": "GGBGM"})
+    assert cache.lookup(cache.MATCH, key, hashes) is None
+    assert cache.outcome(cache.MATCH, key) == {"reused": False, "changed": None}
+    cache.store(cache.MATCH, key, "GS - FB", hashes, {"ana_tercih": "MS 1"})
+
+    assert cache.lookup(cache.MATCH, key, hashes) == {"ana_tercih": "MS 1"}
+    assert cache.outcome(cache.MATCH, key) == {"reused": True, "changed": []}
+
+    moved = cache.fingerprint_fields({"puan_durumu": "2. GS", "form": "GGBGM"})
+    assert cache.lookup(cache.MATCH, key, moved) is None
+    assert cache.outcome(cache.MATCH, key)["changed"] == ["puan_durumu"]
+
+
+def test_outcome_is_visible_only_to_its_session_user(cache):
+    key = cache.key_of("GALATASARAY", "FENERBAHÇE", "url")
+    cache.lookup(cache.MATCH, key, cache.fingerprint_fields({"form": "GGBGM"}))
+    assert cache.outcome(cache.MATCH, key) is not None
+    data_manager.set_user("test-key-2")
+    assert cache.outcome(cache.MATCH, key) is None
+
+
+def test_coupon_from_another_pool_is_not_reused(cache, monkeypatch):
+    calls = []
+
+    def fake_ai(prompt, *args, **kwargs):
+        calls.append(prompt)
+        return [{"mac": f"kupon-{len(calls)}", "tahmin": "MS 1"}]
+
+    monkeypatch.setattr(ai_engine, "call_ai_with_retry", fake_ai)
+    pool_a = [_match("GALATASARAY", "FENERBAHÇE"), _match("BEŞİKTAŞ", "TRABZONSPOR")]
+    pool_b = [_match("SAMSUNSPOR", "GÖZTEPE"), _match("KONYASPOR", "ALANYASPOR")]
+
+    first, run = ai_engine.generate_smart_coupon_run(pool_a, 2, "Banko", shortlist_k=0)
+    assert not run["cached"] and run["reuse"] == {"reused": False, "changed": None}
+    again, run = ai_engine.generate_smart_coupon_run(pool_a, 2, "Banko", shortlist_k=0)
+    assert again == first and run["cached"] and run["reuse"]["reused"]
+
+    other, run = ai_engine.generate_smart_coupon_run(pool_b, 2, "Banko", shortlist_k=0)
+    assert not run["cached"] and other != first
+    assert len(calls) == 2
@@ -0,0 +1,88 @@
+import pytest
+
+from modules import chat_cache
+
+SCOPE = ("Galatasaray", "Fenerbahçe", "ozet-1")
+
+
+def _tokens(question):
+    return chat_cache.question_tokens(question)
+
+
+def test_paraphrase_hits_and_stopwords_are_dropped():
+    cache = chat_cache.ChatAnswerCache()
+    assert _tokens("Sence bu maçı kim kazanır?") == _tokens("Kim kazanır bu maçı?") == {"kim", "kazan"}
+    cache.put(SCOPE, _tokens("Sence bu maçı kim kazanır?"), "Sence bu maçı kim kazanır?", "Ev sahibi")
+    assert cache.get(SCOPE, _tokens("Kim kazanır bu maçı?")) == "Ev sahibi"
+
+
+def test_jaccard_threshold_boundary():
+    cache = chat_cache.ChatAnswerCache()
+    cache.put(SCOPE, frozenset({"kac", "gol"}), "Kaç gol?", "2.5 üst")
+    # 2/3 ≈ 0.67 < 0.7: farklı soru sayılır
+    assert _tokens("Kaç gol atılır sence?") == {"kac", "gol", "atili"}
+    assert cache.get(SCOPE, _tokens("Kaç gol atılır sence?")) is None
+    # Eşiğe tam eşit benzerlik yanıtlanır (>=)
+    exact = chat_cache.ChatAnswerCache(threshold=2 / 3)
+    exact.put(SCOPE, frozenset({"kac", "gol"}), "Kaç gol?", "2.5 üst")
+    assert exact.get(SCOPE, frozenset({"kac", "gol", "atili"})) == "2.5 üst"
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_best_match_wins_and_empty_questions_are_ignored():
+    cache = chat_cache.ChatAnswerCache(threshold=0.5)
+    cache.put(SCOPE, frozenset({"kim", "kazan"}), "Kim kazanır?", "Ev sahibi")
+    cache.put(SCOPE, frozenset({"kim", "gol", "atar"}), "Kim gol atar?", "Icardi")
+    assert cache.get(SCOPE, frozenset({"kim", "gol", "atar", "ilk"})) == "Icardi"
+    cache.put(SCOPE, frozenset(), "?", "boş")
+    assert cache.get(SCOPE, frozenset()) is None
+
+
+@pytest.mark.parametrize("positive, negative", [
+    ("Galatasaray kazanır mı?", "Galatasaray kazanmaz mı?"),
+    ("Kim kazanır?", "Kim kazanamaz?"),
+    ("İlk yarı gol olur mu?", "İlk yarı gol olmaz mı?"),
+    ("Icardi oynayacak mı?", "Icardi oynamayacak mı?"),
+    ("Sakat oyuncu var mı?", "Sakat oyuncu yok mu?"),
+])
+def test_negated_question_never_gets_the_positive_answer(positive, negative):
+    assert chat_cache.NEGATION in _tokens(negative)
+    assert chat_cache.NEGATION not in _tokens(positive)
+    cache = chat_cache.ChatAnswerCache(threshold=0.01)
+    cache.put(SCOPE, _tokens(positive), positive, "evet")
+    assert cache.get(SCOPE, _tokens(negative)) is None
+    cache.put(SCOPE, _tokens(negative), negative, "hayır")
+    assert cache.get(SCOPE, _tokens(negative)) == "hayır"
+    assert cache.get(SCOPE, _tokens(positive)) == "evet"
+
+
+def test_turkish_letters_and_olur_are_kept():
+    assert _tokens("İlk yarı gol olur mu?") == {"ilk", "yari", "gol", "olur"}
+    # "maç", "mazeret" gibi kelimeler olumsuz sayılmaz
+    assert chat_cache.NEGATION not in _tokens("Maçta mazeret var mı, kim gol atacak?")
+
+
+def test_different_analyses_of_one_match_do_not_evict_each_other():
+    cache = chat_cache.ChatAnswerCache()
+    other = SCOPE[:2] + ("ozet-2",)
+    cache.put(SCOPE, frozenset({"kim", "kazan"}), "Kim kazanır?", "Ev sahibi")
+    cache.put(other, frozenset({"kim", "kazan"}), "Kim kazanır?", "Deplasman")
+    assert cache.get(SCOPE, frozenset({"kim", "kazan"})) == "Ev sahibi"
+    assert cache.get(other, frozenset({"kim", "kazan"})) == "Deplasman"
+    assert cache.stats()["scopes"] == 2
+    cache.invalidate(*SCOPE[:2])
+    assert cache.stats()["answers"] == 0
+
+
+def test_least_recently_used_scope_is_dropped():
+    cache = chat_cache.ChatAnswerCache(max_scopes=2)
+    for i in range(3):
+        cache.put(SCOPE[:2] + (f"ozet-{i}",), frozenset({"kim", "kazan"}), "Kim kazanır?", str(i))
+    assert cache.get(SCOPE[:2] + ("ozet-0",), frozenset({"kim", "kazan"})) is None
+    assert cache.get(SCOPE[:2] + ("ozet-2",), frozenset({"kim", "kazan"})) == "2"
+
+
+def test_expired_answers_are_not_returned():
+    cache = chat_cache.ChatAnswerCache(ttl=-1)
+    cache.put(SCOPE, frozenset({"kim", "kazan"}), "Kim kazanır?", "Ev sahibi")
+    assert cache.get(SCOPE, frozenset({"kim", "kazan"})) is None
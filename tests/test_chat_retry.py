@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from modules import ai_engine, chat_cache, chat_sessions, key_pool, model_registry, model_router
+
+OWN_KEY = "own-key"
+SHARED_KEY = "shared-key"
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message):
+        time.sleep(0.01)
+        if self.model.key in self.model.exhausted:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        if self.model.key in self.model.broken:
+            raise RuntimeError("400 API key not valid")
+        self.history += [{"role": "user", "parts": [message]}, {"role": "model", "parts": ["Ev sahibi"]}]
+        return type("Response", (), {"text": " Ev sahibi \n", "usage_metadata": None})()
+
+
+class FakeModel:
+    exhausted = set()
+    broken = set()
+
+    def __init__(self, key, model_name):
+        self.key = key
+        self.model_name = model_name
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """Taklit model; key havuzu, yönlendirici, oturumlar ve yanıt önbelleği boş başlar."""
+    FakeModel.exhausted, FakeModel.broken = set(), set()
+    monkeypatch.setattr(model_registry, "new_model",
+                        lambda key, model_name, system_instruction=None: FakeModel(key, model_name))
+    monkeypatch.setattr(key_pool, "POOL", key_pool.KeyPool([SHARED_KEY]))
+    monkeypatch.setattr(model_router, "ROUTER", model_router.ModelRouter())
+    monkeypatch.setattr(chat_sessions, "SESSIONS", chat_sessions.ChatSessionManager())
+    monkeypatch.setattr(chat_cache, "ANSWERS", chat_cache.ChatAnswerCache())
+    monkeypatch.setattr(ai_engine, "RETRY_BASE_WAIT", 0.01)
+    monkeypatch.setattr(ai_engine, "RETRY_WAIT_STEP", 0.01)
+    ai_engine.set_api_key(OWN_KEY)
+    yield ai_engine
+
+
+CONTEXT = {"home_team": "GALATASARAY", "away_team": "FENERBAHÇE"}
+
+
+def _session(session_id):
+    return chat_sessions.SESSIONS.get_or_create(
+        chat_sessions.session_key(session_id, "GALATASARAY", "FENERBAHÇE", CONTEXT), lambda: None
+    )
+
+
+def test_quota_error_moves_conversation_to_healthy_shared_key(chat, monkeypatch):
+    recorded = []
+    record = model_router.ROUTER.record
+    monkeypatch.setattr(model_router.ROUTER, "record",
+                        lambda model, seconds, **kw: recorded.append((seconds, kw)) or record(model, seconds, **kw))
+
+    assert chat.get_chat_response("Kim kazanır?", CONTEXT, session_id="s1") == "Ev sahibi"
+    assert _session("s1").model.key == OWN_KEY
+
+    FakeModel.exhausted.add(OWN_KEY)
+    assert chat.get_chat_response("İlk golü kim atar?", CONTEXT, session_id="s1") == "Ev sahibi"
+    session = _session("s1")
+    assert session.model.key == SHARED_KEY
+    # Konuşma geçmişi yeni key'deki oturuma taşınır
+    assert [t["parts"][0] for t in session.history if t["role"] == "user"] == ["Kim kazanır?", "İlk golü kim atar?"]
+
+    failures = [(seconds, kw) for seconds, kw in recorded if kw.get("ok") is False]
+    assert len(failures) == 1 and failures[0][1]["quota_error"]
+    # Başarısız denemenin gerçek süresi kaydedilir (0 ms değil)
+    assert failures[0][0] >= 0.01
+
+
+def test_all_keys_exhausted_returns_wait_message(chat):
+    FakeModel.exhausted.update({OWN_KEY, SHARED_KEY})
+    answer = chat.get_chat_response("Kim kazanır?", CONTEXT, session_id="s2")
+    assert answer.startswith("Şu an tüm API kotaları dolu")
+    assert chat_cache.ANSWERS.stats()["answers"] == 0
+
+
+def test_non_quota_error_drops_session_without_retry(chat):
+    FakeModel.broken.add(OWN_KEY)
+    answer = chat.get_chat_response("Kim kazanır?", CONTEXT, session_id="s3")
+    assert answer.startswith("Üzgünüm")
+    assert chat_sessions.SESSIONS.stats()["active"] == 0
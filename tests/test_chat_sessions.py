@@ -0,0 +1,61 @@
+import types
+
+from modules import chat_sessions
+
+CONTEXT = {"ana_tercih": "MS 1", "guven": "%70"}
+
+
+def _key(owner="oturum-1", context=CONTEXT):
+    return chat_sessions.session_key(owner, "GALATASARAY", "FENERBAHÇE", context)
+
+
+def test_follow_up_questions_reuse_the_session():
+    sessions = chat_sessions.ChatSessionManager()
+    built = []
+    factory = lambda: built.append(1) or object()
+    first = sessions.get_or_create(_key(), factory)
+    assert sessions.get_or_create(_key(), factory) is first
+    assert built == [1]
+    assert sessions.stats() == {"active": 1, "created": 1, "reused": 1, "evicted": 0}
+
+
+def test_new_analysis_or_owner_gets_its_own_session():
+    assert _key() == _key(context=dict(reversed(list(CONTEXT.items()))))
+    assert _key() != _key(context={**CONTEXT, "ana_tercih": "MS X"})
+    assert _key() != _key(owner="oturum-2")
+    assert chat_sessions.session_key(None, "A", "B", None)[0] == "-"
+
+
+def test_lru_and_idle_sessions_are_evicted():
+    sessions = chat_sessions.ChatSessionManager(max_sessions=2)
+    for owner in ("o1", "o2"):
+        sessions.get_or_create(_key(owner), object)
+    sessions.get_or_create(_key("o1"), object)  # o1 en son kullanılan
+    sessions.get_or_create(_key("o3"), object)
+    assert sessions.stats()["evicted"] == 1
+    kept = sessions.get_or_create(_key("o1"), lambda: "yeni")
+    assert kept != "yeni"
+
+    idle = chat_sessions.ChatSessionManager(idle_ttl=-1)
+    idle.get_or_create(_key(), object)
+    assert idle.get_or_create(_key(), lambda: "yeni") == "yeni"
+
+
+def test_drop_owner_removes_only_that_owners_sessions():
+    sessions = chat_sessions.ChatSessionManager()
+    sessions.get_or_create(_key("o1"), object)
+    sessions.get_or_create(_key("o1", {"ana_tercih": "KG VAR"}), object)
+    sessions.get_or_create(_key("o2"), object)
+    sessions.drop_owner("o1")
+    assert sessions.stats()["active"] == 1
+    sessions.drop(_key("o2"))
+    assert sessions.stats()["active"] == 0
+
+
+def test_history_is_trimmed_to_last_turns():
+    chat = types.SimpleNamespace(history=[])
+    for i in range(chat_sessions.MAX_TURNS + 2):
+        chat_sessions.append_turn(chat, f"soru {i}", f"yanıt {i}")
+    assert len(chat.history) == chat_sessions.MAX_TURNS * 2
+    assert chat.history[0] == {"role": "user", "parts": ["soru 2"]}
+    assert chat.history[-1] == {"role": "model", "parts": [f"yanıt {chat_sessions.MAX_TURNS + 1}"]}
@@ -0,0 +1,49 @@
+import pytest
+
+from modules import coupon_scorer
+
+
+def _probs(p1, px, p2, o15=0.75, o25=0.5, o35=0.25, btts=0.5):
+    return {"1": p1, "X": px, "2": p2, "over_1_5": o15, "over_2_5": o25, "over_3_5": o35, "btts": btts}
+
+
+POOL = [
+    {"home": "A", "away": "B", "probs": _probs(0.45, 0.30, 0.25)},
+    {"home": "C", "away": "D", "probs": _probs(0.80, 0.13, 0.07, o15=0.9, o25=0.7)},
+    {"home": "E", "away": "F", "probs": _probs(0.35, 0.30, 0.35, btts=0.62)},
+    {"home": "G", "away": "H", "probs": None},
+    {"home": "I", "away": "J", "probs": _probs(0.62, 0.22, 0.16)},
+]
+
+
+def test_banko_prefers_the_most_likely_pick_above_min_odd():
+    ranked = coupon_scorer.rank(POOL, "🛡️ BANKO", "Taraf")
+    assert [m["home"] for m in ranked] == ["A", "E", "I", "C", "G"]
+    assert ranked[0]["local_pick"].startswith("1X (%75")
+    # C'nin MS 1 (%80) ve 1X (%93) tahmini oranları MIN_ODD altında: bültende anlamsız, elenir
+    assert ranked[3]["local_pick"].startswith("X2 (%20")
+    assert "local_pick" not in ranked[-1]
+
+
+def test_goal_focus_only_offers_goal_markets():
+    for m in coupon_scorer.rank(POOL, "🛡️ BANKO", "Gol"):
+        if "local_pick" in m:
+            assert m["local_pick"].split(" (")[0] in coupon_scorer.GOAL_MARKETS
+
+
+def test_ideal_profile_targets_its_probability_band():
+    score, market, p, odd = coupon_scorer.score_candidate(POOL[0], "⚖️ İDEAL", "Taraf")
+    assert abs(p - coupon_scorer.TARGET_PROB["IDEAL"]) <= 0.1
+    assert odd == pytest.approx(coupon_scorer.BOOKMAKER_MARGIN / p)
+
+
+@pytest.mark.parametrize("k, expected", [(None, 5), (0, 5), (1, 2), (3, 3)])
+def test_shortlist_size(k, expected):
+    # None: otomatik (2 maç için max(4, 5) = 5), 0: kapalı, K < maç sayısı -> maç sayısı
+    assert len(coupon_scorer.shortlist(POOL, 2, "🛡️ BANKO", "Taraf", k)) == expected
+
+
+def test_run_record():
+    run = coupon_scorer.run_record(10, 4, 2000, 800, 1.234, 2500.0)
+    assert (run["reduction_pct"], run["scoring_ms"], run["cached"]) == (60.0, 1.23, False)
+    assert coupon_scorer.run_record(10, 0, cached=True)["reduction_pct"] == 0.0
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from modules import deadline
+
+
+def test_no_scope_is_unbounded():
+    assert deadline.current() is None
+    assert deadline.remaining() is None
+    assert deadline.remaining(default=5) == 5
+    assert deadline.timeout(12) == 12
+    assert deadline.timeout_ms(3000) == 3000
+    assert deadline.allows(10 ** 6)
+    assert not deadline.expired()
+
+
+def test_scope_limits_timeouts_to_remaining_budget():
+    with deadline.scope(2.0) as dl:
+        assert deadline.current() is dl
+        assert 1.9 < deadline.remaining() <= 2.0
+        assert deadline.timeout(0.5) == 0.5
+        assert 1.9 < deadline.timeout(30) <= 2.0
+        assert 1900 < deadline.timeout_ms(30000) <= 2000
+        assert deadline.allows(1.5)
+        assert not deadline.allows(5)
+    assert deadline.current() is None
+
+
+def test_nested_scope_cannot_outlive_parent_and_shares_skips():
+    with deadline.scope(1.0) as outer:
+        with deadline.scope(60.0) as inner:
+            assert inner.budget <= 1.0
+            deadline.skip("lig istatistikleri")
+        assert deadline.current() is outer
+        assert outer.skipped == ["lig istatistikleri"]
+
+
+def test_expired_scope():
+    with deadline.scope(0.05) as dl:
+        time.sleep(0.06)
+        assert deadline.expired()
+        assert dl.remaining() == 0.0
+        assert deadline.timeout(10) == 0.0
+        # Playwright'ta 0 "sınırsız" demek; en az 1 ms
+        assert deadline.timeout_ms(10000) == 1
+
+
+def test_sleep_is_cut_short_by_budget():
+    with deadline.scope(0.1):
+        t0 = time.monotonic()
+        assert deadline.sleep(5) is False
+        assert time.monotonic() - t0 == pytest.approx(0.1, abs=0.05)
+    assert deadline.sleep(0.01) is True
+
+
+def test_skip_records_stage_once():
+    with deadline.scope(10) as dl:
+        deadline.skip("yapay zeka")
+        deadline.skip("yapay zeka")
+        assert dl.skipped == ["yapay zeka"]
+    deadline.skip("kapsam dışı")  # bütçe yokken sessizce yok sayılır
@@ -0,0 +1,101 @@
+import datetime
+import json
+import os
+
+import pytest
+
+from modules import data_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_JSON = os.path.join(ROOT, "user_history.json")
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Geçici history.db; sıcak katman küçük tutulur ki arşive taşıma hemen başlasın."""
+    monkeypatch.setattr(data_manager, "HISTORY_DB", str(tmp_path / "history.db"))
+    monkeypatch.setattr(data_manager, "DB_FILE", str(tmp_path / "yok.json"))
+    monkeypatch.setattr(data_manager, "HOT_LIMIT", 4)
+    monkeypatch.setattr(data_manager, "ROLL_BATCH", 2)
+    monkeypatch.setattr(data_manager, "_initialized", False)
+    data_manager.set_user("test-key-1")
+    yield data_manager
+    data_manager.set_user(None)
+
+
+def _real_analyses():
+    """Depodaki eski geçmişin analizleri, en eskiden yeniye."""
+    with open(LEGACY_JSON, encoding="utf-8") as f:
+        return list(reversed(json.load(f)["analyses"]))
+
+
+def _append_spread(analyses):
+    """Analizleri Ocak-Mart 2026'ya yayarak ekler; eklenme sırası = id sırası."""
+    start = datetime.datetime(2026, 1, 5, 20, 0)
+    for i, entry in enumerate(analyses):
+        data_manager._append("analysis", entry, start + datetime.timedelta(days=6 * i))
+
+
+def test_old_entries_roll_into_monthly_segments(history):
+    analyses = _real_analyses()
+    _append_spread(analyses)
+
+    hot = history.count_history("analysis")
+    index = history.get_archive_index("analysis")
+    archived = sum(m["count"] for m in index)
+    assert hot <= history.HOT_LIMIT + history.ROLL_BATCH
+    assert hot + archived == len(analyses)
+    assert [m["month"] for m in index] == sorted({m["month"] for m in index}, reverse=True)
+
+    # Sıcak katman en yeni kayıtlar, arşiv en eskiler (kayıt kaybı / tekrarı yok)
+    hot_matches = [e["match"] for e in history.get_history_page("analysis", 0, 100)["entries"]]
+    archived_matches = []
+    for m in reversed(index):
+        month_entries = history.get_archived("analysis", m["month"])
+        assert len(month_entries) == m["count"]
+        assert all(e["display"]["title"].startswith(e["match"]) for e in month_entries)
+        archived_matches.extend(reversed([e["match"] for e in month_entries]))
+    assert archived_matches + list(reversed(hot_matches)) == [a["match"] for a in analyses]
+
+
+def test_search_finds_archived_entries(history):
+    analyses = _real_analyses()
+    _append_spread(analyses)
+    oldest = analyses[0]
+    assert oldest["match"] == "Göztepe - Kayserispor"
+    assert history.count_history("analysis") < len(analyses)
+
+    found = history.search_history("goztepe kayserispor")
+    assert found["total"] >= 1
+    hit = next(e for e in found["entries"] if e["match"] == oldest["match"])
+    assert hit["kind"] == "analysis"
+    assert hit["summary"] == oldest["summary"]
+    assert hit["display"]["main_pick"] == oldest["summary"]["ana_tercih"]
+
+    # Türkçe karakterler katlanır ve her kelime önek olarak aranır ("Göztep" -> "goztepe")
+    assert any(e["match"] == oldest["match"] for e in history.search_history("Göztep kayseri")["entries"])
+    assert history.search_history("")["total"] == 0
+
+
+def test_partitions_are_isolated_and_legacy_is_opt_in(history, monkeypatch):
+    monkeypatch.setattr(data_manager, "DB_FILE", LEGACY_JSON)
+    with open(LEGACY_JSON, encoding="utf-8") as f:
+        legacy = json.load(f)
+    legacy_count = len(legacy["analyses"])
+    # Eski ortak geçmiş varsayılan olarak görünmez
+    assert history.count_history("analysis") == 0
+    assert history.search_history("goztepe kayserispor")["total"] == 0
+
+    history._append("analysis", _real_analyses()[0], datetime.datetime(2026, 3, 1, 12, 0))
+    assert history.count_history("analysis") == 1
+    history.set_shared_history(True)
+    try:
+        assert history.count_history("analysis") == legacy_count + 1
+        assert history.search_history("goztepe kayserispor")["total"] == 2
+
+        history.set_user("test-key-2")
+        assert history.count_history("analysis") == legacy_count
+        assert history.count_history("coupon") == len(legacy["coupons"])
+    finally:
+        history.set_shared_history(False)
+    assert history.count_history("analysis") == 0
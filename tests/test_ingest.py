@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+from modules import db_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """data/futbol.db'nin geçici kopyası (depodaki dosya değişmez)."""
+    path = tmp_path / "futbol.db"
+    shutil.copy(os.path.join(ROOT, "data", "futbol.db"), path)
+    monkeypatch.setattr(db_manager, "DB_PATH", str(path))
+    yield db_manager
+    db_manager.close_connection()
+
+
+def _scraped(week):
+    """scraper.get_fixture_and_standings çıktısı biçiminde, sitedeki yazımla."""
+    return {
+        "week": week,
+        "matches": [
+            {"home": "Galatasaray", "away": "İkas Eyüpspor", "score": (2, 1)},
+            {"home": "Hesap.com Antalyaspor", "away": "Samsunspor", "score": None},
+        ],
+        "standings": [],
+        "table": [{"name": "Galatasaray", "played": 21, "wins": 16, "draws": 4, "losses": 1,
+                   "goals_for": 50, "goals_against": 14, "points": 52}],
+    }
+
+
+def _match_count(db):
+    return db.get_db_connection().execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+
+def test_scraped_names_map_to_stored_spelling(db):
+    known = db._known_team_names(db.get_db_connection())
+    assert db.canonical_team_name("Gaziantep", known) == "GAZİANTEP"
+    assert db.canonical_team_name("  İkas   Eyüpspor ", known) == "İKAS EYÜPSPOR"
+    # Veritabanında olmayan takım Türkçe kurallarla büyük harfe çevrilir
+    assert db.canonical_team_name("Iğdır fk", known) == "IĞDIR FK"
+
+
+def test_ingest_updates_existing_rows_without_duplicates(db):
+    count = _match_count(db)
+    report = db.ingest_fixture_and_standings(_scraped(22))
+    assert (report["teams"], report["matches"]) == (1, 2)
+    assert _match_count(db) == count
+    row = db.get_db_connection().execute(
+        "SELECT home_score, away_score, is_played FROM matches WHERE week=22 AND home_team='GALATASARAY'"
+    ).fetchone()
+    assert row == (2, 1, 1)
+    assert db.get_team_stats("GALATASARAY")["points"] == 52
+    assert db.calculate_team_performance("GALATASARAY") == db.calculate_team_performance_scan("GALATASARAY")
+
+
+def test_matches_are_skipped_when_week_is_unknown(db):
+    count = _match_count(db)
+    report = db.ingest_fixture_and_standings(_scraped(None))
+    assert (report["teams"], report["matches"]) == (1, 0)
+    assert _match_count(db) == count
+    assert db.get_team_stats("GALATASARAY")["points"] == 52
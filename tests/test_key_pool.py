@@ -0,0 +1,72 @@
+import pytest
+
+from modules import key_pool
+
+FLASH = "gemini-2.5-flash"
+LITE = "gemini-2.5-flash-lite"
+
+
+def _pool(keys=("shared-key-1", "shared-key-2"), rpm=3):
+    return key_pool.KeyPool(list(keys), rpm_limit=rpm, cooldown=60)
+
+
+def test_own_key_first_then_least_loaded_shared_key():
+    pool = _pool(rpm=2)
+    pool.register("own-key-abc", shared=False)
+    assert [pool.acquire("own-key-abc") for _ in range(2)] == ["own-key-abc"] * 2
+    # Kendi key'i dakikalık sınırda: ortak key'lere dağılır
+    spill = [pool.acquire("own-key-abc") for _ in range(4)]
+    assert sorted(spill) == ["shared-key-1", "shared-key-1", "shared-key-2", "shared-key-2"]
+    assert pool.acquire("own-key-abc") is None
+    assert not pool.has_healthy(preferred="own-key-abc")
+
+
+def test_private_key_is_never_given_to_other_sessions():
+    pool = _pool(keys=())
+    pool.register("own-key-abc", shared=False)
+    assert pool.acquire("other-key") is None
+    assert pool.pick() is None
+    assert not pool.has_healthy(preferred="other-key")
+    assert pool.stats() == []
+    assert [row["key"] for row in pool.stats("own-key-abc")] == [key_pool.mask_key("own-key-abc")]
+
+
+def test_quota_error_cools_down_only_that_model():
+    pool = _pool(keys=("shared-key-1",))
+    key = pool.acquire(model=FLASH)
+    pool.release(key, quota_error=True, model=FLASH)
+    assert pool.acquire(model=FLASH) is None
+    assert not pool.has_healthy(FLASH)
+    assert pool.next_available_in(FLASH) == pytest.approx(60, abs=1)
+    # Aynı key diğer modelde kullanılabilir
+    assert pool.acquire(model=LITE) == "shared-key-1"
+    assert pool.stats()[0]["quota_errors"] == 1
+
+
+def test_quota_error_without_model_cools_down_every_model():
+    pool = _pool(keys=("shared-key-1",))
+    pool.release(pool.acquire(), quota_error=True)
+    assert pool.acquire(model=FLASH) is None
+    assert pool.acquire(model=LITE) is None
+
+
+def test_in_flight_requests_count_towards_load():
+    pool = _pool(rpm=10)
+    first = pool.acquire()
+    pool.begin(first)
+    # İlk key'de iki istek sürüyor: sıradaki istek diğer key'e gider
+    assert pool.acquire() != first
+    pool.release(first)
+    stats = {row["key"]: row for row in pool.stats()}
+    assert stats[key_pool.mask_key(first)]["in_flight"] == 1
+    assert stats[key_pool.mask_key(first)]["rpm_used"] == 2
+
+
+def test_register_is_idempotent_and_ignores_empty_keys():
+    pool = _pool(keys=())
+    pool.register("own-key-abc", shared=False)
+    pool.register("own-key-abc")  # tekrar kayıt ortak yapmaz
+    pool.register("")
+    assert pool.size() == 1
+    assert pool.acquire("someone-else") is None
+    assert key_pool.mask_key("AIzaSyExampleKey1234") == "AIza…1234"
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import pytest
+
+from modules import db_manager, local_predictor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """data/futbol.db'nin geçici kopyası (depodaki dosya değişmez)."""
+    path = tmp_path / "futbol.db"
+    shutil.copy(os.path.join(ROOT, "data", "futbol.db"), path)
+    monkeypatch.setattr(db_manager, "DB_PATH", str(path))
+    monkeypatch.setattr(local_predictor, "_fit_cache", {"key": None, "model": None})
+    yield db_manager
+    db_manager.close_connection()
+
+
+@pytest.fixture
+def names(db):
+    return list(local_predictor.get_model()["teams"])
+
+
+@pytest.mark.parametrize("team", [
+    "Boluspor", "Karabükspor", "Sivasspor", "Amedspor", "Hatayspor", "Ankaragücü",
+    "Bandırmaspor", "Iğdır FK", "Manisa FK", "Manchester City",
+])
+def test_other_clubs_are_not_mapped_onto_super_lig_teams(names, team):
+    assert local_predictor._find_team(team, names) is None
+
+
+@pytest.mark.parametrize("team, stored", [
+    ("Antalyaspor", "HESAP.COM ANTALYASPOR"),
+    ("Rizespor", "ÇAYKUR RİZESPOR"),
+    ("Başakşehir FK", "RAMS BAŞAKŞEHİR"),
+    ("Gaziantep FK", "GAZİANTEP"),
+    ("Eyüpspor", "İKAS EYÜPSPOR"),
+    ("Kasımpaşa", "KASIMPAŞA"),
+    ("Fatih Karagümrük", "FATİH KARAGÜMRÜK"),
+])
+def test_sponsor_prefixes_and_club_suffixes_are_ignored(names, team, stored):
+    assert local_predictor._find_team(team, names) == stored
+
+
+def test_database_is_used_only_for_its_own_league(db):
+    in_league = local_predictor.predict_probabilities("Galatasaray", "Kocaelispor", league_value=db.LEAGUE_VALUE)
+    assert in_league["sources"] and "veritabanı" in in_league["sources"][0]
+    other = local_predictor.predict_probabilities("Galatasaray", "Kocaelispor", league_value="2-1")
+    assert other["sources"] == []
+    assert (other["xg_home"], other["xg_away"]) == (local_predictor.DEFAULT_HOME_GOALS, local_predictor.DEFAULT_AWAY_GOALS)
+    # Veritabanında olmayan takım lig ortalamasına düşer
+    unknown = local_predictor.predict_probabilities("Boluspor", "Sivasspor", league_value=db.LEAGUE_VALUE)
+    model = local_predictor.get_model()
+    assert unknown["sources"] == []
+    assert unknown["xg_home"] == round(model["mu_home"], 2)
+
+
+def test_probabilities_are_consistent(db):
+    pr = local_predictor.predict_probabilities("Fenerbahçe", "Samsunspor", league_value=db.LEAGUE_VALUE)
+    assert pr["1"] + pr["X"] + pr["2"] == pytest.approx(1.0)
+    assert 1 >= pr["over_1_5"] >= pr["over_2_5"] >= pr["over_3_5"] >= 0
+    result = local_predictor.predict_match("Fenerbahçe", "Samsunspor", league_value=db.LEAGUE_VALUE)
+    assert result["kaynak"] == "yerel_model"
+    assert result["olasiliklar"]["ms1"] == round(pr["1"], 3)
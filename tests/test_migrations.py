@@ -0,0 +1,77 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from modules import db_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Migrasyon öncesi (user_version 0) data/futbol.db'nin geçici kopyası; depodaki dosya değişmez."""
+    path = tmp_path / "futbol.db"
+    shutil.copy(os.path.join(ROOT, "data", "futbol.db"), path)
+    monkeypatch.setattr(db_manager, "DB_PATH", str(path))
+    yield str(path)
+    db_manager.close_connection()
+
+
+def _raw(path):
+    return sqlite3.connect(path, isolation_level=None)
+
+
+def test_v1_keeps_last_written_duplicate_and_adds_unique_index(legacy_db):
+    raw = _raw(legacy_db)
+    assert raw.execute("PRAGMA user_version").fetchone()[0] == 0
+    total = raw.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+    week, home, away, hs, as_ = raw.execute(
+        "SELECT week, home_team, away_team, home_score, away_score FROM matches "
+        "WHERE home_team = 'GAZİANTEP' AND away_team = 'GALATASARAY'"
+    ).fetchone()
+    # Eski kod aynı maçı her kazımada yeniden ekliyordu: ilk kayıt eski skor, son kayıt güncel skor
+    raw.executemany(
+        "INSERT INTO matches (week, home_team, away_team, home_score, away_score, is_played) VALUES (?, ?, ?, ?, ?, 1)",
+        [(week, home, away, 9, 9), (week, home, away, hs, as_ + 1)]
+    )
+    raw.close()
+
+    conn = db_manager.get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db_manager.SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0] == total
+    assert conn.execute(
+        "SELECT home_score, away_score FROM matches WHERE week=? AND home_team=? AND away_team=?",
+        (week, home, away)
+    ).fetchall() == [(hs, as_ + 1)]
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"ux_matches_fixture", "idx_matches_home", "idx_matches_away", "idx_matches_played_week"} <= indexes
+
+    # Toplamlar tekilleştirilmiş tablodan kurulur
+    assert db_manager.calculate_team_performance("GALATASARAY") == \
+        db_manager.calculate_team_performance_scan("GALATASARAY")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO matches (week, home_team, away_team) VALUES (?, ?, ?)", (week, home, away))
+
+
+def test_upsert_updates_in_place_after_migration(legacy_db):
+    conn = db_manager.get_db_connection()
+    total = conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+    db_manager.save_match_result(1, "GAZİANTEP", "GALATASARAY", 1, 1, 1)
+    db_manager.save_match_result(1, "GAZİANTEP", "GALATASARAY", 1, 2, 1)
+    assert conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0] == total
+    assert conn.execute(
+        "SELECT home_score, away_score FROM matches WHERE week=1 AND home_team='GAZİANTEP'"
+    ).fetchone() == (1, 2)
+
+
+def test_migration_runs_once_per_database(legacy_db):
+    db_manager.get_db_connection()
+    db_manager.close_connection()
+    raw = _raw(legacy_db)
+    raw.execute("PRAGMA user_version = 0")
+    raw.close()
+    # Aynı süreçte bu yolun şeması zaten kontrol edildi: tekrar migrasyon yapılmaz
+    conn = db_manager.get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
@@ -0,0 +1,78 @@
+import time
+
+from modules import model_router
+
+FLASH = "gemini-2.5-flash"
+LITE = "gemini-2.5-flash-lite"
+ROUTES = {
+    model_router.CHAT: {"models": [FLASH, LITE], "p95_slo": 8},
+    model_router.ANALYSIS: {"models": [FLASH, LITE], "p95_slo": 30},
+}
+
+
+def _router():
+    return model_router.ModelRouter({task: dict(cfg) for task, cfg in ROUTES.items()})
+
+
+def _record(router, model, seconds, count=model_router.MIN_SAMPLES):
+    for _ in range(count):
+        router.record(model, seconds)
+
+
+def test_primary_model_while_within_slo():
+    router = _router()
+    assert router.choose(model_router.CHAT) == FLASH
+    _record(router, FLASH, 2.0)
+    assert router.choose(model_router.CHAT) == FLASH
+
+
+def test_slow_primary_falls_back_per_task_slo():
+    router = _router()
+    _record(router, FLASH, 12.0)
+    # 12 sn sohbet hedefini (8) aşar, analiz hedefini (30) aşmaz
+    assert router.choose(model_router.CHAT) == LITE
+    assert router.choose(model_router.ANALYSIS) == FLASH
+    assert router.stats()["decisions"][model_router.CHAT] == {LITE: 1}
+
+
+def test_too_few_samples_do_not_trigger_fallback():
+    router = _router()
+    _record(router, FLASH, 60.0, count=model_router.MIN_SAMPLES - 1)
+    assert router.choose(model_router.CHAT) == FLASH
+
+
+def test_old_samples_expire_and_primary_recovers(monkeypatch):
+    router = _router()
+    _record(router, FLASH, 12.0)
+    assert router.choose(model_router.CHAT) == LITE
+    later = time.time() + model_router.SLO_WINDOW + 1
+    monkeypatch.setattr(model_router.time, "time", lambda: later)
+    assert router.choose(model_router.CHAT) == FLASH
+
+
+def test_quota_error_blocks_model_unless_pool_still_has_a_key():
+    router = _router()
+    router.record(FLASH, 1.5, ok=False, quota_error=True)
+    assert router.choose(model_router.CHAT) == LITE
+    assert router.choose(model_router.CHAT, quota_ok=lambda model: True) == FLASH
+    stats = router.stats()["models"][FLASH]
+    assert (stats["requests"], stats["errors"], stats["quota_errors"], stats["quota_blocked"]) == (1, 1, 1, True)
+    # Başarısız çağrı gecikme örneklerine girmez
+    assert stats["p95_ms"] == 0
+
+
+def test_every_model_degraded_returns_lightest():
+    router = _router()
+    _record(router, FLASH, 20.0)
+    _record(router, LITE, 20.0)
+    assert router.choose(model_router.CHAT) == LITE
+
+
+def test_unknown_task_uses_analysis_route_and_env_override(monkeypatch):
+    router = _router()
+    assert router.choose("bilinmeyen") == FLASH
+    monkeypatch.setenv("AI_MODEL_ROUTES", '{"chat": {"models": ["%s"], "p95_slo": 5}}' % LITE)
+    routes = model_router._load_routes()
+    assert routes[model_router.CHAT] == {"models": [LITE], "p95_slo": 5}
+    monkeypatch.setenv("AI_MODEL_ROUTES", "bozuk json")
+    assert model_router._load_routes() == model_router.DEFAULT_ROUTES
@@ -0,0 +1,55 @@
+from modules import relevance
+
+COMPARISON = (
+    "Galatasaray iç sahada son 6 maçını kazandı. "
+    "Fenerbahçe deplasmanda maç başına 2.1 gol attı. "
+    "Hakem bu sezon maç başına 5 sarı kart gösterdi. "
+    "Galatasaray'ın iki stoperi sakat, biri cezalı. "
+    "İki takım arasındaki son 5 maçta karşılıklı gol oldu. "
+    "Fenerbahçe ilk yarılarda gol yemedi. "
+    "Seyirci kapasitesi 52 bin. "
+    "Korner ortalaması ev sahibinde 6.4, deplasmanda 5.1."
+)
+
+
+def test_fold_and_tokenize_handle_turkish_letters():
+    assert relevance.fold("İSTANBUL Işık Ağrı Çöğüş") == "istanbul isik agri cogus"
+    # Durma kelimeleri atılır, kelimeler ilk STEM_LENGTH harfe kısalır
+    assert relevance.tokenize("Sence bu maçta kim gol atar ve kazanır?") == ["gol", "atar", "kazan"]
+
+
+def test_split_sentences_breaks_long_blocks():
+    # 3 harften kısa parçalar ("Üç") atılır
+    assert relevance.split_sentences("Bir. İki! Üç • Dört | Beş") == ["Bir.", "İki!", "Dört", "Beş"]
+    long_block = " ".join(f"kelime{i}" for i in range(65))
+    assert [len(s.split()) for s in relevance.split_sentences(long_block)] == [30, 30, 5]
+
+
+def test_focus_selects_relevant_sentences_in_original_order():
+    picked = relevance.select_sentences(COMPARISON, "sakat cezalı eksik", top_n=1)
+    assert picked == "Galatasaray'ın iki stoperi sakat, biri cezalı."
+
+    picked = relevance.select_sentences(COMPARISON, "korner kart hakem", top_n=2)
+    assert picked == ("Hakem bu sezon maç başına 5 sarı kart gösterdi. "
+                      "Korner ortalaması ev sahibinde 6.4, deplasmanda 5.1.")
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = relevance.BM25Index([
+        "gol gol gol attı", "gol attı", "gol yemedi penaltı", "gol attı yedi",
+    ])
+    scores = index.scores("gol penaltı")
+    assert max(range(len(scores)), key=scores.__getitem__) == 2
+
+
+def test_short_text_and_no_match_cases():
+    assert relevance.select_sentences("Tek cümle.", "gol", top_n=8) == "Tek cümle."
+    assert relevance.select_sentences("", "gol") == ""
+    assert relevance.BM25Index(relevance.split_sentences(COMPARISON)).top("tenis raketi", 3) == []
+    assert relevance.select_passages(["a maçı", None, "", "b maçı"], "gol", top_n=6) == ["a maçı", "b maçı"]
+
+
+def test_index_is_cached_per_passage_list():
+    passages = relevance.split_sentences(COMPARISON)
+    assert relevance.index_for(passages) is relevance.index_for(list(passages))
+    assert relevance.index_for(passages[:-1]) is not relevance.index_for(passages)
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from modules import deadline, single_flight
+
+
+def _start_leader(flights, key, fn):
+    """fn'i lider olarak arka planda çalıştırır; lider uçuşa girene kadar bekler."""
+    outcome = {}
+
+    def _run():
+        try:
+            outcome["result"] = flights.run("test", key, fn)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+    while not flights.stats().get("test", {}).get("in_flight"):
+        time.sleep(0.001)
+    return thread, outcome
+
+
+def test_joiner_gets_copy_of_leader_result():
+    flights = single_flight.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"tahmin": "1", "oranlar": [1.5]}
+
+    thread, leader = _start_leader(flights, "k", fn)
+    joined = {}
+    joiner = threading.Thread(target=lambda: joined.update(r=flights.run("test", "k", fn)))
+    joiner.start()
+    while flights.total_coalesced() < 1:
+        time.sleep(0.001)
+    release.set()
+    thread.join(5)
+    joiner.join(5)
+
+    assert calls == [1]
+    assert leader["result"] == ({"tahmin": "1", "oranlar": [1.5]}, False)
+    result, shared = joined["r"]
+    assert shared and result == leader["result"][0]
+    assert result is not leader["result"][0]
+    assert flights.stats()["test"] == {"calls": 2, "executions": 1, "coalesced": 1}
+
+
+def test_leader_error_propagates_to_joiners_and_key_is_freed():
+    flights = single_flight.SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("scrape başarısız")
+
+    thread, leader = _start_leader(flights, "k", fn)
+    errors = []
+
+    def _join():
+        try:
+            flights.do("test", "k", fn)
+        except ValueError as e:
+            errors.append(e)
+
+    joiner = threading.Thread(target=_join)
+    joiner.start()
+    while flights.total_coalesced() < 1:
+        time.sleep(0.001)
+    release.set()
+    thread.join(5)
+    joiner.join(5)
+
+    assert isinstance(leader["error"], ValueError)
+    assert errors and errors[0] is leader["error"]
+    # Hata önbelleğe alınmaz: sıradaki çağrı yeniden çalışır
+    assert flights.do("test", "k", lambda: "tamam") == "tamam"
+
+
+def test_joiner_times_out_within_its_own_deadline():
+    flights = single_flight.SingleFlight()
+    release = threading.Event()
+    thread, _ = _start_leader(flights, "k", lambda: release.wait(5))
+    try:
+        with deadline.scope(0.1):
+            t0 = time.monotonic()
+            with pytest.raises(TimeoutError):
+                flights.do("test", "k", lambda: "kullanılmaz")
+            assert time.monotonic() - t0 < 1
+    finally:
+        release.set()
+        thread.join(5)
+
+
+def test_partial_leader_result_is_not_shared():
+    flights = single_flight.SingleFlight()
+    release = threading.Event()
+    thread, leader = _start_leader(flights, "k", lambda: release.wait(5) and {"partial": True})
+    joined = {}
+    joiner = threading.Thread(target=lambda: joined.update(r=flights.run("test", "k", lambda: {"tam": True})))
+    joiner.start()
+    while flights.total_coalesced() < 1:
+        time.sleep(0.001)
+    release.set()
+    thread.join(5)
+    joiner.join(5)
+
+    assert leader["result"] == ({"partial": True}, False)
+    # Bekleyen kısmi sonucu almaz, kendisi çalıştırır
+    assert joined["r"] == ({"tam": True}, False)
+
+
+def test_fingerprint_is_order_independent_for_dicts():
+    a = single_flight.fingerprint("analiz", {"ev": "A", "dep": "B"})
+    b = single_flight.fingerprint("analiz", {"dep": "B", "ev": "A"})
+    assert a == b
+    assert a != single_flight.fingerprint("analiz", {"ev": "B", "dep": "A"})
@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+
+from modules import db_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """data/futbol.db'nin geçici kopyası (depodaki dosya değişmez)."""
+    path = tmp_path / "futbol.db"
+    shutil.copy(os.path.join(ROOT, "data", "futbol.db"), path)
+    monkeypatch.setattr(db_manager, "DB_PATH", str(path))
+    yield db_manager
+    db_manager.close_connection()
+
+
+def _teams(db):
+    conn = db.get_db_connection()
+    return [r[0] for r in conn.execute("SELECT home_team FROM matches UNION SELECT away_team FROM matches")]
+
+
+def _assert_matches_scan(db, teams):
+    for team in teams:
+        assert db.calculate_team_performance(team) == db.calculate_team_performance_scan(team), team
+        for role in ("home", "away"):
+            assert db.get_form_analysis(team, role) == db.get_form_analysis_scan(team, role), (team, role)
+
+
+def test_migrated_aggregates_match_scan(db):
+    teams = _teams(db)
+    assert len(teams) >= 18
+    _assert_matches_scan(db, teams)
+
+
+def test_single_writes_keep_aggregates_in_sync(db):
+    # Oynanmış maçın skoru düzeltilir
+    db.save_match_result(21, "ZECORNER KAYSERİSPOR", "KOCAELİSPOR", 3, 0, 1)
+    # Oynanmamış maç oynandı
+    db.save_match_result(22, "GALATASARAY", "İKAS EYÜPSPOR", 2, 2, 1)
+    # Oynanmış maç geri alındı
+    db.save_match_result(21, "FENERBAHÇE", "NATURA DÜNYASI GENÇLERBİRLİĞİ", None, None, 0)
+    _assert_matches_scan(db, _teams(db))
+
+
+def test_bulk_write_with_repeated_match_counts_last_score_once(db):
+    before = db.calculate_team_performance("GALATASARAY")["home"]
+    db.bulk_save_match_results([
+        (22, "GALATASARAY", "İKAS EYÜPSPOR", 1, 0, 1),
+        (22, "HESAP.COM ANTALYASPOR", "SAMSUNSPOR", 0, 1, 1),
+        (22, "GALATASARAY", "İKAS EYÜPSPOR", 1, 1, 1),
+        (35, "YENİ TAKIM", "GALATASARAY", 0, 4, 1),
+    ])
+    after = db.calculate_team_performance("GALATASARAY")["home"]
+    assert (after["d"] - before["d"], after["w"] - before["w"], after["gf"] - before["gf"]) == (1, 0, 1)
+    assert db.calculate_team_performance("YENİ TAKIM")["home"]["l"] == 1
+    _assert_matches_scan(db, _teams(db))
+
+
+def test_rebuild_matches_incremental_state(db):
+    db.save_match_result(22, "GALATASARAY", "İKAS EYÜPSPOR", 3, 1, 1)
+    teams = _teams(db)
+    incremental = {t: db.calculate_team_performance(t) for t in teams}
+    db.rebuild_team_aggregates()
+    assert {t: db.calculate_team_performance(t) for t in teams} == incremental
+
+
+def test_unknown_team_has_empty_stats(db):
+    assert db.calculate_team_performance("OLMAYAN SPOR") == db.calculate_team_performance_scan("OLMAYAN SPOR")
+    assert db.get_form_analysis("OLMAYAN SPOR", "home") == {"last_5": "", "location_stat": "Veri yok"}
+
+
+def test_played_match_without_score_is_skipped_by_both_paths(db):
+    # Kaynak sayfa maçı oynandı gösterip skoru boş bırakabilir
+    db.save_match_result(22, "GALATASARAY", "İKAS EYÜPSPOR", None, None, 1)
+    assert db.calculate_team_performance_scan("GALATASARAY")["home"]["gf"] >= 0
+    _assert_matches_scan(db, _teams(db))